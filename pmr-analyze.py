@@ -0,0 +1,9 @@
+#!pipenv run python
+# -*- coding: utf-8 -*-
+
+# Headless: Must not import Qt
+from pmr.analyze import main
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
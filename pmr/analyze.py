@@ -0,0 +1,293 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+'''
+Summarizes Maven logs without a display. Doesn't import Qt.
+
+Usage: pmr-analyze.py [--format json|csv] [--output FILE] [--jobs N] PATH...
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import contextlib
+import csv
+import gzip
+import json
+import os
+import re
+import sys
+import traceback
+from pmr.ingest import PipelineEmitter
+from pmr.logging import DummyLogger, FileLogger
+from pmr.model import CustomPatternPreferences
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser
+
+OUTPUT_PREFIX = FileLogger.OUTPUT_TYPE + ' '
+# The first line of a log written by FileLogger: "TYPE message"
+FILE_LOGGER_PATTERN = re.compile(r'[A-Z][A-Z0-9_.]* ')
+LOG_SUFFIXES = ('.log', '.log.gz', '.txt', '.txt.gz')
+
+DURATION_PATTERN = re.compile(r'(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)\s*(s|sec|min|h)\b')
+DURATION_UNITS = {'s': 1, 'sec': 1, 'min': 60, 'h': 3600}
+
+def parseDuration(text):
+    '''Returns the seconds of a Maven duration like "1.530 s", "01:02 min" or "0.138 sec" or None.'''
+    match = DURATION_PATTERN.search(text)
+    if match is None:
+        return None
+
+    parts = [int(it) for it in match.group(1, 2) if it is not None]
+    parts.append(float(match.group(3)))
+    unit = DURATION_UNITS[match.group(4)]
+    # "01:02 min" means 1 minute and 2 seconds
+    unit = unit / 60 ** (len(parts) - 1)
+
+    result = 0.0
+    for part in parts:
+        result = result * 60 + part
+    return round(result * unit, 3)
+
+def formatDuration(seconds):
+    '''Formats seconds like Maven does: "1.5 s", "01:02 min" or "1:02:03 h".'''
+    if seconds < 60:
+        return f'{seconds:.1f} s'
+
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if minutes < 60:
+        return f'{minutes:02d}:{seconds:02d} min'
+
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d} h'
+
+def openLog(path):
+    if path.name.endswith('.gz'):
+        # Also reads the logs compressed by LogRetention; they are concatenated gzip members
+        return gzip.open(path, mode='rt', encoding='utf-8', errors='backslashreplace')
+    return open(path, mode='r', encoding='utf-8', errors='backslashreplace')
+
+def logLines(path):
+    '''Yields the output of Maven in a raw log or in a log written by FileLogger.'''
+    with openLog(path) as fh:
+        fileLogger = None
+        for line in fh:
+            line = line.rstrip('\n')
+            if fileLogger is None:
+                fileLogger = FILE_LOGGER_PATTERN.match(line) is not None
+
+            if fileLogger:
+                if not line.startswith(OUTPUT_PREFIX):
+                    continue
+                line = line[len(OUTPUT_PREFIX):]
+
+            # Like PipeDrainer
+            yield line.rstrip()
+
+def newTestCounts():
+    return {'run': 0, 'failures': 0, 'errors': 0, 'skipped': 0}
+
+def addTestCounts(counts, numberOfTests, failures, errors, skipped):
+    counts['run'] += numberOfTests
+    counts['failures'] += failures
+    counts['errors'] += errors
+    counts['skipped'] += skipped
+
+class BuildSummary:
+    '''Stands in for the IngestPipeline: Collects what the parser found in one log.'''
+
+    def __init__(self, path):
+        self.path = path
+
+        self.result = None
+        self.totalTime = None
+        self.modules = []
+        self.module = None
+        self.plugins = {}
+        self.plugin = None
+        self.tests = newTestCounts()
+        self.failedTests = []
+        self.warnings = 0
+        self.errors = 0
+        self.resume = []
+        self.lines = 0
+        self.parseError = None
+
+    def put(self, name, args=()):
+        handler = getattr(self, name, None)
+        if handler is not None:
+            handler(*args)
+
+    def mavenModule(self, name):
+        self.module = {
+            'name': name,
+            'status': None,
+            'duration': None,
+            'tests': newTestCounts(),
+            'warnings': 0,
+            'errors': 0,
+        }
+        self.modules.append(self.module)
+        self.plugin = None
+
+    def mavenPlugin(self, text):
+        name = text.split(' ')[0]
+        self.plugin = self.plugins.get(name)
+        if self.plugin is None:
+            self.plugin = {'name': name, 'executions': 0, 'lines': 0, 'testTime': 0.0}
+            self.plugins[name] = self.plugin
+
+        self.plugin['executions'] += 1
+
+    def output(self, line):
+        if self.plugin is not None:
+            self.plugin['lines'] += 1
+
+        if line.startswith('[INFO] BUILD '):
+            self.result = line[13:].strip()
+        elif line.startswith('[INFO] Total time:'):
+            self.totalTime = parseDuration(line)
+
+    testOutput = output
+    dependencyTree = output
+
+    def finishedTest(self, name, numberOfTests, failures, errors, skipped, duration):
+        seconds = parseDuration(duration)
+        if self.plugin is not None and seconds is not None:
+            self.plugin['testTime'] = round(self.plugin['testTime'] + seconds, 3)
+
+        if failures > 0 or errors > 0:
+            self.failedTests.append({
+                'module': None if self.module is None else self.module['name'],
+                'test': name,
+                'failures': failures,
+                'errors': errors,
+            })
+
+    def testsFinished(self, numberOfTests, failures, errors, skipped):
+        addTestCounts(self.tests, numberOfTests, failures, errors, skipped)
+        if self.module is not None:
+            addTestCounts(self.module['tests'], numberOfTests, failures, errors, skipped)
+
+    def warning(self, message):
+        self.warnings += 1
+        if self.module is not None:
+            self.module['warnings'] += 1
+
+    def error(self, message):
+        self.errors += 1
+        if self.module is not None:
+            self.module['errors'] += 1
+
+        if message == 'BUILD FAILURE':
+            self.result = 'FAILURE'
+
+    def resumeDetected(self, option):
+        self.resume.append(option)
+
+    def reactorSummary(self, name, status, duration):
+        # The summary shows the names without the version
+        module = next((it for it in self.modules if it['name'] == name or it['name'].startswith(name + ' ')), None)
+        if module is None:
+            # Skipped modules never started
+            module = {'name': name, 'status': None, 'duration': None, 'tests': newTestCounts(), 'warnings': 0, 'errors': 0}
+            self.modules.append(module)
+
+        module['status'] = status
+        module['duration'] = parseDuration(duration)
+
+    def toJson(self):
+        return {
+            'path': str(self.path),
+            'result': self.result,
+            'totalTime': self.totalTime,
+            'lines': self.lines,
+            'modules': self.modules,
+            'plugins': list(self.plugins.values()),
+            'tests': self.tests,
+            'failedTests': self.failedTests,
+            'warnings': self.warnings,
+            'errors': self.errors,
+            'resume': self.resume,
+            'parseError': self.parseError,
+        }
+
+def analyzeFile(path, customPatternPreferences=None):
+    '''Parses one log and returns the summary as a dict.'''
+    if customPatternPreferences is None:
+        customPatternPreferences = CustomPatternPreferences()
+
+    summary = BuildSummary(path)
+    parser = MavenOutputParser(PipelineEmitter(summary, SIGNAL_NAMES), customPatternPreferences, DummyLogger())
+
+    try:
+        for line in logLines(path):
+            summary.lines += 1
+            parser.parse(line)
+        parser.flush()
+    except Exception:
+        # Keep going with the other logs
+        summary.parseError = traceback.format_exc()
+
+    return summary.toJson()
+
+def findLogs(paths):
+    result = []
+    for path in paths:
+        if path.is_dir():
+            result.extend(sorted(it for it in path.rglob('*') if it.is_file() and it.name.endswith(LOG_SUFFIXES)))
+        else:
+            result.append(path)
+    return result
+
+def analyzeFiles(paths, jobs=None):
+    '''Returns the summaries in the order of paths. Several files are parsed in parallel.'''
+    if len(paths) < 2 or jobs == 1:
+        return [analyzeFile(it) for it in paths]
+
+    with ProcessPoolExecutor(jobs, initializer=printToStderr) as pool:
+        return list(pool.map(analyzeFile, paths, chunksize=4))
+
+def printToStderr():
+    # The parsers print debug output; stdout is reserved for the summary
+    sys.stdout = sys.stderr
+
+CSV_COLUMNS = ('path', 'result', 'module', 'status', 'duration', 'tests', 'failures', 'testErrors', 'skipped', 'warnings', 'errors')
+
+def csvRows(summaries):
+    for summary in summaries:
+        for module in summary['modules']:
+            tests = module['tests']
+            yield (
+                summary['path'], summary['result'], module['name'], module['status'], module['duration'],
+                tests['run'], tests['failures'], tests['errors'], tests['skipped'], module['warnings'], module['errors'],
+            )
+
+def writeSummaries(summaries, fh, format):
+    if format == 'csv':
+        writer = csv.writer(fh, lineterminator='\n')
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(csvRows(summaries))
+    else:
+        json.dump(summaries, fh, indent=2)
+        fh.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pmr-analyze', description='Summarize Maven logs as JSON or CSV.')
+    parser.add_argument('paths', metavar='PATH', nargs='+', type=Path, help='Log files (raw Maven output or written by PyMavenRunner, optionally gzipped) or folders with logs')
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--output', metavar='FILE', type=Path, help='Write the summary to this file instead of stdout')
+    parser.add_argument('--jobs', metavar='N', type=int, default=os.cpu_count(), help='Number of logs to parse in parallel')
+    args = parser.parse_args(argv)
+
+    paths = findLogs(args.paths)
+    with contextlib.redirect_stdout(sys.stderr):
+        summaries = analyzeFiles(paths, args.jobs)
+
+    if args.output is None:
+        writeSummaries(summaries, sys.stdout, args.format)
+    else:
+        with open(args.output, mode='w', encoding='utf-8', newline='') as fh:
+            writeSummaries(summaries, fh, args.format)
+
+    # Like grep: 1 when one of the logs couldn't be parsed
+    return 1 if any(it['parseError'] is not None for it in summaries) else 0
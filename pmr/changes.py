@@ -0,0 +1,373 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+'''
+Finds the modules whose sources changed since they were built the last time.
+Doesn't import Qt.
+'''
+
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+
+def fileHash(path):
+    result = hashlib.sha1()
+    with open(path, mode='rb') as fh:
+        while True:
+            data = fh.read(1024 * 1024)
+            if len(data) == 0:
+                break
+            result.update(data)
+    return result.hexdigest()
+
+def moduleFiles(folder):
+    '''Yields (relative path, stat) of the pom.xml and the files below src/ of a module.'''
+    try:
+        yield 'pom.xml', os.stat(folder / 'pom.xml')
+    except FileNotFoundError:
+        pass
+
+    todo = ['src']
+    while len(todo) > 0:
+        relPath = todo.pop()
+        try:
+            entries = list(os.scandir(folder / relPath))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        for entry in entries:
+            child = relPath + '/' + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                todo.append(child)
+            elif entry.is_file():
+                yield child, entry.stat()
+
+def isModuleSource(relPath):
+    '''True when a file with this path relative to its module can change what Maven builds; see moduleFiles().'''
+    return relPath == 'pom.xml' or relPath.startswith('src/')
+
+def gitChangedFiles(folder):
+    '''
+    The files below folder which git reports as modified, added, deleted or
+    untracked (both paths of renames), or None when folder isn't in a git
+    work tree.
+    '''
+    options = dict(cwd=folder, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    try:
+        top = subprocess.run(['git', 'rev-parse', '--show-toplevel'], **options).stdout
+        output = subprocess.run(['git', 'status', '--porcelain', '-z', '--untracked-files=all', '--', '.'], **options).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    top = Path(top.decode('UTF-8').strip())
+    result = []
+    # Entries are "XY path"; renames and copies are followed by the old path
+    entries = iter(output.decode('UTF-8', errors='surrogateescape').split('\0'))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        result.append(top / entry[3:])
+        if entry[0] in 'RC':
+            result.append(top / next(entries))
+    return result
+
+def modulesOfFiles(graph, files):
+    '''
+    Maps files to the modules of the ReactorGraph which they belong to.
+    Returns ({key: [relative paths]}, {path: why it was ignored}).
+    '''
+    # git reports real paths
+    folders = {pom.path.parent.resolve(): key for key, pom in graph.poms.items()}
+    changed = {}
+    ignored = {}
+    for path in files:
+        folder = path.parent
+        while folder not in folders and folder != folder.parent:
+            folder = folder.parent
+
+        key = folders.get(folder)
+        if key is None:
+            ignored[path] = 'not in a module'
+            continue
+
+        relPath = path.relative_to(folder).as_posix()
+        if isModuleSource(relPath):
+            changed.setdefault(key, []).append(relPath)
+        else:
+            ignored[path] = f'not a source of {key}'
+    return changed, ignored
+
+class ChangeDetector:
+    '''
+    Remembers a content hash of every file of every module plus a digest of
+    each module at the time it was built successfully. Files whose size and
+    modification time didn't change aren't read again. A module has changed
+    when its digest is different from the one of the last successful build.
+    '''
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {} # module key -> {relative path: [mtime, size, hash]}
+        self.built = {} # module key -> digest at the last successful build
+        self.dirty = False
+
+        # Statistics
+        self.hashed = 0
+        self.unchanged = 0
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except Exception as ex:
+            print(f'Ignoring broken change index {self.path}: {ex}')
+            return
+
+        if data.get('version') == self.VERSION:
+            self.files = data['files']
+            self.built = data['built']
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_name(self.path.name + '.tmp')
+        with open(tmpPath, mode='w', encoding='utf-8') as fh:
+            json.dump({'version': self.VERSION, 'files': self.files, 'built': self.built}, fh)
+        os.replace(tmpPath, self.path)
+        self.dirty = False
+
+    def moduleDigest(self, key, folder):
+        '''The digest of the current content of the module. Only files with a new size or modification time are read.'''
+        previous = self.files.get(key, {})
+        current = {}
+        for relPath, stat in moduleFiles(folder):
+            entry = previous.get(relPath)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.unchanged += 1
+            else:
+                entry = [stat.st_mtime_ns, stat.st_size, fileHash(folder / relPath)]
+                self.hashed += 1
+                self.dirty = True
+            current[relPath] = entry
+
+        if len(current) != len(previous):
+            self.dirty = True
+        self.files[key] = current
+
+        digest = hashlib.sha1()
+        for relPath in sorted(current):
+            digest.update(f'{relPath}\0{current[relPath][2]}\n'.encode('UTF-8'))
+        return digest.hexdigest()
+
+    def snapshot(self, graph):
+        '''The digests of all modules of the ReactorGraph.'''
+        self.forget(graph.poms)
+        return {
+            key: self.moduleDigest(key, graph.poms[key].path.parent)
+            for key in graph.buildOrder()
+        }
+
+    def firstChange(self, snapshot):
+        '''The first module in build order of the snapshot which changed since it was built, or None.'''
+        for key, digest in snapshot.items():
+            if self.built.get(key) != digest:
+                return key
+        return None
+
+    def changedModules(self, snapshot):
+        '''
+        Returns (changed, unknown): The modules of the snapshot which changed
+        since they were built and the ones which were never built.
+        '''
+        changed = []
+        unknown = []
+        for key, digest in snapshot.items():
+            built = self.built.get(key)
+            if built is None:
+                unknown.append(key)
+            elif built != digest:
+                changed.append(key)
+        return changed, unknown
+
+    def markBuilt(self, snapshot):
+        '''Call this when a build of the modules in the snapshot was successful.'''
+        self.built.update(snapshot)
+        self.dirty = True
+
+    def forget(self, keys):
+        for key in set(self.files) - set(keys):
+            del self.files[key]
+            self.built.pop(key, None)
+            self.dirty = True
+
+    def statistics(self):
+        return f'{self.hashed} files hashed, {self.unchanged} unchanged'
+
+class ChangedBuild:
+    '''
+    Which modules a build of the changed modules includes and why. When scope
+    is given, only those modules are considered; for example the modules of a
+    failed build.
+    '''
+    SKIPPED_REASON = 'neither they nor the modules they need changed'
+
+    def __init__(self, graph, reasons, ignored=None, folder=None, scope=None, skippedReason=SKIPPED_REASON):
+        self.reasons = reasons # key of a changed module -> why it counts as changed
+        self.changed = graph.ordered(reasons)
+        dependents = graph.allDownstream(self.changed) - set(self.changed)
+        if scope is not None:
+            dependents &= set(scope)
+        self.dependents = graph.ordered(dependents)
+        included = set(self.changed) | dependents
+        self.skipped = [it for it in graph.buildOrder() if it not in included and (scope is None or it in scope)]
+        self.ignored = {} if ignored is None else ignored # path -> why it doesn't count
+        self.folder = folder
+        self.scope = scope
+        self.skippedReason = skippedReason
+        self.modules = graph.ordered(included)
+
+    def mavenArgs(self):
+        '''The options to build the changed modules and everything which needs them; None when nothing changed.'''
+        if len(self.changed) == 0:
+            return None
+        if self.scope is not None:
+            # Maven's --also-make-dependents would add modules outside of the scope
+            return ['--projects', ','.join(self.modules)]
+        return ['--projects', ','.join(self.changed), '--also-make-dependents']
+
+    def summary(self):
+        if len(self.changed) == 0:
+            return 'Nothing changed'
+        return f'{len(self.changed)} changed, {len(self.dependents)} need them, {len(self.skipped)} skipped'
+
+    def details(self, limit=20):
+        def shorten(keys):
+            lines = [f'  {it}' for it in keys[:limit]]
+            if len(keys) > limit:
+                lines.append(f'  ... and {len(keys) - limit} more')
+            return lines
+
+        lines = ['Changed:']
+        lines.extend(f'  {key}: {self.reasons[key]}' for key in self.changed[:limit])
+        if len(self.changed) > limit:
+            lines.append(f'  ... and {len(self.changed) - limit} more')
+        lines.append('Built because they need a changed module:')
+        lines.extend(shorten(self.dependents))
+        lines.append(f'Skipped because {self.skippedReason}:')
+        lines.extend(shorten(self.skipped))
+
+        if len(self.ignored) > 0:
+            lines.append('Ignored files:')
+            ignored = []
+            for path, reason in self.ignored.items():
+                try:
+                    path = path.relative_to(self.folder)
+                except (TypeError, ValueError):
+                    pass
+                ignored.append(f'{path.as_posix()}: {reason}')
+            lines.extend(shorten(ignored))
+        return '\n'.join(lines)
+
+def planChangedBuild(graph, detector, folder):
+    '''
+    Finds the modules of the ReactorGraph which changed since they were built
+    successfully the last time. For modules which were never built, git
+    decides; without git, they count as changed. Returns (ChangedBuild,
+    snapshot of the ChangeDetector).
+    '''
+    snapshot = detector.snapshot(graph)
+    changed, unknown = detector.changedModules(snapshot)
+    reasons = {key: 'changed since the last build' for key in changed}
+    ignored = {}
+
+    if len(unknown) > 0:
+        files = gitChangedFiles(folder)
+        if files is None:
+            reasons.update((key, 'never built') for key in unknown)
+        else:
+            found, ignored = modulesOfFiles(graph, files)
+            for key in unknown:
+                files = found.get(key)
+                if files is not None:
+                    more = ', ...' if len(files) > 3 else ''
+                    reasons[key] = 'changed in git: ' + ', '.join(files[:3]) + more
+
+    return ChangedBuild(graph, reasons, ignored, folder.resolve()), snapshot
+
+class ResumePoint:
+    '''
+    The result of each module of the last failed build. With the change index,
+    this tells which modules a resumed build can skip: the ones which
+    succeeded and didn't change since.
+    '''
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.results = {} # module key -> status from the reactor summary, in build order
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except Exception as ex:
+            print(f'Ignoring broken resume point {self.path}: {ex}')
+            return
+
+        if data.get('version') == self.VERSION:
+            self.results = data['results']
+
+    def save(self):
+        if self.path is None:
+            return
+
+        if len(self.results) == 0:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_name(self.path.name + '.tmp')
+        with open(tmpPath, mode='w', encoding='utf-8') as fh:
+            json.dump({'version': self.VERSION, 'results': self.results}, fh)
+        os.replace(tmpPath, self.path)
+
+    def record(self, results, resumed=False):
+        '''
+        Remember the results of a failed build. When it resumed the last
+        failed build, the results of the modules which it skipped are kept.
+        '''
+        if not resumed:
+            self.results = {}
+        self.results.update(results)
+
+    def clear(self):
+        self.results = {}
+
+    def plan(self, graph, detector, folder):
+        '''Returns (ChangedBuild, snapshot of the ChangeDetector) for resuming the failed build.'''
+        snapshot = detector.snapshot(graph)
+        scope = [it for it in self.results if it in graph]
+        reasons = {}
+        for key in scope:
+            status = self.results[key]
+            if status != 'SUCCESS':
+                reasons[key] = f'{status} in the last build'
+            elif detector.built.get(key) != snapshot[key]:
+                reasons[key] = 'changed since the last build'
+
+        plan = ChangedBuild(graph, reasons, folder=folder, scope=scope, skippedReason='they succeeded in the last build and didn\'t change')
+        return plan, snapshot
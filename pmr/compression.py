@@ -0,0 +1,88 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from bisect import bisect_right
+import gzip
+import os
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+def blocksPath(gzPath):
+    return gzPath.with_name(gzPath.name + '.blocks')
+
+def compressFile(source, target, blockSize=DEFAULT_BLOCK_SIZE):
+    '''
+    Compress source into target as a sequence of independent gzip members,
+    one per block. Normal gzip tools can still read the result. The start of
+    each block is written to a '.blocks' sidecar so BlockGzipReader can
+    decompress any range without reading the file from the start.
+    '''
+    blocks = array('Q')
+    tmpTarget = target.with_name(target.name + '.tmp')
+
+    with open(source, mode='rb') as src, open(tmpTarget, mode='wb') as dst:
+        uncompressedOffset = 0
+        while True:
+            chunk = src.read(blockSize)
+            if len(chunk) == 0:
+                break
+
+            blocks.append(uncompressedOffset)
+            blocks.append(dst.tell())
+            dst.write(gzip.compress(chunk))
+
+            uncompressedOffset += len(chunk)
+
+        blocks.append(uncompressedOffset)
+        blocks.append(dst.tell())
+
+    with open(blocksPath(target), mode='wb') as fh:
+        blocks.tofile(fh)
+
+    os.replace(tmpTarget, target)
+
+class BlockGzipReader:
+    def __init__(self, path):
+        self.path = path
+
+        table = array('Q')
+        with open(blocksPath(path), mode='rb') as fh:
+            table.frombytes(fh.read())
+
+        self.uncompressedOffsets = table[0::2]
+        self.compressedOffsets = table[1::2]
+        self.size = self.uncompressedOffsets[-1] if len(table) > 0 else 0
+
+        self.fh = open(path, mode='rb')
+        self.cachedBlock = None
+        self.cachedData = None
+
+    def block(self, index):
+        if self.cachedBlock != index:
+            start = self.compressedOffsets[index]
+            end = self.compressedOffsets[index + 1]
+            self.fh.seek(start)
+            self.cachedData = gzip.decompress(self.fh.read(end - start))
+            self.cachedBlock = index
+
+        return self.cachedData
+
+    def read(self, start, end):
+        end = min(end, self.size)
+        result = bytearray()
+        while start < end:
+            index = bisect_right(self.uncompressedOffsets, start) - 1
+            blockStart = self.uncompressedOffsets[index]
+            data = self.block(index)
+
+            chunk = data[start - blockStart:end - blockStart]
+            result += chunk
+            start += len(chunk)
+
+        return bytes(result)
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
@@ -0,0 +1,203 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+import collections
+import tempfile
+import threading
+import time
+
+# Typical size of the buffer of an OS pipe. When more than that wasn't read, the writer blocks.
+PIPE_CAPACITY = 64 * 1024
+
+def lineSize(line):
+    '''Bytes of the line in UTF-8 plus the newline, like in the pipe and the spill file.'''
+    if line.isascii():
+        return len(line) + 1
+    return len(line.encode('utf-8', errors='backslashreplace')) + 1
+
+class SpillingLineBuffer:
+    '''
+    FIFO of lines between a producer and a consumer thread. Lines are kept in
+    memory up to memoryLimit bytes (in UTF-8). After that, new lines are appended to a
+    temporary file until the consumer has read all of them. put() never blocks.
+    '''
+    DEFAULT_MEMORY_LIMIT = 16 * 1024 * 1024
+
+    def __init__(self, memoryLimit=DEFAULT_MEMORY_LIMIT, pipeCapacity=PIPE_CAPACITY):
+        self.memoryLimit = memoryLimit
+        self.pipeCapacity = pipeCapacity
+
+        self.lines = collections.deque()
+        self.memorySize = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.discarded = False
+        self.error = None
+
+        self.spillFile = None
+        self.spillWriteOffset = 0
+        self.spillReadOffset = 0
+
+        # Statistics
+        self.backlog = 0 # bytes which were put but not taken
+        self.maxBacklog = 0
+        self.spilledLines = 0
+        self.overflowStarted = None
+        self.wouldHaveBlocked = 0.0 # seconds
+
+    @property
+    def spilling(self):
+        return self.spillWriteOffset > self.spillReadOffset
+
+    def put(self, line):
+        with self.condition:
+            if self.discarded:
+                # Nobody will read it; just keep the pipe empty
+                return
+
+            size = lineSize(line)
+            if self.spilling or self.memorySize + size > self.memoryLimit:
+                self.spill(line)
+            else:
+                self.lines.append(line)
+                self.memorySize += size
+
+            self.updateBacklog(size)
+            self.condition.notify()
+
+    def spill(self, line):
+        if self.spillFile is None:
+            self.spillFile = tempfile.TemporaryFile(mode='w+b', prefix='pmr-pipe-')
+
+        data = line.encode('utf-8', errors='backslashreplace') + b'\n'
+        self.spillFile.seek(self.spillWriteOffset)
+        self.spillFile.write(data)
+        self.spillWriteOffset += len(data)
+        self.spilledLines += 1
+
+    def unspill(self, maxLines):
+        self.spillFile.flush()
+        self.spillFile.seek(self.spillReadOffset)
+
+        result = []
+        while len(result) < maxLines and self.spillFile.tell() < self.spillWriteOffset:
+            result.append(self.spillFile.readline()[:-1].decode('utf-8'))
+        self.spillReadOffset = self.spillFile.tell()
+
+        if not self.spilling:
+            # Everything was read; start over to keep the file small
+            self.spillFile.truncate(0)
+            self.spillWriteOffset = self.spillReadOffset = 0
+
+        return result
+
+    def updateBacklog(self, delta):
+        self.backlog += delta
+        self.maxBacklog = max(self.maxBacklog, self.backlog)
+
+        # A pipe without this buffer would have been full in this time
+        overflow = self.backlog > self.pipeCapacity
+        if overflow and self.overflowStarted is None:
+            self.overflowStarted = time.monotonic()
+        elif not overflow and self.overflowStarted is not None:
+            self.wouldHaveBlocked += time.monotonic() - self.overflowStarted
+            self.overflowStarted = None
+
+    def close(self, error=None):
+        with self.condition:
+            self.closed = True
+            self.error = error
+            self.condition.notify_all()
+
+    def take(self, maxLines=1000):
+        '''Returns the next lines. Waits until there are some. Returns an empty list after the last line.'''
+        with self.condition:
+            while len(self.lines) == 0 and not self.spilling and not self.closed:
+                self.condition.wait()
+
+            if len(self.lines) > 0:
+                count = min(maxLines, len(self.lines))
+                result = [self.lines.popleft() for i in range(count)]
+                size = sum(lineSize(it) for it in result)
+                self.memorySize -= size
+            elif self.spilling:
+                result = self.unspill(maxLines)
+                size = sum(lineSize(it) for it in result)
+            else:
+                if self.error is not None:
+                    raise self.error
+                result = []
+                size = 0
+
+            self.updateBacklog(-size)
+            return result
+
+    def discard(self):
+        with self.condition:
+            self.discarded = True
+            self.lines.clear()
+            self.memorySize = 0
+
+            if self.spillFile is not None:
+                self.spillFile.close()
+                self.spillFile = None
+            self.spillWriteOffset = self.spillReadOffset = 0
+
+    def statistics(self):
+        return f'max backlog {self.maxBacklog} bytes, {self.spilledLines} lines spilled to disk, Maven would have been blocked for {self.wouldHaveBlocked:.1f}s'
+
+class PipeDrainer:
+    '''
+    Reads a text stream (for example the stdout of Maven) as fast as possible in
+    its own thread, so the process never blocks on a full pipe. Use lines() to
+    consume the output in another thread.
+    '''
+
+    def __init__(self, stream, buffer=None):
+        self.stream = stream
+        self.buffer = SpillingLineBuffer() if buffer is None else buffer
+        self.thread = threading.Thread(target=self.drain, name='PipeDrainer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def drain(self):
+        try:
+            while True:
+                line = self.stream.readline()
+                if line == '':
+                    break
+
+                self.buffer.put(line.rstrip())
+        except Exception as ex:
+            self.buffer.close(ex)
+        else:
+            self.buffer.close()
+
+    def batches(self, maxLines=1000):
+        '''Yields the lines in the order in which they were read, as lists of the lines which were available at that time.'''
+        try:
+            while True:
+                batch = self.buffer.take(maxLines)
+                if len(batch) == 0:
+                    break
+
+                yield batch
+        finally:
+            self.buffer.discard()
+
+    def lines(self):
+        batches = self.batches()
+        try:
+            for batch in batches:
+                yield from batch
+        finally:
+            batches.close()
+
+    @property
+    def wouldHaveBlocked(self):
+        return self.buffer.wouldHaveBlocked
+
+    def statistics(self):
+        return self.buffer.statistics()
@@ -0,0 +1,162 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+'''
+Runs Maven without a display, for example on CI machines. Doesn't import Qt.
+
+Usage: pmr-run.py [--project DIR] [--log FILE] [--result FILE] [--] MAVEN_ARGS...
+'''
+
+from pathlib import Path
+import argparse
+import contextlib
+import json
+import sys
+from pmr.analyze import BuildSummary
+from pmr.ingest import PipelineEmitter
+from pmr.logging import AsyncFileLogger, newLogPath, projectLogFolder, resultPath
+from pmr.model import Project
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser, installEventLogging
+from pmr.retention import LogRetention
+from pmr.tools import OsSpecificInfo
+from pmr.worker import mavenCommandLine, runMaven
+
+class RecordFanout:
+    '''Stands in for the IngestPipeline: Hands each record to several consumers.'''
+
+    def __init__(self, *targets):
+        self.targets = targets
+
+    def put(self, name, args=()):
+        for target in self.targets:
+            target.put(name, args)
+
+class ConsoleReporter:
+    '''Prints a condensed view of the build: Module progress, failures and the summary.'''
+
+    def __init__(self, out):
+        self.out = out
+
+        self.currentProgress = None
+        self.inErrors = False
+        self.inSummary = False
+
+    def put(self, name, args=()):
+        # Like the tree of the UI, only the first of a sequence of errors is shown
+        if name != 'error':
+            self.inErrors = False
+
+        handler = getattr(self, name, None)
+        if handler is not None:
+            handler(*args)
+
+    def write(self, message):
+        print(message, file=self.out, flush=True)
+
+    def mavenStarted(self, project, args):
+        self.write(f'Building {project.name}: {" ".join(args)}')
+
+    def progress(self, current, max):
+        self.currentProgress = (current, max)
+
+    def mavenModule(self, name):
+        if self.currentProgress is None:
+            self.write(name)
+        else:
+            current, max = self.currentProgress
+            self.write(f'[{current}/{max}] {name}')
+
+    def finishedTest(self, name, numberOfTests, failures, errors, skipped, duration):
+        if failures > 0 or errors > 0:
+            self.write(f'  FAILED {name}: {failures} failures, {errors} errors')
+
+    def testsFinished(self, numberOfTests, failures, errors, skipped):
+        self.write(f'  Tests: {numberOfTests} run, {failures} failures, {errors} errors, {skipped} skipped')
+
+    def error(self, message):
+        if not self.inErrors:
+            self.write(f'  ERROR {message}')
+            self.inErrors = True
+
+    def resumeDetected(self, option):
+        self.write(f'Resume with: -rf {option}')
+
+    def reactorSummary(self, module, status, duration):
+        if not self.inSummary:
+            self.write('Reactor Summary:')
+            self.inSummary = True
+
+        self.write(f'  {module} {status} {duration.strip()}')
+
+    def mavenFinished(self, rc):
+        self.write(f'Maven finished with exit code {rc}')
+
+class HeadlessRunner:
+    '''
+    Runs Maven like MavenRunner but without Qt. The output is parsed in this
+    thread; the console gets a condensed view. Writes the indexed log and a
+    JSON result next to it.
+    '''
+
+    def __init__(self, project, cmdLine, logPath=None, resultPath=None, out=None, mavenCommand=None):
+        self.project = project
+        self.cmdLine = cmdLine
+        self.logPath = logPath
+        self.resultPath = resultPath
+        self.out = sys.stdout if out is None else out
+        self.mavenCommand = OsSpecificInfo().mavenCommand if mavenCommand is None else mavenCommand
+
+    def run(self):
+        '''Returns the exit code of Maven.'''
+        preferences = self.project.preferences
+        preferences.load()
+
+        logPath = newLogPath(self.project) if self.logPath is None else self.logPath
+        logger = AsyncFileLogger(logPath)
+
+        summary = BuildSummary(logPath)
+        emitter = PipelineEmitter(RecordFanout(summary, ConsoleReporter(self.out)), SIGNAL_NAMES)
+        installEventLogging(emitter, logger)
+        parser = MavenOutputParser(emitter, preferences.customPatternPreferences, logger)
+
+        args = mavenCommandLine(self.mavenCommand, self.cmdLine)
+        emitter.mavenStarted.emit(self.project, args)
+        rc = runMaven(args, self.project.path, parser, logger, emitter)
+        emitter.mavenFinished.emit(rc)
+        logger.close()
+
+        self.writeResult(summary, args, rc, logPath)
+
+        if self.logPath is None:
+            LogRetention(projectLogFolder(self.project), preferences.logs).apply()
+
+        return rc
+
+    def writeResult(self, summary, args, rc, logPath):
+        result = summary.toJson()
+        result['exitCode'] = rc
+        result['command'] = args
+        result['log'] = str(logPath)
+
+        path = resultPath(logPath) if self.resultPath is None else self.resultPath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, mode='w', encoding='utf-8') as fh:
+            json.dump(result, fh, indent=2)
+            fh.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pmr-run', description='Run Maven without a display and show a condensed view of the build.')
+    parser.add_argument('--project', metavar='DIR', type=Path, default=Path.cwd(), help='Folder with the pom.xml (default: current folder)')
+    parser.add_argument('--log', metavar='FILE', type=Path, help='Write the log here instead of the log folder of the project')
+    parser.add_argument('--result', metavar='FILE', type=Path, help='Write the JSON result here instead of next to the log')
+    parser.add_argument('mavenArgs', metavar='MAVEN_ARGS', nargs=argparse.REMAINDER, help='Arguments for Maven; put them after -- when they start with -')
+    args = parser.parse_args(argv)
+
+    mavenArgs = args.mavenArgs
+    if len(mavenArgs) > 0 and mavenArgs[0] == '--':
+        mavenArgs = mavenArgs[1:]
+
+    runner = HeadlessRunner(Project(args.project.resolve()), mavenArgs, args.log, args.result, out=sys.stdout)
+    # Debug output of the parsers and loggers goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        return runner.run()
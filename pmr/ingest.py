@@ -0,0 +1,206 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+import time
+
+# Overload policies
+BLOCK = 'block' # The reader waits until the UI caught up. Nothing is lost but Maven might slow down.
+DEGRADE = 'degrade' # Plain output is replaced by "N lines hidden" records. Everything is still in the log file.
+OVERLOAD_POLICIES = (BLOCK, DEGRADE)
+
+# Lanes which only carry plain output. Only these may be hidden.
+HIDEABLE = frozenset(('output', 'testOutput', 'dependencyTree'))
+
+LINES_HIDDEN = 'linesHidden'
+
+# Priority records of a module of a parallel build which ThreadDemultiplexer holds
+# back, found by reading ahead: (stream, name, args, adjacent). They only travel on the priority lane.
+EARLY_RECORD = 'earlyRecord'
+# (flag): While True, the records come from held back lines which were read ahead;
+# their priority copies were already sent as EARLY_RECORD.
+REPLAYING = 'replaying'
+# Name of the EARLY_RECORD after which the module of the stream continues on the normal lanes
+STREAM_LIVE = 'live'
+
+# Records which also travel on the priority lane: Everything which is needed to
+# put errors into the right place of the tree. Failed tests are added by isPriority().
+PRIORITY = frozenset(('mavenStarted', 'mavenModule', 'mavenPlugin', 'reactorSummary', 'error', 'resumeDetected', 'testsFinished'))
+
+def isPriority(name, args):
+    if name == 'finishedTest':
+        failures, errors = args[2], args[3]
+        return failures > 0 or errors > 0
+
+    return name in PRIORITY
+
+class IngestPipeline:
+    '''
+    Bounded queue between the thread which parses the Maven output and the UI.
+    Each record is the name of a MavenRunner signal plus its arguments.
+
+    When the queue is full, put() waits for the UI to drain it. With the policy
+    DEGRADE, plain output lines are counted instead and the UI gets a single
+    LINES_HIDDEN record for them. Warnings, errors and all other records are
+    never dropped.
+
+    Errors, failed tests and the records which are needed to show them are
+    copied to a priority lane. The UI should drain it first; the copies in
+    the normal queue then only add the text to the log.
+    '''
+    DEFAULT_CAPACITY = 10000
+    # The parser may read the held back modules of parallel builds ahead
+    acceptsEarlyRecords = True
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, policy=BLOCK):
+        if policy not in OVERLOAD_POLICIES:
+            raise Exception(f'Unsupported overload policy {policy!r}, expected one of {OVERLOAD_POLICIES}')
+
+        self.capacity = capacity
+        self.policy = policy
+
+        self.queue = collections.deque()
+        self.priority = collections.deque()
+        self.lastWasPriority = False
+        self.condition = threading.Condition()
+        self.hidden = 0
+        self.closed = False
+        self.replaying = False
+
+        # Statistics
+        self.maxDepth = 0
+        self.hiddenLines = 0
+        self.blockedTime = 0.0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def put(self, name, args=()):
+        with self.condition:
+            if self.closed:
+                self.dropped += 1
+                return
+
+            if name == EARLY_RECORD:
+                # Before waiting for space, like the other priority records
+                self.priority.append((name, args[:3], args[3], time.monotonic()))
+                return
+            if name == REPLAYING:
+                self.replaying = args[0]
+                return
+
+            if isPriority(name, args) and not self.replaying:
+                # Before waiting for space, so the UI can show it even when the reader is blocked.
+                # adjacent tells the UI that nothing else came between this and the last priority record.
+                self.priority.append((name, args, self.lastWasPriority, time.monotonic()))
+                self.lastWasPriority = True
+            else:
+                self.lastWasPriority = False
+
+            if len(self.queue) >= self.capacity:
+                if self.policy == DEGRADE and name in HIDEABLE:
+                    self.hidden += 1
+                    self.hiddenLines += 1
+                    return
+
+                self.waitForSpace()
+                if self.closed:
+                    self.dropped += 1
+                    return
+
+            self.addHiddenRecord()
+            self.queue.append((name, args))
+            self.maxDepth = max(self.maxDepth, len(self.queue))
+
+    def waitForSpace(self):
+        started = time.monotonic()
+        while len(self.queue) >= self.capacity and not self.closed:
+            self.condition.wait()
+        self.blockedTime += time.monotonic() - started
+
+    def addHiddenRecord(self):
+        if self.hidden > 0:
+            self.queue.append((LINES_HIDDEN, (self.hidden,)))
+            self.hidden = 0
+
+    def drain(self, maxRecords=None):
+        with self.condition:
+            count = len(self.queue) if maxRecords is None else min(maxRecords, len(self.queue))
+            result = [self.queue.popleft() for i in range(count)]
+
+            if len(self.queue) == 0 and self.hidden > 0:
+                result.append((LINES_HIDDEN, (self.hidden,)))
+                self.hidden = 0
+
+            self.condition.notify_all()
+
+        return result
+
+    def drainPriority(self):
+        '''Returns all records of the priority lane as (name, args, adjacent, timestamp).'''
+        with self.condition:
+            result = list(self.priority)
+            self.priority.clear()
+
+        return result
+
+    def close(self):
+        '''Wake up a blocked reader. Nobody reads the records which are added later; they are dropped.'''
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def statistics(self):
+        return f'max depth {self.maxDepth}/{self.capacity}, {self.hiddenLines} lines hidden, blocked {self.blockedTime:.1f}s, {self.dropped} dropped after close'
+
+class EarlyRecords:
+    '''
+    Stands in for the pipeline of a parser which reads a held back module of a
+    parallel build ahead. Only the priority records are passed on, tagged
+    with the stream of the module.
+    '''
+
+    def __init__(self, pipeline, stream):
+        self.pipeline = pipeline
+        self.stream = stream
+        self.lastWasPriority = False
+
+    def put(self, name, args=()):
+        if isPriority(name, args):
+            self.pipeline.put(EARLY_RECORD, (self.stream, name, args, self.lastWasPriority))
+            self.lastWasPriority = True
+        else:
+            self.lastWasPriority = False
+
+    def live(self):
+        self.pipeline.put(EARLY_RECORD, (self.stream, STREAM_LIVE, (), False))
+
+class PipelineLane:
+    '''Looks like a signal to the parsers: emit() puts a record into the pipeline.'''
+    __slots__ = ('pipeline', 'name', 'listeners')
+
+    def __init__(self, pipeline, name):
+        self.pipeline = pipeline
+        self.name = name
+        self.listeners = []
+
+    def connect(self, listener, *args):
+        # Listeners are called in the thread of the parser, like Qt.DirectConnection
+        self.listeners.append(listener)
+
+    def emit(self, *args):
+        for listener in self.listeners:
+            listener(*args)
+
+        self.pipeline.put(self.name, args)
+
+class PipelineEmitter:
+    '''Stands in for the MavenRunner in the parsers. Has one lane per signal name.'''
+
+    def __init__(self, pipeline, names):
+        self.pipeline = pipeline
+
+        for name in names:
+            setattr(self, name, PipelineLane(pipeline, name))
@@ -1,6 +1,67 @@
 #!python3
 # -*- coding: utf-8 -*-
 
+from array import array
+from pathlib import Path
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import queue
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pmr.compression import BlockGzipReader
+
+COMPRESSED_SUFFIX = '.gz'
+
+def logFolder():
+    return Path(tempfile.gettempdir()) / 'PyMavenRunner'
+
+def projectLogFolder(project):
+    return logFolder() / project.name
+
+def dataFolder():
+    '''Per user folder for what the app remembers about the projects; unlike the logs, it must survive a cleanup of the temp folder.'''
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or Path.home() / 'AppData' / 'Roaming'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Application Support'
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or Path.home() / '.local' / 'share'
+    return Path(base) / 'PyMavenRunner'
+
+def projectDataFolder(project):
+    '''Checkouts with the same folder name are told apart by the hash of their path.'''
+    key = hashlib.sha1(str(project.path.resolve()).encode('UTF-8')).hexdigest()[:12]
+    return dataFolder() / f'{project.name}-{key}'
+
+def newLogPath(project):
+    timestamp = time.strftime('%Y-%m-%d_%H%M%S', time.localtime(time.time()))
+    return projectLogFolder(project) / f'pmr-{timestamp}.log'
+
+def uncompressedPath(logPath):
+    if logPath.name.endswith(COMPRESSED_SUFFIX):
+        return logPath.with_name(logPath.name[:-len(COMPRESSED_SUFFIX)])
+    return logPath
+
+def compressedPath(logPath):
+    return logPath.with_name(logPath.name + COMPRESSED_SUFFIX)
+
+def indexPath(logPath):
+    logPath = uncompressedPath(logPath)
+    return logPath.with_name(logPath.name + '.idx')
+
+def resultPath(logPath):
+    '''Structured result of a build without UI, next to its log.'''
+    logPath = uncompressedPath(logPath)
+    return logPath.with_name(logPath.name + '.json')
+
 class DummyLogger:
     def log(self, *args):
         pass
@@ -18,20 +79,424 @@ class MockLogger:
     def close(self):
         pass
 
-class FileLogger:
+class LogIndexWriter:
+    '''
+    Sidecar of a log file: The byte offset of every line followed by the events
+    which the parser found. The trailer is written by close(); without it, only
+    the line offsets can be used.
+    '''
+    MAGIC = b'PMRIDX01'
+    TRAILER = struct.Struct('=QQQ8s') # lineCount, eventsOffset, eventsSize, magic
+    BATCH_SIZE = 4096
+
     def __init__(self, path):
         self.path = path
 
+        self.fh = open(self.path, mode='wb')
+        self.fh.write(self.MAGIC)
+
+        self.lineCount = 0
+        self.pendingOffsets = array('Q')
+        self.events = []
+
+    def addLine(self, offset):
+        self.pendingOffsets.append(offset)
+        self.lineCount += 1
+
+        if len(self.pendingOffsets) >= self.BATCH_SIZE:
+            self.flushOffsets()
+
+    def addEvent(self, kind, line, args):
+        self.events.append([kind, line, list(args)])
+
+    def flushOffsets(self):
+        self.pendingOffsets.tofile(self.fh)
+        self.pendingOffsets = array('Q')
+
+    def flush(self):
+        '''Make the offsets of all lines so far readable for LogIndex, for example after a crash.'''
+        self.flushOffsets()
+        self.fh.flush()
+
+    def close(self):
+        self.flushOffsets()
+
+        eventsOffset = self.fh.tell()
+        data = json.dumps(self.events).encode('utf-8')
+        self.fh.write(data)
+        self.fh.write(self.TRAILER.pack(self.lineCount, eventsOffset, len(data), self.MAGIC))
+
+        self.fh.close()
+        self.fh = None
+
+class FileLogger:
+    OUTPUT_TYPE = 'MOUT'
+
+    # Paths of the logs which are currently being written
+    openLogs = set()
+
+    def __init__(self, path, index=True):
+        self.path = path
+
         print(f'Writing log to {self.path}')
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.fh = open(self.path, mode='w', encoding='utf-8')
+        self.fh = open(self.path, mode='wb')
+        self.openLogs.add(self.path)
+
+        self.offset = 0
+        self.lineCount = 0
+        self.lastOutputLine = None
+        # When set, events belong to this line instead of the last output line
+        self.eventLine = None
+        self.index = LogIndexWriter(indexPath(self.path)) if index else None
 
     def log(self, type, message):
-        self.fh.write(type)
-        self.fh.write(' ')
-        self.fh.write(message)
-        self.fh.write('\n')
+        data = self.encode(type, message)
+        self.fh.write(data)
+        self.addLines(type, data)
+
+    def encode(self, type, message):
+        return f'{type} {message}\n'.encode('utf-8', errors='backslashreplace')
+
+    def addLines(self, type, data):
+        if type == self.OUTPUT_TYPE:
+            self.lastOutputLine = self.lineCount
+
+        pos = 0
+        while pos < len(data):
+            if self.index is not None:
+                self.index.addLine(self.offset + pos)
+            self.lineCount += 1
+
+            pos = data.index(b'\n', pos) + 1
+
+        self.offset += len(data)
+
+    def currentOutputLine(self):
+        '''The number of the line of the output which was logged last.'''
+        return self.lastOutputLine
+
+    def event(self, kind, *args):
+        self.addEvent(kind, args, self.eventLine)
+
+    def addEvent(self, kind, args, line=None):
+        if self.index is None:
+            return
+
+        if line is None:
+            line = self.lineCount - 1 if self.lastOutputLine is None else self.lastOutputLine
+        self.index.addEvent(kind, line, args)
 
     def close(self):
         self.fh.close()
         self.fh = None
+
+        if self.index is not None:
+            self.index.close()
+
+        self.openLogs.discard(self.path)
+
+class AsyncFileLogger(FileLogger):
+    '''
+    FileLogger which hands the records to a writer thread. The writer collects
+    them into large batches and flushes the file at least every flushInterval
+    seconds. log() only blocks when the queue is full.
+
+    When the writer fails (for example because the disk is full), it throws
+    away the rest of the records, so log() and close() never wait for it;
+    log() raises an exception instead. Records after close() are counted as
+    dropped; nothing would ever take them from the queue.
+    '''
+    DEFAULT_QUEUE_SIZE = 10000
+    DEFAULT_FLUSH_INTERVAL = 0.5 # seconds
+    BATCH_SIZE = 1000
+
+    LOG, EVENT, STOP = range(3)
+
+    def __init__(self, path, index=True, queueSize=DEFAULT_QUEUE_SIZE, flushInterval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(path, index)
+
+        self.queue = queue.Queue(queueSize)
+        self.flushInterval = flushInterval
+        self.bytesWritten = 0
+        self.started = time.monotonic()
+        self.writerError = None
+        self.dropped = 0
+        # The writer counts the lines later; the parser needs them now
+        self.queuedLines = 0
+        self.queuedOutputLine = None
+
+        self.thread = threading.Thread(target=self.writeLoop, name=f'AsyncFileLogger {path.name}', daemon=True)
+        self.thread.start()
+
+        # Write what is still queued when the interpreter exits without close()
+        atexit.register(self.close)
+
+    def log(self, type, message):
+        if not self.checkWriter():
+            return
+        if type == self.OUTPUT_TYPE:
+            self.queuedOutputLine = self.queuedLines
+        self.queuedLines += message.count('\n') + 1
+        self.queue.put((self.LOG, type, message))
+
+    def event(self, kind, *args):
+        if not self.checkWriter():
+            return
+        self.queue.put((self.EVENT, kind, args, self.eventLine))
+
+    def currentOutputLine(self):
+        return self.queuedOutputLine
+
+    def checkWriter(self):
+        '''Returns False when the record has to be dropped because the log is closed.'''
+        if self.writerError is not None:
+            raise Exception(f'Unable to write {self.path}') from self.writerError
+
+        if self.thread is None:
+            if self.dropped == 0:
+                print(f'{self.path} is closed; dropping the records which still come')
+            self.dropped += 1
+            return False
+
+        return True
+
+    @property
+    def queueDepth(self):
+        return self.queue.qsize()
+
+    @property
+    def bytesPerSecond(self):
+        elapsed = time.monotonic() - self.started
+        return 0.0 if elapsed <= 0 else self.bytesWritten / elapsed
+
+    def nextBatch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flushInterval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def writeLoop(self):
+        lastFlush = time.monotonic()
+        done = False
+
+        while not done:
+            batch = self.nextBatch()
+            done = any(record[0] == self.STOP for record in batch)
+            if self.writerError is not None:
+                self.dropped += len(batch)
+                continue
+
+            try:
+                self.writeBatch(batch)
+
+                now = time.monotonic()
+                if done or now - lastFlush >= self.flushInterval:
+                    self.flush()
+                    lastFlush = now
+            except Exception as ex:
+                print(f'Error writing {self.path}; the rest of the log is lost')
+                traceback.print_exc()
+                self.writerError = ex
+
+    def writeBatch(self, batch):
+        buffer = bytearray()
+        for record in batch:
+            if record[0] == self.LOG:
+                data = self.encode(record[1], record[2])
+                buffer += data
+                self.addLines(record[1], data)
+            elif record[0] == self.EVENT:
+                self.addEvent(record[1], record[2], record[3])
+
+        if len(buffer) > 0:
+            self.fh.write(buffer)
+            self.bytesWritten += len(buffer)
+
+    def flush(self):
+        self.fh.flush()
+        if self.index is not None:
+            self.index.flush()
+
+    def close(self):
+        if self.thread is None:
+            return
+
+        atexit.unregister(self.close)
+
+        # From now on, log() and event() drop their records
+        thread, self.thread = self.thread, None
+        # The writer always takes records from the queue, even after an error
+        self.queue.put((self.STOP,))
+        thread.join()
+
+        if self.writerError is not None:
+            print(f'Closed {self.path} after an error: {self.writerError}; {self.dropped} records were lost')
+            try:
+                super().close()
+            except Exception:
+                traceback.print_exc()
+                self.openLogs.discard(self.path)
+            return
+
+        print(f'Closed {self.path}: {self.bytesWritten} bytes, {self.bytesPerSecond:.0f} bytes/s')
+        super().close()
+
+class LogIndex:
+    def __init__(self, path):
+        self.path = path
+        self.mmap = None
+        self.offsets = []
+        self.events = []
+        self.complete = False
+
+        with open(self.path, mode='rb') as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size < len(LogIndexWriter.MAGIC):
+                raise Exception(f'{self.path}: Not a log index')
+            self.mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start = len(LogIndexWriter.MAGIC)
+        if self.mmap[:start] != LogIndexWriter.MAGIC:
+            raise Exception(f'{self.path}: Not a log index')
+
+        lineCount = (size - start) // 8
+        trailerSize = LogIndexWriter.TRAILER.size
+        if size >= start + trailerSize:
+            lineCount2, eventsOffset, eventsSize, magic = LogIndexWriter.TRAILER.unpack(self.mmap[-trailerSize:])
+            if magic == LogIndexWriter.MAGIC:
+                lineCount = lineCount2
+                self.events = json.loads(self.mmap[eventsOffset:eventsOffset+eventsSize].decode('utf-8'))
+                self.complete = True
+
+        self.offsets = memoryview(self.mmap)[start:start + lineCount * 8].cast('Q')
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        if self.mmap is not None:
+            self.offsets.release()
+            self.mmap.close()
+            self.mmap = None
+
+class ScannedLogIndex:
+    '''
+    The line offsets of a log which has no index or a broken one, found by
+    reading the whole log. Without the index, there are no events.
+    '''
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, source):
+        self.offsets = array('Q')
+        self.events = []
+        self.complete = False
+
+        if source.size > 0:
+            self.offsets.append(0)
+
+        pos = 0
+        while pos < source.size:
+            end = min(pos + self.CHUNK_SIZE, source.size)
+            chunk = source.read(pos, end)
+            self.offsets.extend(pos + match.end() for match in re.finditer(b'\n', chunk))
+            pos = end
+
+        # No line starts after the last newline
+        if len(self.offsets) > 0 and self.offsets[-1] == source.size:
+            self.offsets.pop()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        pass
+
+class MappedFile:
+    def __init__(self, path):
+        with open(path, mode='rb') as fh:
+            self.size = os.fstat(fh.fileno()).st_size
+            self.mmap = None if self.size == 0 else mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, start, end):
+        return self.mmap[start:end]
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+class LogArchive:
+    '''
+    Read-only view of a log file written by FileLogger. Lines are loaded on demand.
+    Works with the plain log and with the version compressed by LogRetention.
+
+    Logs without index (older versions, "mvn -l") are read once to find the
+    lines. When the lines have no type, the log was written by Maven; then
+    every line is shown as output.
+    '''
+    # "MOUT [INFO] ..."
+    TYPE_PATTERN = re.compile(rb'[A-Z]+ ')
+
+    # Uncompressed paths of the logs which are open -> number of archives; LogRetention leaves them alone
+    openArchives = {}
+
+    def __init__(self, path):
+        if not path.exists() and compressedPath(path).exists():
+            path = compressedPath(path)
+
+        self.path = path
+        if path.name.endswith(COMPRESSED_SUFFIX):
+            self.source = BlockGzipReader(path)
+        else:
+            self.source = MappedFile(path)
+        self.size = self.source.size
+
+        self.linePrefix = ''
+        try:
+            self.index = LogIndex(indexPath(path))
+        except Exception as ex:
+            print(f'Unable to use the index of {path}: {ex}')
+            self.index = ScannedLogIndex(self.source)
+            if len(self.index) > 0 and self.TYPE_PATTERN.match(self.source.read(0, 64)) is None:
+                self.linePrefix = FileLogger.OUTPUT_TYPE + ' '
+
+        key = uncompressedPath(path)
+        self.openArchives[key] = self.openArchives.get(key, 0) + 1
+        self.closed = False
+
+    @property
+    def lineCount(self):
+        return len(self.index)
+
+    @property
+    def events(self):
+        return self.index.events
+
+    def line(self, number):
+        offsets = self.index.offsets
+        start = offsets[number]
+        end = offsets[number + 1] if number + 1 < len(offsets) else self.size
+
+        return self.linePrefix + self.source.read(start, end).decode('utf-8', errors='replace').rstrip('\n')
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        self.index.close()
+        self.source.close()
+
+        key = uncompressedPath(self.path)
+        count = self.openArchives.pop(key, 1) - 1
+        if count > 0:
+            self.openArchives[key] = count
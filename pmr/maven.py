@@ -1,18 +1,158 @@
 #!python3
 # -*- coding: utf-8 -*-
 
+import json
+import os
+import re
+import threading
 import xml.etree.ElementTree as ET
 
+PROJECT_GROUP_ID = ('${project.groupId}', '${pom.groupId}')
+DEFAULT_PLUGIN_GROUP_ID = 'org.apache.maven.plugins'
+
+def pomPath(path):
+    path = path.resolve()
+    if path.is_dir():
+        path = path / 'pom.xml'
+    if not (path.is_file() and path.name == 'pom.xml'):
+        raise FileNotFoundError(f'Expected path to pom.xml: {path}')
+    return path
+
+class PomMetadata:
+    '''The parts of a POM which the UI needs; see readPomMetadata().'''
+    __slots__ = ('groupId', 'artifactId', 'version', 'packaging', 'modules', 'parent', 'dependencies', 'plugins', 'name')
+
+    def __init__(self, groupId=None, artifactId=None, version=None, packaging='jar', modules=None, parent=None, dependencies=None, plugins=None, name=None):
+        self.groupId = groupId
+        self.artifactId = artifactId
+        self.version = version
+        self.packaging = packaging
+        self.modules = [] if modules is None else modules
+        self.parent = parent
+        self.dependencies = [] if dependencies is None else dependencies
+        # Build plugins and extensions plus the dependencies of the plugins
+        self.plugins = [] if plugins is None else plugins
+        self.name = name
+
+    @property
+    def coordinate(self):
+        return f'{self.groupId}:{self.artifactId}:{self.version}'
+
+    @property
+    def displayName(self):
+        '''The name which Maven shows for the module in the log.'''
+        return self.artifactId if self.name is None else self.name
+
+    def pickle(self):
+        return {it: getattr(self, it) for it in self.__slots__}
+
+    @classmethod
+    def unpickle(cls, data):
+        return cls(**data)
+
+    def __eq__(self, other):
+        return isinstance(other, PomMetadata) and self.pickle() == other.pickle()
+
+    def __repr__(self):
+        return f'PomMetadata({self.coordinate})'
+
+# Top-level sections which readPomMetadata() doesn't need. None of them contains
+# an element with the same name, so the first closing tag ends the section.
+SKIPPED_SECTIONS = re.compile(rb'<(build|profiles|reporting|dependencyManagement|repositories|pluginRepositories|distributionManagement)\b(?:[^>]*/>|.*?</\1\s*>)', re.DOTALL)
+# The bulk of <build>; only the coordinates of the plugins are needed
+PLUGIN_DETAILS = re.compile(rb'<(configuration|executions)\b(?:[^>]*/>|.*?</\1\s*>)', re.DOTALL)
+
+def resolveGroupId(groupId, projectGroupId):
+    return projectGroupId if groupId in PROJECT_GROUP_ID else groupId
+
+def dependencyKeys(elem, namespace):
+    '''(groupId, artifactId) of the dependency elements below elem.'''
+    if elem is None:
+        return []
+
+    return [
+        (it.findtext(f'{namespace}groupId', ''), it.findtext(f'{namespace}artifactId', ''))
+        for it in elem if it.tag == f'{namespace}dependency'
+    ]
+
+def pluginKeys(build, namespace):
+    '''(groupId, artifactId) of the plugins, their dependencies and the extensions of a <build> element.'''
+    result = []
+    if build is None:
+        return result
+
+    for plugin in build.iterfind(f'{namespace}plugins/{namespace}plugin'):
+        result.append((plugin.findtext(f'{namespace}groupId', DEFAULT_PLUGIN_GROUP_ID), plugin.findtext(f'{namespace}artifactId', '')))
+        result.extend(dependencyKeys(plugin.find(f'{namespace}dependencies'), namespace))
+
+    for extension in build.iterfind(f'{namespace}extensions/{namespace}extension'):
+        result.append((extension.findtext(f'{namespace}groupId', ''), extension.findtext(f'{namespace}artifactId', '')))
+
+    return result
+
+def readPomMetadata(path):
+    '''
+    Reads the metadata of a POM in one pass over the top-level elements. Big
+    sections like <profiles> are cut out before the XML is parsed; of <build>,
+    only the coordinates of the plugins are parsed.
+    '''
+    with open(path, mode='rb') as fh:
+        data = fh.read()
+
+    namespace = Pom.NAMESPACE
+    builds = []
+    def skipSection(match):
+        if match.group(1) == b'build':
+            builds.append(match.group(0))
+        return b''
+
+    try:
+        root = ET.fromstring(SKIPPED_SECTIONS.sub(skipSection, data))
+        # Without the declaration of the namespace, the elements of the fragment have none
+        build = ET.fromstring(PLUGIN_DETAILS.sub(b'', builds[0])) if len(builds) > 0 else None
+        buildNamespace = ''
+    except ET.ParseError:
+        # For example a comment with only the start of a section in it
+        root = ET.fromstring(data)
+        build = root.find(f'{namespace}build')
+        buildNamespace = namespace
+
+    expected = f'{namespace}project'
+    if root.tag != expected:
+        raise Exception(f"{path}: Expected {expected!r} but was {root.tag!r}")
+
+    result = PomMetadata()
+    parent = {}
+    dependencies = []
+    for elem in root:
+        tag = elem.tag[len(namespace):] if elem.tag.startswith(namespace) else None
+        if tag in ('groupId', 'artifactId', 'version', 'packaging', 'name'):
+            setattr(result, tag, elem.text)
+        elif tag == 'parent':
+            parent = {it.tag[len(namespace):]: it.text for it in elem if isinstance(it.tag, str)}
+        elif tag == 'modules':
+            result.modules = [it.text for it in elem if it.tag == f'{namespace}module']
+        elif tag == 'dependencies':
+            dependencies = dependencyKeys(elem, namespace)
+
+    if len(parent) > 0:
+        result.parent = ':'.join(parent.get(it) or '' for it in ('groupId', 'artifactId', 'version'))
+        if result.groupId is None:
+            result.groupId = parent.get('groupId')
+        if result.version is None:
+            result.version = parent.get('version')
+        if result.artifactId is None:
+            result.artifactId = parent.get('artifactId')
+
+    result.dependencies = [resolveGroupId(groupId, result.groupId) + ':' + artifactId for groupId, artifactId in dependencies]
+    result.plugins = [resolveGroupId(groupId, result.groupId) + ':' + artifactId for groupId, artifactId in pluginKeys(build, buildNamespace)]
+    return result
+
 class Pom:
+    '''The whole document tree of a POM. Use readPomMetadata() when only the metadata is needed.'''
     NAMESPACE = '{http://maven.apache.org/POM/4.0.0}'
     def __init__(self, path):
-        path = path.resolve()
-        if path.is_dir():
-            path = path / 'pom.xml'
-        if not (path.is_file() and path.name == 'pom.xml'):
-            raise FileNotFoundError(f'Expected path to pom.xml: {path}')
-
-        self.path = path
+        self.path = pomPath(path)
 
         self.parse()
 
@@ -74,6 +214,10 @@ class Pom:
         elem = self.packagingElem()
         return 'jar' if elem is None else elem.text
 
+    @property
+    def name(self):
+        return self.root.findtext(f'{self.NAMESPACE}name')
+
     def modulesElem(self):
         name = f'{self.NAMESPACE}modules'
         return self.root.find(name)
@@ -89,6 +233,35 @@ class Pom:
             for it in elem.findall(f'{self.NAMESPACE}module')
         )
 
+    @property
+    def parent(self):
+        elem = self.parentElem()
+        if elem is None:
+            return None
+
+        return ':'.join(elem.findtext(f'{self.NAMESPACE}{name}', '') for name in ('groupId', 'artifactId', 'version'))
+
+    @property
+    def dependencies(self):
+        '''groupId:artifactId of the dependencies, without the ones in dependencyManagement.'''
+        groupId = self.groupId
+        return [
+            resolveGroupId(dependencyGroupId, groupId) + ':' + artifactId
+            for dependencyGroupId, artifactId in dependencyKeys(self.root.find(f'{self.NAMESPACE}dependencies'), self.NAMESPACE)
+        ]
+
+    @property
+    def plugins(self):
+        '''groupId:artifactId of the build plugins and extensions plus the dependencies of the plugins.'''
+        groupId = self.groupId
+        return [
+            resolveGroupId(pluginGroupId, groupId) + ':' + artifactId
+            for pluginGroupId, artifactId in pluginKeys(self.root.find(f'{self.NAMESPACE}build'), self.NAMESPACE)
+        ]
+
+    def metadata(self):
+        return PomMetadata(self.groupId, self.artifactId, self.version, self.packaging, self.modules, self.parent, self.dependencies, self.plugins, self.name)
+
     def childPom(self, moduleName):
         return Pom(self.path.parent / moduleName)
 
@@ -104,3 +277,173 @@ class Pom:
 
     def __repr__(self):
         return f'Pom({self.path})'
+
+class CachedPom:
+    '''Like Pom but with the metadata from a PomCache. Child POMs come from the same cache.'''
+
+    def __init__(self, cache, path, metadata):
+        self.cache = cache
+        self.path = path
+        self.metadata = metadata
+
+    groupId = property(lambda self: self.metadata.groupId)
+    artifactId = property(lambda self: self.metadata.artifactId)
+    version = property(lambda self: self.metadata.version)
+    packaging = property(lambda self: self.metadata.packaging)
+    modules = property(lambda self: self.metadata.modules)
+    parent = property(lambda self: self.metadata.parent)
+    dependencies = property(lambda self: self.metadata.dependencies)
+    plugins = property(lambda self: self.metadata.plugins)
+    name = property(lambda self: self.metadata.name)
+    displayName = property(lambda self: self.metadata.displayName)
+    coordinate = property(lambda self: self.metadata.coordinate)
+
+    def childPom(self, moduleName):
+        return self.cache.pom(self.path.parent / moduleName)
+
+    @property
+    def childPoms(self):
+        return list(
+            self.childPom(name)
+            for name in self.modules
+        )
+
+    def __eq__(self, other):
+        return self.path.samefile(other.path)
+
+    def __repr__(self):
+        return f'CachedPom({self.path})'
+
+class PomCache:
+    '''
+    Remembers the metadata of the POMs of a project in a JSON file. An entry is
+    used as long as size and modification time of the pom.xml are the same;
+    otherwise the POM is parsed again.
+    '''
+    VERSION = 4
+    # Parsing fewer POMs isn't worth sending them to the executor
+    PARALLEL_THRESHOLD = 16
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.used = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except Exception as ex:
+            print(f'Ignoring broken POM cache {self.path}: {ex}')
+            return
+
+        if data.get('version') == self.VERSION:
+            self.entries = {
+                key: (entry['mtime'], entry['size'], PomMetadata.unpickle(entry['pom']))
+                for key, entry in data['poms'].items()
+            }
+
+    def pom(self, path):
+        return self.poms([pomPath(path)])[0]
+
+    def poms(self, paths, executor=None):
+        '''Returns a CachedPom for each path to a pom.xml. When there are many outdated entries, the executor parses them in parallel.'''
+        stats = {it: it.stat() for it in paths}
+
+        outdated = []
+        for path, stat in stats.items():
+            entry = self.entries.get(str(path))
+            if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                outdated.append(path)
+
+        if executor is not None and len(outdated) >= self.PARALLEL_THRESHOLD:
+            parsed = executor.map(readPomMetadata, outdated, chunksize=8)
+        else:
+            parsed = map(readPomMetadata, outdated)
+
+        for path, metadata in zip(outdated, parsed):
+            stat = stats[path]
+            self.entries[str(path)] = (stat.st_mtime_ns, stat.st_size, metadata)
+            self.dirty = True
+
+        self.hits += len(paths) - len(outdated)
+        self.misses += len(outdated)
+
+        result = []
+        for path in paths:
+            key = str(path)
+            self.used.add(key)
+            result.append(CachedPom(self, path, self.entries[key][2]))
+        return result
+
+    def scan(self, path, executor=None, levelScanned=None):
+        '''
+        Returns the module tree below the POM in path as a list of (level,
+        CachedPom) tuples, depth first like Maven lists them. The tree is read
+        one level after the other; the POMs of a level are parsed in parallel.
+        levelScanned(items) gets the part of the tree which is known after each
+        level. The cache is saved at the end.
+        '''
+        with self.lock:
+            root = self.pom(path)
+            children = {root.path: []}
+            level = [root]
+            while len(level) > 0:
+                paths = []
+                for pom in level:
+                    childPaths = [pomPath(pom.path.parent / it) for it in pom.modules]
+                    # A module which is listed twice or points back up would loop forever
+                    childPaths = [it for it in childPaths if it not in children and it not in paths]
+                    children[pom.path] = childPaths
+                    paths.extend(childPaths)
+
+                level = self.poms(paths, executor)
+                for pom in level:
+                    children[pom.path] = []
+
+                if levelScanned is not None:
+                    levelScanned(self.moduleTree(root, children))
+
+            self.save()
+            return self.moduleTree(root, children)
+
+    def moduleTree(self, root, children):
+        result = []
+        stack = [(0, root.path)]
+        while len(stack) > 0:
+            level, path = stack.pop()
+            result.append((level, CachedPom(self, path, self.entries[str(path)][2])))
+            stack.extend((level + 1, it) for it in reversed(children[path]))
+        return result
+
+    def save(self):
+        '''Writes the entries which were used since load(); POMs which are no longer part of the project are forgotten.'''
+        unused = set(self.entries) - self.used
+        if self.path is None or not (self.dirty or unused):
+            return
+
+        for key in unused:
+            del self.entries[key]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_name(self.path.name + '.tmp')
+        with open(tmpPath, mode='w', encoding='utf-8') as fh:
+            poms = {
+                key: {'mtime': mtime, 'size': size, 'pom': metadata.pickle()}
+                for key, (mtime, size, metadata) in self.entries.items()
+            }
+            json.dump({'version': self.VERSION, 'poms': poms}, fh)
+        os.replace(tmpPath, self.path)
+        self.dirty = False
+
+    def statistics(self):
+        return f'{self.hits} POMs from the cache, {self.misses} parsed'
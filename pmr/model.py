@@ -3,13 +3,24 @@
 
 import re
 import json
-from pmr.maven import Pom
+from pmr.changes import ChangeDetector, ResumePoint
+from pmr.ingest import BLOCK, OVERLOAD_POLICIES, IngestPipeline
+from pmr.logging import projectDataFolder
+from pmr.maven import Pom, PomCache
+from pmr.reactor import BuildTimes, ReactorGraph
 
 class Project:
     def __init__(self, path):
         self.path = path
         self.name = path.name
         self._rootPom = None
+        self._pomCache = None
+        # (level, CachedPom) of the last scan of the module tree
+        self.modules = None
+        self._reactor = None
+        self._changes = None
+        self._buildTimes = None
+        self._resumePoint = None
         self._preferences = None
 
     @property
@@ -19,6 +30,51 @@ class Project:
 
         return self._rootPom
 
+    @property
+    def pomCache(self):
+        if self._pomCache is None:
+            self._pomCache = PomCache(projectDataFolder(self) / 'poms.json')
+            self._pomCache.load()
+
+        return self._pomCache
+
+    @property
+    def reactor(self):
+        '''The ReactorGraph of the last scan of the module tree.'''
+        if self.modules is None:
+            self.modules = self.pomCache.scan(self.path)
+
+        if self._reactor is None:
+            self._reactor = ReactorGraph(self.modules)
+        else:
+            self._reactor.update(self.modules)
+
+        return self._reactor
+
+    @property
+    def changes(self):
+        if self._changes is None:
+            self._changes = ChangeDetector(projectDataFolder(self) / 'changes.json')
+            self._changes.load()
+
+        return self._changes
+
+    @property
+    def buildTimes(self):
+        if self._buildTimes is None:
+            self._buildTimes = BuildTimes(projectDataFolder(self) / 'buildtimes.json')
+            self._buildTimes.load()
+
+        return self._buildTimes
+
+    @property
+    def resumePoint(self):
+        if self._resumePoint is None:
+            self._resumePoint = ResumePoint(projectDataFolder(self) / 'resume.json')
+            self._resumePoint.load()
+
+        return self._resumePoint
+
     @property
     def preferences(self):
         if self._preferences is None:
@@ -344,7 +400,7 @@ class CustomPatternPreferences:
             raise Exception(f'Unsupported matcher {data!r}')
 
 class MavenPreferences:
-    START_ALL, START_FIRST_CHANGE, START_WITH, BUILD_ONLY, BUILD_UP_TO, BUILD_SELECTED, START_OPTION_COUNT = range(7)
+    START_ALL, START_FIRST_CHANGE, START_WITH, BUILD_ONLY, BUILD_UP_TO, BUILD_SELECTED, BUILD_CHANGED, RESUME_FAILED, START_OPTION_COUNT = range(9)
     START_OPTION_NAMES = {
         START_ALL: 'START_ALL',
         START_FIRST_CHANGE: 'START_FIRST_CHANGE',
@@ -352,15 +408,26 @@ class MavenPreferences:
         BUILD_ONLY: 'BUILD_ONLY',
         BUILD_UP_TO: 'BUILD_UP_TO',
         BUILD_SELECTED: 'BUILD_SELECTED',
+        BUILD_CHANGED: 'BUILD_CHANGED',
+        RESUME_FAILED: 'RESUME_FAILED',
     }
 
+    # What BUILD_SELECTED builds besides the selected modules
+    ALSO_MAKE_OPTIONS = ('', '--also-make', '--also-make-dependents')
+    # Values of "--threads"; '' builds one module after the other. "1C" is one thread per CPU core
+    THREADS_OPTIONS = ('', '2', '4', '8', '1C', '2C')
+
     DEFAULT_GOALS = 'clean install'
     DEFAULT_START_OPTION = START_ALL
+    DEFAULT_ALSO_MAKE = '--also-make'
+    DEFAULT_THREADS = ''
 
     def __init__(self):
         self.goals = self.DEFAULT_GOALS
         self.startOption = self.DEFAULT_START_OPTION
         self.moduleList = []
+        self.alsoMake = self.DEFAULT_ALSO_MAKE
+        self.threads = self.DEFAULT_THREADS
 
     def pickle(self):
         result = {}
@@ -373,6 +440,12 @@ class MavenPreferences:
         if len(self.moduleList) > 0:
             result['moduleList'] = self.moduleList
 
+        if self.alsoMake != self.DEFAULT_ALSO_MAKE:
+            result['alsoMake'] = self.alsoMake
+
+        if self.threads != self.DEFAULT_THREADS:
+            result['threads'] = self.threads
+
         return None if len(result) == 0 else result
 
     def unpickle(self, data):
@@ -390,6 +463,69 @@ class MavenPreferences:
         self.moduleList = data.get('moduleList', [])
         # TODO validate
 
+        self.alsoMake = data.get('alsoMake', self.DEFAULT_ALSO_MAKE)
+        if self.alsoMake not in self.ALSO_MAKE_OPTIONS:
+            self.alsoMake = self.DEFAULT_ALSO_MAKE
+
+        self.threads = data.get('threads', self.DEFAULT_THREADS)
+        if self.threads not in self.THREADS_OPTIONS:
+            self.threads = self.DEFAULT_THREADS
+
+class LogPreferences:
+    DEFAULT_MAX_COUNT = 20
+    DEFAULT_MAX_SIZE_MB = 1024
+    DEFAULT_MAX_AGE_DAYS = 30
+
+    def __init__(self):
+        self.maxCount = self.DEFAULT_MAX_COUNT
+        self.maxSizeMB = self.DEFAULT_MAX_SIZE_MB
+        self.maxAgeDays = self.DEFAULT_MAX_AGE_DAYS
+
+    def pickle(self):
+        result = {}
+        if self.maxCount != self.DEFAULT_MAX_COUNT:
+            result['maxCount'] = self.maxCount
+        if self.maxSizeMB != self.DEFAULT_MAX_SIZE_MB:
+            result['maxSizeMB'] = self.maxSizeMB
+        if self.maxAgeDays != self.DEFAULT_MAX_AGE_DAYS:
+            result['maxAgeDays'] = self.maxAgeDays
+
+        return None if len(result) == 0 else result
+
+    def unpickle(self, data):
+        self.maxCount = data.get('maxCount', self.DEFAULT_MAX_COUNT)
+        self.maxSizeMB = data.get('maxSizeMB', self.DEFAULT_MAX_SIZE_MB)
+        self.maxAgeDays = data.get('maxAgeDays', self.DEFAULT_MAX_AGE_DAYS)
+
+class OutputPreferences:
+    DEFAULT_OVERLOAD_POLICY = BLOCK
+    DEFAULT_QUEUE_SIZE = IngestPipeline.DEFAULT_CAPACITY
+
+    def __init__(self):
+        self.overloadPolicy = self.DEFAULT_OVERLOAD_POLICY
+        self.queueSize = self.DEFAULT_QUEUE_SIZE
+        self.parserProcess = False # Read and parse the output of Maven in a worker process
+
+    def pickle(self):
+        result = {}
+        if self.overloadPolicy != self.DEFAULT_OVERLOAD_POLICY:
+            result['overloadPolicy'] = self.overloadPolicy
+        if self.queueSize != self.DEFAULT_QUEUE_SIZE:
+            result['queueSize'] = self.queueSize
+        if self.parserProcess:
+            result['parserProcess'] = True
+
+        return None if len(result) == 0 else result
+
+    def unpickle(self, data):
+        self.overloadPolicy = data.get('overloadPolicy', self.DEFAULT_OVERLOAD_POLICY)
+        if self.overloadPolicy not in OVERLOAD_POLICIES:
+            print(f'WARN Unsupported overload policy {self.overloadPolicy!r}, using {self.DEFAULT_OVERLOAD_POLICY!r}')
+            self.overloadPolicy = self.DEFAULT_OVERLOAD_POLICY
+
+        self.queueSize = data.get('queueSize', self.DEFAULT_QUEUE_SIZE)
+        self.parserProcess = data.get('parserProcess', False)
+
 class ProjectPreferences:
     def __init__(self, project, defaults=None):
         if defaults is None:
@@ -403,6 +539,8 @@ class ProjectPreferences:
     def reset(self):
         self.customPatternPreferences = CustomPatternPreferences(self.defaults.customPatternDefaults)
         self.maven = MavenPreferences()
+        self.logs = LogPreferences()
+        self.output = OutputPreferences()
 
     def load(self):
         self.reset()
@@ -426,6 +564,14 @@ class ProjectPreferences:
         if value is not None:
             self.maven.unpickle(value)
 
+        value = data.get('logs')
+        if value is not None:
+            self.logs.unpickle(value)
+
+        value = data.get('output')
+        if value is not None:
+            self.output.unpickle(value)
+
     def pickle(self):
         data = {}
 
@@ -437,6 +583,14 @@ class ProjectPreferences:
         if value is not None:
             data['maven'] = value
 
+        value = self.logs.pickle()
+        if value is not None:
+            data['logs'] = value
+
+        value = self.output.pickle()
+        if value is not None:
+            data['output'] = value
+
         return data
 
     def getPath(self):
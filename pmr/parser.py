@@ -0,0 +1,670 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+import re
+from pmr.ingest import REPLAYING, EarlyRecords, PipelineEmitter
+from pmr.logging import DummyLogger
+from pmr.model import LogLevelStrategy, LogLevelStrategyFactory
+
+# The parsers don't depend on Qt. "runner" is anything which has an object with
+# an emit() method for each signal of the MavenRunner, so they can also run in a
+# worker process.
+
+# Names of the signals which the parsers emit
+SIGNAL_NAMES = (
+    'mavenStarted', 'reactorBuildOrder', 'mavenModule', 'mavenPlugin', 'testsStarted', 'startedTest',
+    'finishedTest', 'testOutput', 'testsFinished', 'reactorSummary', 'output', 'warning', 'error',
+    'mavenFinished', 'progress', 'resumeDetected', 'hr', 'dependencyTree',
+)
+
+# With this option, Maven puts the name of the thread in front of each line: "[BuilderThread 1] [INFO] ..."
+THREAD_NAME_OPTION = '-Dorg.slf4j.simpleLogger.showThreadName=true'
+LOG_LEVELS = ('[INFO]', '[WARNING]', '[ERROR]', '[DEBUG]', '[TRACE]')
+
+def splitThreadName(line):
+    '''Returns (thread name, rest of the line) for lines like "[main] [INFO] ..." or None.'''
+    if not line.startswith('[') or line.startswith(LOG_LEVELS):
+        return None
+
+    pos = line.find('] ')
+    if pos == -1 or not line.startswith(LOG_LEVELS, pos + 2):
+        return None
+    return line[1:pos], line[pos+2:]
+
+class UnitTestParser:
+    def __init__(self, runner, customPatternPreferences, logger, endOfTests, nextPlugin):
+        self.runner = runner
+        self.endOfTests = endOfTests # callback(numberOfTests, failures, errors, skipped)
+        self.nextPlugin = nextPlugin # callback('[INFO] --- ...')
+        self.customPatternPreferences = customPatternPreferences
+        self.logger = logger
+        
+        self.state = self.skipTestHeaders
+        self.linesWithDashes = 0
+        self.lastFewLines = []
+
+        factory = LogLevelStrategyFactory(self.customPatternPreferences)
+        self.logLevelStrategy = factory.build()
+
+        self.signalPerLogLevel = {
+            LogLevelStrategy.ERROR: self.runner.error,
+            LogLevelStrategy.WARNING: self.runner.warning,
+            # TODO
+            #LogLevelStrategy.INFO: self.runner.info,
+            #LogLevelStrategy.DEBUG: self.runner.debug,
+            #LogLevelStrategy.TRACE: self.runner.trace,
+            LogLevelStrategy.INFO: self.runner.testOutput,
+            LogLevelStrategy.DEBUG: self.runner.testOutput,
+            LogLevelStrategy.TRACE: self.runner.testOutput,
+            LogLevelStrategy.UNKNOWN: self.runner.testOutput,
+        }
+        
+    def parse(self, line):
+        try:
+            #print(self.state, repr(line))
+            self.state(line)
+        except Exception as ex:
+            raise Exception(f'Error processing {line!r}') from ex
+
+    def skipTestHeaders(self, line):
+        line = line.strip()
+        if len(line) == 0:
+            return
+        
+        if line == '[INFO] No tests to run.':
+            self.runner.output.emit(line)
+            self.state = self.done
+
+            numberOfTests = 0
+            failures = 0
+            errors = 0
+            skipped = 0
+            self.endOfTests(numberOfTests, failures, errors, skipped)
+            return
+
+        if line == '[INFO] Tests are skipped.':
+            self.runner.output.emit(line)
+            self.state = self.done
+
+            numberOfTests = 0
+            failures = 0
+            errors = 0
+            skipped = 0
+            self.endOfTests(numberOfTests, failures, errors, skipped)
+            return
+
+        if len(line.strip('-')) == 0:
+            if self.linesWithDashes == 0:
+                self.runner.testsStarted.emit()
+
+            self.linesWithDashes += 1
+            if self.linesWithDashes == 2:
+                self.state = self.parseUnitTestOutput
+                return
+
+        if line.startswith('[INFO]'):
+            self.runner.output.emit(line)
+            return
+
+        # Ignore anything else
+
+    TEST_START_PREFIX = 'Running '
+    TEST_FINISHED_PREFIX = 'Tests run: '
+    TEST_FINISHED_PATTERN = re.compile(r'Tests run: (\d+), Failures: (\d+), Errors: (\d+), Skipped: (\d+), Time elapsed: (.*)')
+    TESTS_FINISHED_PATTERN = re.compile(r'Tests run: (\d+), Failures: (\d+), Errors: (\d+), Skipped: (\d+)')
+    FAILURE_PATTERN = '<<< FAILURE!'
+
+    def parseUnitTestOutput(self, line):
+        if line.startswith(self.TEST_START_PREFIX):
+            name = line[len(self.TEST_START_PREFIX):].strip()
+            self.currentTest = name
+            self.runner.startedTest.emit(name)
+            return
+        
+        if line.startswith(self.TEST_FINISHED_PREFIX):
+            match = self.TEST_FINISHED_PATTERN.fullmatch(line)
+            if match is not None:
+                numberOfTests = int(match.group(1))
+                failures = int(match.group(2))
+                errors = int(match.group(3))
+                skipped = int(match.group(4))
+                duration = match.group(5)
+                self.runner.finishedTest.emit(self.currentTest, numberOfTests, failures, errors, skipped, duration)
+                return
+        
+        if line.endswith(self.FAILURE_PATTERN):
+            signal = self.signalPerLogLevel[LogLevelStrategy.ERROR]
+            signal.emit(line)
+            return
+
+        if line == '':
+            self.lastFewLines = ['']
+            self.state = self.mightBeEndOfTests1
+            return
+        
+        level = self.logLevelStrategy.apply(line)
+        signal = self.signalPerLogLevel[level]
+        signal.emit(line)
+    
+    def wasSomethingElse(self):
+        n = len(self.lastFewLines)
+        self.logger.log('MTESTPARSER.wasSomethingElse', f'Emitting {n} lines')
+        for line in self.lastFewLines:
+            self.runner.testOutput.emit(line)
+        
+        self.lastFewLines = []
+        self.state = self.parseUnitTestOutput
+    
+    def mightBeEndOfTests1(self, line):
+        self.logger.log('MTESTPARSER.mightBeEndOfTests1', repr(line))
+        if line.endswith(self.FAILURE_PATTERN):
+            self.wasSomethingElse()
+            signal = self.signalPerLogLevel[LogLevelStrategy.ERROR]
+            signal.emit(line)
+            return
+
+        self.lastFewLines.append(line)
+        if line == 'Results :':
+            self.state = self.mightBeEndOfTests3
+        elif line == '':
+            return
+        else:
+            self.wasSomethingElse()
+    
+    def mightBeEndOfTests3(self, line):
+        self.logger.log('MTESTPARSER.mightBeEndOfTests3', repr(line))
+        self.lastFewLines.append(line)
+        if line.startswith('Tests run: '):
+            self.testSummaryLine = line
+            self.state = self.mightBeEndOfTests5
+            self.flushLastFewLines()
+        elif line.startswith('Failed tests:') or line.startswith('Tests in error:'):
+            self.lastFewLines.pop(-1)
+            self.flushLastFewLines()
+            self.runner.error.emit(line)
+
+            self.state = self.mightBeEndOfTests4
+        elif line == '':
+            pass
+        else:
+            self.wasSomethingElse()
+
+    def flushLastFewLines(self):
+        for line in self.lastFewLines:
+            self.runner.testOutput.emit(line)
+
+        self.lastFewLines = []
+
+    def mightBeEndOfTests4(self, line):
+        self.logger.log('MTESTPARSER.mightBeEndOfTests4', repr(line))
+        if line.startswith('Tests run: '):
+            self.testSummaryLine = line
+            self.state = self.mightBeEndOfTests5
+            return
+
+        self.runner.error.emit(line)
+    
+    def mightBeEndOfTests5(self, line):
+        self.logger.log('MTESTPARSER.mightBeEndOfTests5', repr(line))
+        if line.startswith('[INFO] '):
+            self.flushLastFewLines()
+            self.emitTestSummary()
+
+            if line[7:].strip('-') == '':
+                self.runner.hr.emit()
+
+            if line.startswith('[INFO] --- '):
+                self.nextPlugin(line)
+
+            self.state = self.done
+
+    def emitTestSummary(self):
+        self.logger.log('MTESTPARSER.emitTestSummary', 'Emitting end-of-tests signal')
+        match = self.TESTS_FINISHED_PATTERN.fullmatch(self.testSummaryLine)
+        if match is None:
+            raise Exception(f"Can't parse final test result: {self.testSummaryLine!r}")
+        
+        numberOfTests = int(match.group(1))
+        failures = int(match.group(2))
+        errors = int(match.group(3))
+        skipped = int(match.group(4))
+        
+        self.endOfTests(numberOfTests, failures, errors, skipped)
+
+    def done(self, line):
+        raise Exception(f'Called after end of tests: {line!r}')
+
+class ModuleOutput:
+    '''The lines of one module of a parallel build.'''
+    __slots__ = ('thread', 'lines', 'named', 'finished', 'parser')
+
+    def __init__(self, thread, parser=None):
+        self.thread = thread
+        self.lines = [] # (number of the line in the log, text) of the held back lines
+        self.named = False # Saw the "Building name [i/n]" line
+        self.finished = False
+        self.parser = parser # Reads the held back lines ahead
+
+class ReadAhead:
+    '''
+    Parses the lines which ThreadDemultiplexer holds back as they arrive, with
+    a parser per module, so the errors and failed tests of all modules reach
+    the priority lane of the pipeline at once. Their records are tagged with
+    the stream of the module. When the held back lines are parsed for real,
+    the pipeline doesn't copy them to the priority lane again.
+    '''
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.pipeline = parser.runner.pipeline
+        self.streams = 0
+
+    def createParser(self):
+        self.streams += 1
+        emitter = PipelineEmitter(EarlyRecords(self.pipeline, self.streams), SIGNAL_NAMES)
+        result = MavenOutputParser(emitter, self.parser.customPatternPreferences, DummyLogger())
+        # A module starts in the output state; that's all the parser needs to know
+        result.isReactorBuild = self.parser.isReactorBuild
+        return result
+
+    def replay(self, parser, lines, sink):
+        '''Passes the held back lines of a module on; the rest of it is passed on as it comes.'''
+        # Before the lines, so the UI knows where the rest goes before it sees them
+        parser.runner.pipeline.live()
+
+        self.pipeline.put(REPLAYING, (True,))
+        try:
+            for number, text in lines:
+                sink(number, text)
+        finally:
+            self.pipeline.put(REPLAYING, (False,))
+
+class ThreadDemultiplexer:
+    '''
+    Puts the interleaved output of a parallel build (mvn -T) back into the
+    order of a serial build, so the parser sees each module from its header to
+    the start of the next one. The thread names tell which module a line
+    belongs to. The module which started first is passed on as it comes; the
+    lines of the other modules wait until all modules which started before
+    them are done. A module is done when its thread starts the next one or
+    when a thread which builds no module logs something, like the reactor
+    summary.
+
+    Maven logs an empty line on the thread of a module right before its
+    header. Empty lines are therefore kept until the next line of their
+    thread shows whether they belong to a new module, so they don't end the
+    modules in flight or stick to the previous module of the thread. A thread
+    which logs something else without building a module doesn't build
+    modules at all.
+
+    Lines without the name of a thread (stack traces, output of tests) are
+    given to the thread of the last line which had a name. That's only a
+    guess: Maven doesn't say where they come from, so when two threads
+    write such lines at the same time, some of them end up in the wrong
+    module.
+
+    With readAhead, the held back lines are also parsed right away, so
+    their errors don't have to wait for the modules before them.
+
+    With a logger, the events which the parser finds in the held back lines
+    are put into the index of the log at the lines where they were logged,
+    not at the line which released them.
+    '''
+    # "[INFO] ---------< group:artifact >---------"
+    MODULE_HEADER_PATTERN = re.compile(r'\[INFO\] -+< \S+ >-+')
+    # "[INFO] Building name version [i/n]"
+    PROGRESS_PATTERN = re.compile(r'\[\d+/\d+\]\s*$')
+
+    def __init__(self, sink, readAhead=None, logger=None):
+        self.sink = sink
+        self.readAhead = readAhead
+        self.logger = logger
+        self.modules = [] # ModuleOutput in the order in which they started; the lines of the first one go to the sink at once
+        self.current = {} # thread name -> ModuleOutput
+        self.preambles = {} # thread name -> lines before the header of its next module
+        self.others = set() # Threads which log without building a module
+        self.lastThread = None
+
+        # Statistics
+        self.buffered = 0
+
+    def add(self, line):
+        split = splitThreadName(line)
+        if split is None:
+            # Stack traces, output of tests: Only the first line has the name of the thread
+            thread, text = self.lastThread, line
+        else:
+            thread, text = split
+            self.lastThread = thread
+
+        number = None if self.logger is None else self.logger.currentOutputLine()
+        module = self.current.get(thread)
+        preamble = self.preambles.pop(thread, [])
+        if self.isModuleStart(text, module):
+            if module is not None:
+                module.finished = True
+                self.advance()
+            # Only the lines of modules which have to wait are read ahead
+            readAhead = self.readAhead is not None and len(self.modules) > 0
+            module = ModuleOutput(thread, self.readAhead.createParser() if readAhead else None)
+            self.modules.append(module)
+            self.current[thread] = module
+            self.others.discard(thread)
+        elif thread not in self.others and text.rstrip() == '[INFO]':
+            preamble.append((number, text))
+            self.preambles[thread] = preamble
+            return
+        elif module is None:
+            self.others.add(thread)
+            self.flush()
+            for line in preamble:
+                self.sinkLine(*line)
+            self.sinkLine(number, text)
+            return
+
+        for line in preamble:
+            self.append(module, *line)
+
+        if text.startswith(MavenOutputParser.MODULE_START_PREFIX):
+            module.named = True
+
+        self.append(module, number, text)
+        self.advance()
+
+    def append(self, module, number, text):
+        if module is self.modules[0]:
+            self.sinkLine(number, text)
+        else:
+            module.lines.append((number, text))
+            self.buffered += 1
+            if module.parser is not None:
+                module.parser.parseLine(text)
+
+    def sinkLine(self, number, text):
+        '''Passes a line on; the events of the parser belong to the line with the number in the log.'''
+        if self.logger is None or number is None:
+            self.sink(text)
+            return
+
+        self.logger.eventLine = number
+        try:
+            self.sink(text)
+        finally:
+            self.logger.eventLine = None
+
+    def isModuleStart(self, text, module):
+        if text.startswith('[INFO] --') and self.MODULE_HEADER_PATTERN.fullmatch(text) is not None:
+            return True
+        # Old versions of Maven don't show the header
+        return (module is None or module.named) \
+            and text.startswith(MavenOutputParser.MODULE_START_PREFIX) \
+            and self.PROGRESS_PATTERN.search(text) is not None
+
+    def advance(self):
+        while len(self.modules) > 0 and self.modules[0].finished:
+            self.modules.pop(0)
+            if len(self.modules) > 0:
+                head = self.modules[0]
+                lines, head.lines = head.lines, []
+                if head.parser is None:
+                    for number, text in lines:
+                        self.sinkLine(number, text)
+                else:
+                    parser, head.parser = head.parser, None
+                    self.readAhead.replay(parser, lines, self.sinkLine)
+
+    def flush(self):
+        '''Pass on the lines of all modules and the ones which waited for a module; they are all done.'''
+        preambles, self.preambles = self.preambles, {}
+        for thread, lines in preambles.items():
+            module = self.current.get(thread)
+            if module is not None:
+                for line in lines:
+                    self.append(module, *line)
+
+        for module in self.modules:
+            module.finished = True
+        self.advance()
+
+        for thread, lines in preambles.items():
+            if thread not in self.current:
+                for line in lines:
+                    self.sinkLine(*line)
+        self.current = {}
+
+    @property
+    def inFlight(self):
+        return len(self.modules) > 0
+
+    def statistics(self):
+        return f'{self.buffered} lines buffered, {len(self.modules)} modules in flight'
+
+class MavenOutputParser:
+    def __init__(self, runner, customPatternPreferences, logger):
+        self.runner = runner
+        self.customPatternPreferences = customPatternPreferences
+        self.logger = logger
+
+        self.state = self.output
+        self.isReactorBuild = False
+        self.currentPlugin = ('', '', '')
+        # Created at the first line with the name of a thread
+        self.threads = None
+
+    def parse(self, line):
+        if self.threads is None:
+            if splitThreadName(line) is None:
+                self.parseLine(line)
+                return
+
+            print('Parser: Found names of threads; demultiplexing the output of a parallel build')
+            pipeline = getattr(self.runner, 'pipeline', None)
+            readAhead = ReadAhead(self) if getattr(pipeline, 'acceptsEarlyRecords', False) else None
+            logger = self.logger if hasattr(self.logger, 'currentOutputLine') else None
+            self.threads = ThreadDemultiplexer(self.parseLine, readAhead, logger)
+        self.threads.add(line)
+
+    def parseLine(self, line):
+        try:
+            self.state(line)
+        except Exception as ex:
+            raise Exception(f'Error processing {line!r}') from ex
+
+    def flush(self):
+        '''Call this after the last line. Parses the lines of a parallel build which are still waiting.'''
+        if self.threads is not None:
+            self.threads.flush()
+            print(f'Parser: {self.threads.statistics()}')
+
+    MODULE_START_PREFIX = '[INFO] Building '
+    SUMMARY_START_PREFIX = '[INFO] Reactor Summary'
+    MAVEN_PLUGIN_PREFIX = '[INFO] --- '
+    MAVEN_PLUGIN_SUFFIX = ' ---'
+    MAVEN_RESUME_PATTERN = re.compile(r'\[ERROR\]\s+mvn <[^>]+> -rf (\S+)')
+    # Plugins which log "[INFO] Building ..." lines of their own
+    BUILDING_PLUGINS = ('maven-jar-plugin', 'maven-source-plugin')
+
+    def context(self):
+        '''
+        The part of the state which decides how the following lines are parsed,
+        as long as the parser is in the output state. Two parsers with the same
+        context produce the same events for the same lines.
+        '''
+        if self.threads is not None and self.threads.inFlight:
+            # The waiting lines of a parallel build aren't part of the context
+            return ('parallel', self.isReactorBuild, self.currentPlugin[0] in self.BUILDING_PLUGINS)
+        return (self.state.__name__, self.isReactorBuild, self.currentPlugin[0] in self.BUILDING_PLUGINS)
+
+    def restoreContext(self, context):
+        '''Continue after a line where context() was returned. Only works for the output state.'''
+        state, self.isReactorBuild, building = context
+        if state != 'output':
+            raise Exception(f'Unable to continue in state {state!r}')
+
+        self.state = self.output
+        self.currentPlugin = (self.BUILDING_PLUGINS[0], '', '') if building else ('', '', '')
+
+    def output(self, line):
+        if line == '[INFO] Reactor Build Order:':
+            self.state = self.reactorBuildOrderSkipEmptyLine
+            self.isReactorBuild = True
+            return
+        if line.startswith(self.MODULE_START_PREFIX):
+            if self.currentPlugin[0] in self.BUILDING_PLUGINS:
+                self.runner.output.emit(line)
+                return
+
+            self.detectedModuleStart(line[len(self.MODULE_START_PREFIX):])
+            return
+        if line.startswith(self.SUMMARY_START_PREFIX):
+            self.delectedSummaryStart(line[len(self.SUMMARY_START_PREFIX):])
+            return
+        if line.startswith(self.MAVEN_PLUGIN_PREFIX) and line.endswith(self.MAVEN_PLUGIN_SUFFIX):
+            rest = line[len(self.MAVEN_PLUGIN_PREFIX):-len(self.MAVEN_PLUGIN_SUFFIX)]
+            self.detectedMavenPlugin(rest)
+            return
+
+        if line.startswith('[WARNING]'):
+            self.runner.warning.emit(line[9:].strip())
+            return
+        if line.startswith('[ERROR]'):
+            if ' -rf ' in line:
+                print(f'Parser: Might be resume: {line!r}')
+                match = self.MAVEN_RESUME_PATTERN.fullmatch(line)
+                if match is not None:
+                    resumeOption = match.group(1)
+                    self.runner.resumeDetected.emit(resumeOption)
+                else:
+                    print(f'Parser: Resume: No match')
+            
+            self.runner.error.emit(line[7:].strip())
+            return
+        if line.startswith('[INFO] ') and line[7:].strip('-') == '':
+            self.runner.hr.emit()
+            return
+
+        self.runner.output.emit(line)
+
+    def reactorBuildOrderSkipEmptyLine(self, line):
+        if line == '[INFO]':
+            return
+
+        self.state = self.reactorBuildOrder
+        self.state(line)
+
+    def reactorBuildOrder(self, line):
+        if line == '[INFO]':
+            self.state = self.output
+            return
+
+        pos1 = line.index(']')
+        pos2 = line.find('[', pos1)
+        if pos2 == -1:
+            module = line[pos1+1:].strip()
+            packaging = ''
+        else:
+            module = line[pos1+1:pos2].strip()
+            packaging = line[pos2+1:-1]
+
+        self.runner.reactorBuildOrder.emit(module, packaging)
+
+    def detectedModuleStart(self, line):
+        if self.isReactorBuild:
+            pos1 = line.find('[')
+            if pos1 == -1:
+                namePlusVersion = line.strip()
+            else:
+                pos2 = line.index(']', pos1)
+                namePlusVersion = line[:pos1].strip()
+                progress = [int(x) for x in line[pos1+1:pos2].split('/')]
+
+                self.runner.progress.emit(*progress)
+
+            self.runner.mavenModule.emit(namePlusVersion)
+        else:
+            self.runner.mavenModule.emit(line)
+
+    def detectedMavenPlugin(self, line):
+        self.runner.mavenPlugin.emit(line.strip())
+        
+        self.currentPlugin = line.strip().split(' ')[0].split(':')
+        
+        if self.currentPlugin[0] == 'maven-surefire-plugin':
+            self.detectedStartOfUnitTests()
+        elif self.currentPlugin[0] == 'maven-dependency-plugin' and self.currentPlugin[2] == 'tree':
+            self.state = self.parseDependencyTree
+    
+    def parseDependencyTree(self, line):
+        if line.startswith('[INFO] ---------------') or line == '[INFO]':
+            self.state = self.output
+            self.output(line)
+        elif line.startswith('[INFO] '):
+            line = line[6:].strip()
+            self.runner.dependencyTree.emit(line)
+        else:
+            self.runner.warning.emit(f'Unexpected output in dependency:tree: {line!r}')
+
+    def detectedStartOfUnitTests(self):
+        self.logger.log('MPARSER', 'Detected unit test start')
+        self.testParser = UnitTestParser(self.runner, self.customPatternPreferences, self.logger, self.endOfTests, self.nextPlugin)
+        self.state = self.parseUnitTests
+
+    def parseUnitTests(self, line):
+        self.testParser.parse(line)
+
+    def nextPlugin(self, line):
+        self.output(line)
+
+    def endOfTests(self, numberOfTests, failures, errors, skipped):
+        self.runner.testsFinished.emit(numberOfTests, failures, errors, skipped)
+        self.state = self.output
+
+    def delectedSummaryStart(self, line):
+        self.state = self.reactorSummarySkipEmptyLine
+
+    def reactorSummarySkipEmptyLine(self, line):
+        if line == '[INFO]':
+            return
+
+        self.state = self.reactorSummary
+        self.state(line)
+
+    def reactorSummary(self, line):
+        if line.startswith('[INFO] ---'):
+            self.state = self.output
+            return
+
+        pos1 = line.index(']')
+        pos2 = line.find('[', pos1)
+
+        if pos2 == -1:
+            moduleAndState = line[pos1+1:].strip()
+            duration = ''
+        else:
+            moduleAndState = line[pos1+1:pos2].strip()
+            duration = line[pos2+1:-1]
+
+        pos3 = moduleAndState.rindex(' ')
+        moduleWithDots = moduleAndState[:pos3]
+        module = moduleWithDots.rstrip(' .')
+        state = moduleAndState[pos3:].strip()
+
+        self.runner.reactorSummary.emit(module, state, duration)
+
+# Events which are recorded in the index of the log file: kind -> signal name
+EVENT_SIGNALS = {
+    'module': 'mavenModule',
+    'plugin': 'mavenPlugin',
+    'startedTest': 'startedTest',
+    'finishedTest': 'finishedTest',
+    'testsFinished': 'testsFinished',
+    'warning': 'warning',
+    'error': 'error',
+    'reactorSummary': 'reactorSummary',
+    'resume': 'resumeDetected',
+}
+
+def installEventLogging(emitter, logger, *connectArgs):
+    for kind, name in EVENT_SIGNALS.items():
+        signal = getattr(emitter, name)
+        signal.connect(lambda *args, kind=kind: logger.event(kind, *args), *connectArgs)
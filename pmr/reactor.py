@@ -0,0 +1,294 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+'''
+The modules of a project and how they depend on each other, computed from the
+POMs instead of asking Maven. Doesn't import Qt.
+'''
+
+import json
+import os
+
+def moduleKey(pom):
+    '''Maven's short name of a module: groupId:artifactId'''
+    return f'{pom.groupId}:{pom.artifactId}'
+
+class ReactorGraph:
+    '''
+    A directed graph of the modules of a reactor build. A module depends on
+    (is downstream of) its parent, the modules it uses as dependencies, build
+    plugins, plugin dependencies or extensions. Like Maven, other artifacts
+    and the versions are ignored.
+
+    The results of the queries are remembered until update() sees a change.
+    '''
+
+    def __init__(self, modules=()):
+        self.poms = {} # key -> CachedPom in the order of the module tree
+        self.metadata = {} # key -> PomMetadata which the edges were computed from
+        self.upstreamEdges = {}
+        self.downstreamEdges = {}
+        self.clearMemos()
+
+        # Statistics
+        self.updates = 0
+
+        self.update(modules)
+
+    def clearMemos(self):
+        self.memoBuildOrder = None
+        self.memoUpstream = {}
+        self.memoDownstream = {}
+        self.memoCriticalPath = {}
+        self.memoNames = None
+
+    def update(self, modules):
+        '''
+        Takes the (level, CachedPom) tuples of PomCache.scan(). Only the edges
+        of modules whose metadata changed are computed again. Returns True
+        when the graph changed.
+        '''
+        poms = {moduleKey(pom): pom for level, pom in modules}
+        changed = list(poms) != list(self.poms) or any(
+            pom.metadata is not self.metadata.get(key)
+            for key, pom in poms.items()
+        )
+        if not changed:
+            return False
+
+        self.updates += 1
+        membersChanged = set(poms) != set(self.poms)
+        self.poms = poms
+
+        for key, pom in poms.items():
+            if membersChanged or pom.metadata is not self.metadata.get(key):
+                self.metadata[key] = pom.metadata
+                self.upstreamEdges[key] = self.findUpstream(key, pom)
+
+        for key in set(self.upstreamEdges) - set(poms):
+            del self.upstreamEdges[key]
+            del self.metadata[key]
+
+        self.downstreamEdges = {key: [] for key in poms}
+        for key, upstream in self.upstreamEdges.items():
+            for it in upstream:
+                self.downstreamEdges[it].append(key)
+
+        self.clearMemos()
+        return True
+
+    def findUpstream(self, key, pom):
+        candidates = list(pom.dependencies)
+        candidates.extend(pom.plugins)
+        if pom.parent is not None:
+            candidates.append(pom.parent.rsplit(':', 1)[0])
+
+        result = []
+        for it in candidates:
+            if it in self.poms and it != key and it not in result:
+                result.append(it)
+        return result
+
+    def __contains__(self, key):
+        return key in self.poms
+
+    def findByName(self, name):
+        '''
+        The key of the module which Maven shows as name in the log ("name" or
+        "name version"), or None.
+        '''
+        if self.memoNames is None:
+            self.memoNames = {}
+            for key, pom in self.poms.items():
+                self.memoNames.setdefault(pom.displayName, key)
+
+        key = self.memoNames.get(name)
+        if key is None and ' ' in name:
+            key = self.memoNames.get(name.rsplit(' ', 1)[0])
+        return key
+
+    def findByTestClass(self, name):
+        '''The key of the module which has the source of the test class name ("package.Class"), or None.'''
+        if '.' not in name:
+            return None
+
+        # Nested classes are in the file of the outer one
+        relative = name.split('$', 1)[0].replace('.', '/')
+        for key, pom in self.poms.items():
+            # src/test/java, src/test/kotlin, ...
+            if any(True for it in (pom.path.parent / 'src' / 'test').glob(f'*/{relative}.*')):
+                return key
+        return None
+
+    def upstream(self, key):
+        '''The modules which key needs directly.'''
+        return self.upstreamEdges[key]
+
+    def downstream(self, key):
+        '''The modules which need key directly.'''
+        return self.downstreamEdges[key]
+
+    def buildOrder(self):
+        '''
+        The keys of the modules in an order in which every module comes after
+        the modules it needs. Like Maven, the order of the module tree is kept
+        where the dependencies allow it. Raises an exception for cycles.
+        '''
+        if self.memoBuildOrder is None:
+            self.memoBuildOrder = self.sort()
+        return self.memoBuildOrder
+
+    def sort(self):
+        result = []
+        state = {} # key -> False while visiting, True when done
+
+        for key in self.poms:
+            if key in state:
+                continue
+            state[key] = False
+            stack = [(key, iter(self.upstreamEdges[key]))]
+
+            while len(stack) > 0:
+                current, upstream = stack[-1]
+                for it in upstream:
+                    if it not in state:
+                        state[it] = False
+                        stack.append((it, iter(self.upstreamEdges[it])))
+                        break
+                    if state[it] is False:
+                        cycle = [node for node, _ in stack]
+                        cycle = cycle[cycle.index(it):] + [it]
+                        raise Exception(f'The modules depend on each other: {" -> ".join(cycle)}')
+                else:
+                    stack.pop()
+                    state[current] = True
+                    result.append(current)
+
+        return result
+
+    def closure(self, keys, edges, memo):
+        result = set()
+        for key in keys:
+            found = memo.get(key)
+            if found is None:
+                found = set()
+                todo = [key]
+                while len(todo) > 0:
+                    for it in edges[todo.pop()]:
+                        if it not in found:
+                            found.add(it)
+                            todo.append(it)
+                memo[key] = frozenset(found)
+            result |= found
+        return result
+
+    def allUpstream(self, keys):
+        '''All modules which the modules in keys need, like "--also-make". Doesn't include keys.'''
+        return self.closure(keys, self.upstreamEdges, self.memoUpstream)
+
+    def allDownstream(self, keys):
+        '''All modules which need one of the modules in keys, like "--also-make-dependents". Doesn't include keys.'''
+        return self.closure(keys, self.downstreamEdges, self.memoDownstream)
+
+    def ordered(self, keys):
+        '''keys in build order.'''
+        keys = set(keys)
+        return [it for it in self.buildOrder() if it in keys]
+
+    def criticalPath(self, durations=None, default=1.0):
+        '''
+        The chain of modules which takes the longest when every module is
+        built as soon as the modules it needs are done. durations maps keys
+        to seconds (for example from the last build); missing modules take
+        default. Returns (total time, [keys]).
+        '''
+        memoKey = None if durations is None else tuple(sorted(durations.items()))
+        memoKey = (memoKey, default)
+        result = self.memoCriticalPath.get(memoKey)
+        if result is not None:
+            return result
+
+        finish = {}
+        previous = {}
+        for key in self.buildOrder():
+            start = 0.0
+            for it in self.upstreamEdges[key]:
+                if finish[it] > start:
+                    start = finish[it]
+                    previous[key] = it
+
+            duration = default if durations is None else durations.get(key, default)
+            finish[key] = start + duration
+
+        path = []
+        if len(finish) > 0:
+            key = max(finish, key=finish.get)
+            total = finish[key]
+            while key is not None:
+                path.append(key)
+                key = previous.get(key)
+            path.reverse()
+        else:
+            total = 0.0
+
+        result = (total, path)
+        self.memoCriticalPath[memoKey] = result
+        return result
+
+    def statistics(self):
+        return f'{len(self.poms)} modules, {sum(len(it) for it in self.upstreamEdges.values())} dependencies, {self.updates} updates'
+
+class BuildTimes:
+    '''
+    Remembers how long each module took the last time it was built
+    successfully, to estimate how long the next build will take.
+    '''
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.durations = {} # module key -> seconds
+        self.dirty = False
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except Exception as ex:
+            print(f'Ignoring broken build times {self.path}: {ex}')
+            return
+
+        if data.get('version') == self.VERSION:
+            self.durations = data['durations']
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_name(self.path.name + '.tmp')
+        with open(tmpPath, mode='w', encoding='utf-8') as fh:
+            json.dump({'version': self.VERSION, 'durations': self.durations}, fh)
+        os.replace(tmpPath, self.path)
+        self.dirty = False
+
+    def record(self, key, seconds):
+        if self.durations.get(key) != seconds:
+            self.durations[key] = seconds
+            self.dirty = True
+
+    def estimate(self, keys):
+        '''
+        Returns (seconds, [keys without a time]) for building keys one after
+        the other. Modules which were never built count with the average time
+        of the known ones.
+        '''
+        known = [self.durations[it] for it in keys if it in self.durations]
+        unknown = [it for it in keys if it not in self.durations]
+        total = sum(known)
+        if len(known) > 0:
+            total += len(unknown) * total / len(known)
+        return total, unknown
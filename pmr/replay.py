@@ -0,0 +1,184 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import re
+import time
+from pmr.ingest import PipelineEmitter
+from pmr.logging import DummyLogger, FileLogger, LogArchive
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser, installEventLogging
+
+OUTPUT_PREFIX = FileLogger.OUTPUT_TYPE + ' '
+# "[INFO] ------< group:artifact >------" or "[INFO] ----------"; plugins are "[INFO] --- name ---"
+SEPARATOR_PREFIX = '[INFO] ----'
+RESYNC_PREFIXES = (MavenOutputParser.MODULE_START_PREFIX, MavenOutputParser.SUMMARY_START_PREFIX)
+PROGRESS_PATTERN = re.compile(r'\[\d+/\d+\]\s*$')
+
+DEFAULT_CHUNK_LINES = 100000
+
+class EventRecorder:
+    '''Collects the events of the parser in the same format as the index of a log file.'''
+
+    def __init__(self):
+        self.events = []
+        self.line = 0
+
+    def put(self, name, args=()):
+        # Only the events are needed
+        pass
+
+    def event(self, kind, *args):
+        self.events.append([kind, self.line, list(args)])
+
+class ChunkParser:
+    '''Parses the output lines of a range of a LogArchive.'''
+
+    def __init__(self, archive, customPatternPreferences, isReactorBuild=False):
+        self.archive = archive
+        self.recorder = EventRecorder()
+
+        emitter = PipelineEmitter(self.recorder, SIGNAL_NAMES)
+        installEventLogging(emitter, self.recorder)
+
+        self.parser = MavenOutputParser(emitter, customPatternPreferences, DummyLogger())
+        # All that a chunk needs to know about the lines before it
+        self.parser.isReactorBuild = isReactorBuild
+
+    def parse(self, start, end):
+        self.recorder.events = []
+
+        for number in range(start, end):
+            line = self.archive.line(number)
+            if line.startswith(OUTPUT_PREFIX):
+                self.recorder.line = number
+                self.parser.parse(line[len(OUTPUT_PREFIX):])
+
+        if end == self.archive.lineCount:
+            self.parser.flush()
+        return self.recorder.events
+
+    def context(self):
+        return self.parser.context()
+
+class Chunk:
+    def __init__(self, start, end, isReactorBuild):
+        self.start, self.end, self.isReactorBuild = start, end, isReactorBuild
+
+    def seedContext(self):
+        return ('output', self.isReactorBuild, False)
+
+    def __repr__(self):
+        return f'Chunk({self.start}, {self.end}, isReactorBuild={self.isReactorBuild})'
+
+def findResyncPoint(archive, start):
+    '''Returns the number of the first line after start where a module or the reactor summary begins or None.'''
+    previous = None
+    for number in range(start, archive.lineCount):
+        line = archive.line(number)
+        if not line.startswith(OUTPUT_PREFIX):
+            continue
+
+        text = line[len(OUTPUT_PREFIX):]
+        if previous is not None and previous.startswith(SEPARATOR_PREFIX) and text.startswith(RESYNC_PREFIXES):
+            return number
+        previous = text
+
+    return None
+
+def findChunks(archive, chunkLines=DEFAULT_CHUNK_LINES):
+    '''Splits the log into chunks of at least chunkLines lines which start at a resync point.'''
+    result = []
+    start = 0
+    isReactorBuild = False
+
+    while start + chunkLines < archive.lineCount:
+        split = findResyncPoint(archive, start + chunkLines)
+        if split is None:
+            break
+
+        result.append(Chunk(start, split, isReactorBuild))
+
+        text = archive.line(split)[len(OUTPUT_PREFIX):]
+        # Only reactor builds show the progress and a summary
+        isReactorBuild = text.startswith(MavenOutputParser.SUMMARY_START_PREFIX) or PROGRESS_PATTERN.search(text) is not None
+        start = split
+
+    result.append(Chunk(start, archive.lineCount, isReactorBuild))
+    return result
+
+def parseChunk(path, chunk, customPatternPreferences):
+    '''Runs in the process pool. Returns the events and the context of the parser after the last line.'''
+    archive = LogArchive(path)
+    try:
+        parser = ChunkParser(archive, customPatternPreferences, chunk.isReactorBuild)
+        events = parser.parse(chunk.start, chunk.end)
+        return events, parser.context()
+    finally:
+        archive.close()
+
+def mergeChunks(archive, chunks, results, customPatternPreferences):
+    '''
+    Joins the events of the chunks. When the parser of a chunk didn't start in
+    the context which the previous chunk ended with, that chunk is parsed
+    again here with the real state, so the result is always the same as the
+    one of a sequential parse.
+    '''
+    events = list(results[0][0])
+    context = results[0][1]
+    parser = None
+    reparsed = 0
+
+    for index in range(1, len(chunks)):
+        chunk = chunks[index]
+        chunkEvents, chunkContext = results[index]
+
+        if parser is None and context == chunk.seedContext():
+            events.extend(chunkEvents)
+            context = chunkContext
+            continue
+
+        if parser is None:
+            # Parse the previous chunk again to get the complete state of the parser at its end
+            previous = chunks[index - 1]
+            parser = ChunkParser(archive, customPatternPreferences, previous.isReactorBuild)
+            parser.parse(previous.start, previous.end)
+
+        events.extend(parser.parse(chunk.start, chunk.end))
+        context = parser.context()
+        reparsed += 1
+
+        if index + 1 < len(chunks) and context == chunks[index + 1].seedContext():
+            parser = None
+
+    if reparsed > 0:
+        print(f'Replay: {reparsed} of {len(chunks)} chunks had to be parsed again')
+
+    return events
+
+def replayEvents(path, customPatternPreferences, workers=None, chunkLines=DEFAULT_CHUNK_LINES):
+    '''
+    Parses a log file again and returns the events which the index would
+    contain. Large logs are split at the start of modules and parsed on a
+    process pool.
+    '''
+    started = time.monotonic()
+    archive = LogArchive(path)
+    try:
+        chunks = findChunks(archive, chunkLines)
+
+        if len(chunks) == 1 or workers == 1:
+            result = ChunkParser(archive, customPatternPreferences).parse(0, archive.lineCount)
+        else:
+            # fork() isn't safe in a process which runs Qt and several threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                futures = [pool.submit(parseChunk, archive.path, chunk, customPatternPreferences) for chunk in chunks]
+                results = [future.result() for future in futures]
+
+            result = mergeChunks(archive, chunks, results, customPatternPreferences)
+
+        print(f'Replay: {archive.lineCount} lines in {len(chunks)} chunks took {time.monotonic() - started:.1f}s')
+        return result
+    finally:
+        archive.close()
@@ -0,0 +1,122 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from pmr.compression import DEFAULT_BLOCK_SIZE, blocksPath, compressFile
+from pmr.logging import COMPRESSED_SUFFIX, FileLogger, LogArchive, compressedPath, indexPath, resultPath, uncompressedPath
+
+class LogFileSet:
+    '''A log file plus its sidecars. path is always the name of the uncompressed log.'''
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def compressed(self):
+        return compressedPath(self.path).exists()
+
+    def files(self):
+        gzPath = compressedPath(self.path)
+        return [self.path, gzPath, blocksPath(gzPath), indexPath(self.path), resultPath(self.path)]
+
+    def existingFiles(self):
+        return list(it for it in self.files() if it.exists())
+
+    @property
+    def size(self):
+        return sum(it.stat().st_size for it in self.existingFiles())
+
+    @property
+    def mtime(self):
+        return max(it.stat().st_mtime for it in self.existingFiles())
+
+    def compress(self, blockSize):
+        gzPath = compressedPath(self.path)
+        stat = self.path.stat()
+        compressFile(self.path, gzPath, blockSize)
+        # Keep the original time stamp; it decides which files are the oldest
+        os.utime(gzPath, (stat.st_atime, stat.st_mtime))
+        self.path.unlink()
+
+    def delete(self):
+        for it in self.existingFiles():
+            it.unlink()
+
+    def __repr__(self):
+        return f'LogFileSet({self.path})'
+
+class LogRetention:
+    '''
+    Keeps the log folder of a project small: Compresses finished logs and
+    deletes the oldest ones when there are more than maxCount logs, when they
+    use more than maxBytes or when they are older than maxAgeDays.
+    The newest log, logs which are still being written and logs which are
+    open in a LogArchive are never touched.
+    '''
+    lock = threading.Lock()
+
+    def __init__(self, folder, logPreferences, exclude=(), blockSize=DEFAULT_BLOCK_SIZE):
+        self.folder = folder
+        self.maxCount = logPreferences.maxCount
+        self.maxBytes = logPreferences.maxSizeMB * 1024 * 1024
+        self.maxAge = logPreferences.maxAgeDays * 24 * 60 * 60
+        self.exclude = set(exclude)
+        self.blockSize = blockSize
+
+    def findLogs(self):
+        if not self.folder.exists():
+            return []
+
+        paths = set()
+        for it in self.folder.glob('pmr-*.log'):
+            paths.add(it)
+        for it in self.folder.glob(f'pmr-*.log{COMPRESSED_SUFFIX}'):
+            paths.add(uncompressedPath(it))
+
+        result = list(
+            LogFileSet(it)
+            for it in paths
+            if it not in FileLogger.openLogs and it not in LogArchive.openArchives and it not in self.exclude
+        )
+        result.sort(key=lambda it: it.mtime, reverse=True)
+        return result
+
+    def apply(self, now=None):
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            logs = self.findLogs()
+
+            keep = []
+            for index, log in enumerate(logs):
+                if index > 0 and (index >= self.maxCount or now - log.mtime > self.maxAge):
+                    self.delete(log)
+                else:
+                    keep.append(log)
+
+            # The newest log is probably looked at next
+            for log in keep[1:]:
+                if not log.compressed:
+                    self.compress(log)
+
+            total = 0
+            for index, log in enumerate(keep):
+                total += log.size
+                if index > 0 and total > self.maxBytes:
+                    self.delete(log)
+
+    def compress(self, log):
+        print(f'Compressing {log.path}')
+        log.compress(self.blockSize)
+
+    def delete(self, log):
+        print(f'Deleting old log {log.path}')
+        log.delete()
+
+    def start(self):
+        thread = threading.Thread(target=self.apply, name=f'LogRetention {self.folder.name}', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,60 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+import tempfile
+
+class Segment:
+    def __init__(self, offset, size, lineCount):
+        self.offset, self.size, self.lineCount = offset, size, lineCount
+
+    def __repr__(self):
+        return f'Segment(offset={self.offset}, size={self.size}, lines={self.lineCount})'
+
+class SegmentStore:
+    '''
+    Append-only file which keeps blocks of log lines out of memory until they
+    are needed again. Each line can have a key, for example the name of the
+    format it was shown with.
+    '''
+
+    def __init__(self, path=None):
+        self.path = path
+
+        if path is None:
+            self.fh = tempfile.TemporaryFile(mode='w+b', prefix='pmr-segments-')
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.fh = open(path, mode='w+b')
+
+        self.size = 0
+
+    def store(self, lines, keys=None):
+        if keys is None:
+            keys = [''] * len(lines)
+        # The key must not contain tabs
+        data = '\n'.join(f'{key}\t{line}' for key, line in zip(keys, lines)).encode('utf-8')
+
+        self.fh.seek(self.size)
+        self.fh.write(data)
+
+        result = Segment(self.size, len(data), len(lines))
+        self.size += len(data)
+        return result
+
+    def load(self, segment):
+        return [line for key, line in self.loadWithKeys(segment)]
+
+    def loadWithKeys(self, segment):
+        '''Returns (key, line) for each line of the segment.'''
+        if segment.lineCount == 0:
+            return []
+
+        self.fh.flush()
+        self.fh.seek(segment.offset)
+        data = self.fh.read(segment.size)
+        return [tuple(it.split('\t', 1)) for it in data.decode('utf-8').split('\n')]
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
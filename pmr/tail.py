@@ -0,0 +1,268 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+'''
+Follows a log file which another Maven process writes, for example with
+"mvn -l build.log" or from an IDE. Doesn't import Qt.
+'''
+
+import hashlib
+import json
+import os
+import time
+import traceback
+from pathlib import Path
+from pmr.logging import FileLogger, LogArchive, projectDataFolder
+from pmr.parser import splitThreadName
+
+class LogTail:
+    '''
+    Reads the lines which were appended to a file since the last call of
+    read(). The file is polled; only the new bytes are read. A line is only
+    returned when it's complete.
+    '''
+    DEFAULT_POLL_INTERVAL = 0.2 # seconds
+    # Don't read the whole file at once when attaching to a big log
+    MAX_READ_SIZE = 1024 * 1024
+
+    def __init__(self, path, offset=0, lineNumber=0, pollInterval=DEFAULT_POLL_INTERVAL, maxReadSize=MAX_READ_SIZE):
+        self.path = path
+        self.offset = offset
+        self.lineNumber = lineNumber
+        self.pollInterval = pollInterval
+        self.maxReadSize = maxReadSize
+
+        self.fh = None
+        self.inode = None
+        self.partial = b''
+
+        # Statistics
+        self.reads = 0
+        self.restarts = 0
+
+    @property
+    def lineOffset(self):
+        '''Offset after the last line which read() returned.'''
+        return self.offset - len(self.partial)
+
+    def read(self):
+        '''Returns the new lines or an empty list when nothing was appended yet.'''
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Maven didn't create it yet or it's being replaced
+            return []
+
+        if self.fh is not None and (stat.st_ino != self.inode or stat.st_size < self.offset):
+            print(f'Tail: {self.path} was replaced or truncated; reading it again from the start')
+            self.restart()
+
+        if stat.st_size == self.offset:
+            return []
+
+        if self.fh is None:
+            self.fh = open(self.path, mode='rb')
+            self.inode = stat.st_ino
+
+        self.fh.seek(self.offset)
+        data = self.fh.read(min(stat.st_size - self.offset, self.maxReadSize))
+        self.offset += len(data)
+        self.reads += 1
+
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+        if end == 0:
+            return []
+
+        # Like PipeDrainer
+        lines = [it.rstrip() for it in data[:end].decode('UTF-8', errors='backslashreplace').split('\n')[:-1]]
+        self.lineNumber += len(lines)
+        return lines
+
+    def restart(self):
+        self.close()
+        self.offset = 0
+        self.lineNumber = 0
+        self.partial = b''
+        self.restarts += 1
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+    def statistics(self):
+        return f'{self.lineNumber} lines in {self.reads} reads, {self.restarts} restarts'
+
+def checkpointPath(project, source):
+    '''Where the position in source is remembered for the project.'''
+    key = hashlib.sha1(str(source.resolve()).encode('UTF-8')).hexdigest()[:12]
+    return projectDataFolder(project) / f'follow-{key}.json'
+
+class TailCheckpoint:
+    '''
+    Remembers how far a followed log was read and in which context the parser
+    was, so following it again continues there instead of reading the whole
+    file again. Only positions where the parser is in the output state are
+    saved; the other states can't be restored.
+    '''
+    SAVE_INTERVAL = 1.0 # seconds
+
+    def __init__(self, path):
+        self.path = path
+        self.lastSave = None
+
+    def load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+        except:
+            print(f'Ignoring broken checkpoint {self.path}')
+            traceback.print_exc()
+            return None
+
+    def save(self, tail, context, logPath, force=False):
+        now = time.monotonic()
+        if not force and self.lastSave is not None and now - self.lastSave < self.SAVE_INTERVAL:
+            return
+
+        data = {
+            'source': str(tail.path),
+            'inode': tail.inode,
+            'offset': tail.lineOffset,
+            'lineNumber': tail.lineNumber,
+            'context': list(context),
+            'log': None if logPath is None else str(logPath),
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_name(self.path.name + '.tmp')
+        with open(tmpPath, mode='w', encoding='utf-8') as fh:
+            json.dump(data, fh)
+        os.replace(tmpPath, self.path)
+        self.lastSave = now
+
+    def delete(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+def attach(source, parser, checkpoint=None, **kwargs):
+    '''
+    Returns a LogTail for source and the checkpoint data it continues from
+    (None when source is read from the start). The context of the parser is
+    restored from the checkpoint.
+    '''
+    data = None if checkpoint is None else checkpoint.load()
+    if data is not None:
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            stat = None
+
+        # The file must still be the one which was read last time
+        if stat is None or stat.st_ino != data['inode'] or stat.st_size < data['offset']:
+            print(f'Tail: {source} was replaced; ignoring {checkpoint.path}')
+            data = None
+
+    if data is None:
+        return LogTail(source, **kwargs), None
+
+    parser.restoreContext(tuple(data['context']))
+    return LogTail(source, data['offset'], data['lineNumber'], **kwargs), data
+
+def replayHistory(logPath, lineCount, parser, logger):
+    '''
+    Feeds the first lineCount output lines of the log of an earlier run to parser
+    and copies them into logger, so the UI and the new log show the whole build
+    again. Returns the number of lines replayed; less than lineCount when the
+    log is gone or incomplete.
+    '''
+    if logPath is None:
+        return 0
+
+    try:
+        archive = LogArchive(Path(logPath))
+    except FileNotFoundError:
+        print(f'Tail: {logPath} is gone; unable to show the lines before the checkpoint')
+        return 0
+
+    prefix = FileLogger.OUTPUT_TYPE + ' '
+    count = 0
+    try:
+        for number in range(archive.lineCount):
+            if count == lineCount:
+                break
+
+            line = archive.line(number)
+            if line.startswith(prefix):
+                line = line[len(prefix):]
+                logger.log(FileLogger.OUTPUT_TYPE, line)
+                parser.parse(line)
+                count += 1
+    finally:
+        archive.close()
+
+    parser.flush()
+    return count
+
+SUCCESS_LINE = '[INFO] BUILD SUCCESS'
+FINISHED_PREFIX = '[INFO] Finished at:'
+
+def followLog(tail, parser, logger, emitter, checkpoint=None, shouldStop=None, idleTimeout=2.0):
+    '''
+    Like runMaven but the output comes from a log file which is still growing.
+    Returns a guess of the exit code when the build has finished (the file
+    stays quiet for idleTimeout seconds after Maven's "Finished at:" line) or
+    None when shouldStop() returned True first. Problems are emitted as errors.
+    '''
+    logPath = getattr(logger, 'path', None)
+    finished = False
+    rc = 1
+    lastChange = time.monotonic()
+    try:
+        while shouldStop is None or not shouldStop():
+            lines = tail.read()
+            now = time.monotonic()
+            if len(lines) == 0:
+                if finished and now - lastChange >= idleTimeout:
+                    break
+
+                time.sleep(tail.pollInterval)
+                continue
+
+            lastChange = now
+            for line in lines:
+                logger.log('MOUT', line)
+                parser.parse(line)
+
+                split = splitThreadName(line)
+                text = line if split is None else split[1]
+                if text.startswith(SUCCESS_LINE):
+                    rc = 0
+                elif text.startswith(FINISHED_PREFIX):
+                    finished = True
+
+            if checkpoint is not None and parser.context()[0] == 'output':
+                checkpoint.save(tail, parser.context(), logPath)
+        else:
+            if checkpoint is not None and parser.context()[0] == 'output':
+                checkpoint.save(tail, parser.context(), logPath, force=True)
+            print(f'Tail: {tail.statistics()}')
+            return None
+
+        parser.flush()
+        print(f'Tail: {tail.statistics()}')
+        if checkpoint is not None:
+            # Following it again shows the whole build
+            checkpoint.delete()
+        return rc
+    except:
+        emitter.error.emit(traceback.format_exc())
+        return -1
+    finally:
+        tail.close()
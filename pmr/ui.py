@@ -17,9 +17,12 @@ try:
         QHeaderView,
         QLabel,
         QLineEdit,
+        QListView,
         QListWidget,
+        QListWidgetItem,
         QMainWindow,
         QMenu,
+        QMessageBox,
         QPlainTextEdit,
         QPushButton,
         QShortcut,
@@ -57,9 +60,12 @@ try:
     )
     from PyQt5.QtCore import (
         pyqtSignal,
+        QAbstractItemModel,
+        QAbstractListModel,
         QAbstractTableModel,
         QEvent,
         QItemSelectionModel,
+        QModelIndex,
         QObject,
         QPoint,
         QRect,
@@ -75,17 +81,30 @@ except:
     print("Please install python3-pyqt and python3-sip")
     raise
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import collections
 import datetime
+import multiprocessing
 import os
 import re
 import subprocess
-import tempfile
+import threading
 import time
 import traceback
 import pmr
-from pmr.logging import FileLogger
+from pmr.analyze import formatDuration, parseDuration
+from pmr.changes import planChangedBuild
+from pmr.drainer import PipeDrainer
+from pmr.ingest import EARLY_RECORD, STREAM_LIVE, IngestPipeline, PipelineEmitter
+from pmr.logging import AsyncFileLogger, FileLogger, LogArchive, logFolder, newLogPath, projectLogFolder
+from pmr.parser import SIGNAL_NAMES, THREAD_NAME_OPTION, MavenOutputParser, UnitTestParser, installEventLogging
+from pmr.replay import replayEvents
+from pmr.retention import LogRetention
+from pmr.segments import SegmentStore
+from pmr.tail import TailCheckpoint, attach, checkpointPath, followLog, replayHistory
 from pmr.tools import OsSpecificInfo, WEB_URL_PATTERN
+from pmr.worker import MAVEN_POPEN_OPTIONS, ParserWorker, mavenCommandLine
 from pmr.model import (
     BaseMatcherConfig,
     CustomPatternPreferences,
@@ -101,7 +120,7 @@ from pmr.model import (
     StartsWithMatcherConfig,
     SubstringMatcherConfig,
 )
-from pmr.widgets import QScrollableTreeWidget
+from pmr.widgets import QScrollableTreeView
 
 
 class QtPreferences:
@@ -674,6 +693,8 @@ class CustomPatternDialog(QDialog):
 
 class MavenRunnerFrame(QFrame):
     startMaven = pyqtSignal(Project, CustomPatternPreferences, list)
+    openLog = pyqtSignal(object) # Path of the log file
+    followLog = pyqtSignal(object) # Path of the log file which Maven writes
 
     SINGLE_SELECTION, MULTI_SELECTION = range(2)
 
@@ -687,6 +708,18 @@ class MavenRunnerFrame(QFrame):
         self.currentProject = None
         self.projectPreferences = None
         self.selectedModule = 0
+        self.moduleSelectionMode = self.SINGLE_SELECTION
+        self.scanner = None
+        # Digests of the modules when the current build started; see mavenFinished()
+        self.changesSnapshot = None
+        # The modules which count as built when the build succeeds without a reactor summary; None means all
+        self.builtOnSuccess = []
+        # The project of the build which is shown; reactorSummary() remembers how long its modules took
+        self.buildProject = None
+        # Module key -> status from the reactor summary of the build which is shown
+        self.buildResults = {}
+        self.resuming = False
+        self.resumeSuggested = False
 
         self.uiUpdaterForStartOption = {
             MavenPreferences.START_ALL: self.updateUiForStartOptionAll,
@@ -694,7 +727,9 @@ class MavenRunnerFrame(QFrame):
             MavenPreferences.BUILD_ONLY: self.updateUiForStartOptionBuildOnly,
             MavenPreferences.BUILD_UP_TO: self.updateUiForStartOptionBuildUpTo,
             MavenPreferences.BUILD_SELECTED: self.updateUiForStartOptionBuildSelected,
-            # TODO MavenPreferences.START_FIRST_CHANGE
+            MavenPreferences.START_FIRST_CHANGE: self.updateUiForStartOptionAll,
+            MavenPreferences.BUILD_CHANGED: self.updateUiForStartOptionChanged,
+            MavenPreferences.RESUME_FAILED: self.updateUiForStartOptionChanged,
         }
 
         self.mavenArgsForStartOption = {
@@ -702,8 +737,10 @@ class MavenRunnerFrame(QFrame):
             MavenPreferences.START_WITH: self.mavenArgsForStartOptionWith,
             MavenPreferences.BUILD_ONLY: self.mavenArgsForStartOptionBuildOnly,
             MavenPreferences.BUILD_UP_TO: self.mavenArgsForStartOptionBuildUpTo,
-            # TODO MavenPreferences.START_FIRST_CHANGE
-            # TODO MavenPreferences.BUILD_SELECTED
+            MavenPreferences.START_FIRST_CHANGE: self.mavenArgsForStartOptionFirstChange,
+            MavenPreferences.BUILD_SELECTED: self.mavenArgsForStartOptionBuildSelected,
+            MavenPreferences.BUILD_CHANGED: self.mavenArgsForStartOptionChanged,
+            MavenPreferences.RESUME_FAILED: self.mavenArgsForStartOptionChanged,
         }
 
         layout = QVBoxLayout(self)
@@ -761,13 +798,13 @@ class MavenRunnerFrame(QFrame):
 
         self.startOptionWidget = QComboBox()
         self.startOptionWidget.addItem('build everything', MavenPreferences.START_ALL)
-        # TODO
-        #self.startOptionWidget.addItem('first changed module', MavenPreferences.START_FIRST_CHANGE)
+        self.startOptionWidget.addItem('first changed module', MavenPreferences.START_FIRST_CHANGE)
         self.startOptionWidget.addItem('start with', MavenPreferences.START_WITH)
         self.startOptionWidget.addItem('build only', MavenPreferences.BUILD_ONLY)
         self.startOptionWidget.addItem('build up to', MavenPreferences.BUILD_UP_TO)
-        # TODO
-        #self.startOptionWidget.addItem('build selected', MavenPreferences.BUILD_SELECTED)
+        self.startOptionWidget.addItem('build selected', MavenPreferences.BUILD_SELECTED)
+        self.startOptionWidget.addItem('build changed', MavenPreferences.BUILD_CHANGED)
+        self.startOptionWidget.addItem('resume failed build', MavenPreferences.RESUME_FAILED)
         self.startOptionWidget.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
         self.startOptionWidget.currentIndexChanged[int].connect(self.startOptionChanged)
         hbox.addWidget(self.startOptionWidget)
@@ -781,8 +818,36 @@ class MavenRunnerFrame(QFrame):
         self.modulesMultiSelection = QListWidget()
         self.modulesMultiSelection.setVisible(False)
         self.modulesMultiSelection.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        self.modulesMultiSelection.itemChanged.connect(self.modulesMultiSelectionChanged)
         hbox.addWidget(self.modulesMultiSelection)
 
+        self.alsoMakeSelector = QComboBox()
+        self.alsoMakeSelector.addItem('and what they need', '--also-make')
+        self.alsoMakeSelector.addItem('and what needs them', '--also-make-dependents')
+        self.alsoMakeSelector.addItem('and nothing else', '')
+        self.alsoMakeSelector.setToolTip('Which other modules to build with the selected ones')
+        self.alsoMakeSelector.setVisible(False)
+        self.alsoMakeSelector.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        self.alsoMakeSelector.currentIndexChanged[int].connect(self.alsoMakeChanged)
+        hbox.addWidget(self.alsoMakeSelector)
+
+        self.selectionInfo = QLabel()
+        self.selectionInfo.setVisible(False)
+        self.selectionInfo.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        hbox.addWidget(self.selectionInfo)
+
+        self.threadsSelector = QComboBox()
+        self.threadsSelector.addItem('one module at a time', '')
+        self.threadsSelector.addItem('2 threads', '2')
+        self.threadsSelector.addItem('4 threads', '4')
+        self.threadsSelector.addItem('8 threads', '8')
+        self.threadsSelector.addItem('1 thread per core', '1C')
+        self.threadsSelector.addItem('2 threads per core', '2C')
+        self.threadsSelector.setToolTip('How many modules Maven builds at the same time (--threads)')
+        self.threadsSelector.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        self.threadsSelector.currentIndexChanged[int].connect(self.threadsChanged)
+        hbox.addWidget(self.threadsSelector)
+
         self.mavenCmd = QLineEdit()
         hbox.addWidget(self.mavenCmd)
 
@@ -803,11 +868,23 @@ class MavenRunnerFrame(QFrame):
         patternsButton.clicked.connect(self.showCustomPatternDialog)
         hbox.addWidget(patternsButton)
 
+        openLogButton = QPushButton('Open &Log...')
+        openLogButton.setToolTip('Show the log of a past build')
+        openLogButton.clicked.connect(self.openLogClicked)
+        hbox.addWidget(openLogButton)
+
+        followLogButton = QPushButton('&Follow Log...')
+        followLogButton.setToolTip('Show a build which was started elsewhere, for example with "mvn -l FILE"')
+        followLogButton.clicked.connect(self.followLogClicked)
+        hbox.addWidget(followLogButton)
+
         self.setSizePolicy(QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed))
         self.projectSelector.setSizePolicy(QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed))
         run.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
         self.addProjectButton.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
         patternsButton.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        openLogButton.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        followLogButton.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
 
         self.projectSelector.currentIndexChanged[int].connect(self.changeProject)
 
@@ -838,6 +915,9 @@ class MavenRunnerFrame(QFrame):
         self.modulesSingleSelection.setVisible(self.modulesSingleSelectionVisible)
         self.modulesSingleSelection.setEnabled(self.modulesSingleSelectionVisible)
 
+        self.alsoMakeSelector.setVisible(self.modulesMultiSelectionVisible)
+        self.selectionInfo.setVisible(self.modulesMultiSelectionVisible)
+
         self.moduleSelectionMode = mode
 
     def updateUiForStartOptionAll(self):
@@ -861,6 +941,12 @@ class MavenRunnerFrame(QFrame):
 
     def updateUiForStartOptionBuildSelected(self):
         self.setModuleSelectiomMode(self.MULTI_SELECTION)
+        self.updateSelectionInfo()
+
+    def updateUiForStartOptionChanged(self):
+        self.updateUiForStartOptionAll()
+        self.selectionInfo.setVisible(True)
+        self.updateSelectionInfo()
 
     def modulesSingleSelectionChanged(self, index):
         if self.modulesSingleSelection.isEnabled():
@@ -870,9 +956,131 @@ class MavenRunnerFrame(QFrame):
                 self.projectPreferences.maven.moduleList = [self.modulesSingleSelection.currentData()]
         print('selectedModule', self.selectedModule)
 
+    def modulesMultiSelectionChanged(self, item):
+        if self.projectPreferences is not None:
+            self.projectPreferences.maven.moduleList = self.checkedModules()
+        self.updateSelectionInfo()
+
+    def alsoMakeChanged(self, index):
+        if self.projectPreferences is not None:
+            self.projectPreferences.maven.alsoMake = self.alsoMakeSelector.currentData()
+        self.updateSelectionInfo()
+
+    def threadsChanged(self, index):
+        if self.projectPreferences is not None:
+            self.projectPreferences.maven.threads = self.threadsSelector.currentData()
+
+    def threadOptions(self):
+        '''
+        The options for a parallel build. The parser needs the names of the
+        threads to sort the output by module; that's also true when the extra
+        options ask for threads.
+        '''
+        extraOptions = self.mavenCmd.text().split(' ')
+        options = []
+        threads = self.threadsSelector.currentData()
+        if threads != '':
+            options.extend(['--threads', threads])
+        elif not any(it == '--threads' or it.startswith(('-T', '--threads=')) for it in extraOptions):
+            return []
+
+        if THREAD_NAME_OPTION not in extraOptions:
+            options.append(THREAD_NAME_OPTION)
+        return options
+
+    def checkedModules(self):
+        result = []
+        for index in range(self.modulesMultiSelection.count()):
+            item = self.modulesMultiSelection.item(index)
+            if item.checkState() == Qt.Checked:
+                result.append(item.data(Qt.UserRole))
+        return result
+
+    def modulesToBuild(self):
+        '''The keys of the modules which BUILD_SELECTED will build, in build order, computed like Maven does.'''
+        selected = self.checkedModules()
+        graph = self.currentProject.reactor
+        selected = [it for it in selected if it in graph]
+
+        result = set(selected)
+        alsoMake = self.alsoMakeSelector.currentData()
+        if alsoMake == '--also-make':
+            result |= graph.allUpstream(selected)
+        elif alsoMake == '--also-make-dependents':
+            result |= graph.allDownstream(selected)
+        return graph.ordered(result)
+
+    def updateSelectionInfo(self):
+        '''Show how many modules the selection will build and how long that will take.'''
+        if self.currentProject is None:
+            return
+
+        if self.startOptionWidget.currentData() in (MavenPreferences.BUILD_CHANGED, MavenPreferences.RESUME_FAILED):
+            self.updateChangedBuildInfo()
+            return
+
+        if self.moduleSelectionMode != self.MULTI_SELECTION:
+            return
+
+        if len(self.checkedModules()) == 0:
+            self.selectionInfo.setText('Nothing selected')
+            self.selectionInfo.setToolTip('Select the modules to build')
+            return
+
+        if self.currentProject.modules is None:
+            # Wait for the scanner
+            self.selectionInfo.setText('')
+            return
+
+        try:
+            keys = self.modulesToBuild()
+        except:
+            traceback.print_exc()
+            self.selectionInfo.setText('?')
+            self.selectionInfo.setToolTip(traceback.format_exc())
+            return
+
+        seconds, unknown = self.currentProject.buildTimes.estimate(keys)
+        text = f'{len(keys)} modules'
+        if seconds > 0:
+            text += f', about {formatDuration(seconds)}'
+        if len(unknown) > 0 and len(unknown) < len(keys):
+            text += f' ({len(unknown)} never built)'
+
+        self.selectionInfo.setText(text)
+        self.selectionInfo.setToolTip('\n'.join(keys))
+
     def projectToComboLabel(self, index, project):
         return project.name if index >= 10 else f'{project.name} <Ctrl+{index}>'
 
+    def openLogClicked(self):
+        folder = logFolder() if self.currentProject is None else projectLogFolder(self.currentProject)
+        if not folder.exists():
+            folder = logFolder()
+
+        path, filter = QFileDialog.getOpenFileName(
+            self,
+            'Open log of a past build',
+            str(folder),
+            'Log files (*.log *.log.gz)'
+        )
+        if path != '':
+            self.openLog.emit(Path(path))
+
+    def followLogClicked(self):
+        folder = self.lastPath if self.currentProject is None else self.currentProject.path
+
+        path, filter = QFileDialog.getOpenFileName(
+            self,
+            'Follow the log of a running build',
+            str(folder),
+            'Log files (*.log *.txt);;All files (*)'
+        )
+        if path != '':
+            self.buildProject = self.currentProject
+            self.buildResults = {}
+            self.followLog.emit(Path(path))
+
     def showCustomPatternDialog(self):
         dlg = CustomPatternDialog(self.preferences, self.projectPreferences.customPatternPreferences, self)
         result = dlg.exec_()
@@ -893,6 +1101,7 @@ class MavenRunnerFrame(QFrame):
 
     def resumeDetected(self, resumeOption):
         print(f'{self.__class__.__name__}.resumeDetected({resumeOption!r})')
+        self.resumeSuggested = True
         self.setStartOption(MavenPreferences.START_WITH)
 
         def fullMatch(a, b):
@@ -922,7 +1131,87 @@ class MavenRunnerFrame(QFrame):
 
     def mavenFinished(self, rc):
         # TODO Start with first module if the last build was resumed AND successful?
-        pass
+        if self.changesSnapshot is not None:
+            project, snapshot = self.changesSnapshot
+            results = self.buildResults
+            if len(results) > 0:
+                # Modules which succeeded count as built even when a later one failed
+                built = [key for key, status in results.items() if status == 'SUCCESS']
+            elif rc == 0:
+                built = list(snapshot) if self.builtOnSuccess is None else self.builtOnSuccess
+            else:
+                built = []
+            project.changes.markBuilt({key: snapshot[key] for key in built if key in snapshot})
+            project.changes.save()
+
+            if rc == 0:
+                project.resumePoint.clear()
+            elif len(results) > 0:
+                project.resumePoint.record(results, self.resuming)
+            project.resumePoint.save()
+
+            if rc != 0 and len(results) > 0 and self.resumeSuggested and project is self.currentProject:
+                self.setStartOption(MavenPreferences.RESUME_FAILED)
+        self.changesSnapshot = None
+
+        if self.buildProject is not None:
+            self.buildProject.buildTimes.save()
+            self.buildProject = None
+        self.updateSelectionInfo()
+
+    def updateChangedBuildInfo(self):
+        if self.currentProject.modules is None:
+            # Wait for the scanner
+            self.selectionInfo.setText('')
+            return
+
+        if self.startOptionWidget.currentData() == MavenPreferences.RESUME_FAILED and len(self.currentProject.resumePoint.results) == 0:
+            self.selectionInfo.setText('No failed build')
+            self.selectionInfo.setToolTip('Only a failed "install" or "deploy" with a reactor summary can be resumed')
+            return
+
+        result = self.findChangedBuild()
+        if result is None:
+            self.selectionInfo.setText('Everything')
+            self.selectionInfo.setToolTip('The changed modules are unknown; everything is built')
+            return
+
+        plan, snapshot = result
+        self.selectionInfo.setText(plan.summary())
+        self.selectionInfo.setToolTip(plan.details())
+
+    def findChangedBuild(self):
+        '''
+        Returns (ChangedBuild, snapshot) for the changed modules or the
+        failed build or None when the changes can't be determined.
+        '''
+        project = self.currentProject
+        try:
+            if self.startOptionWidget.currentData() == MavenPreferences.RESUME_FAILED:
+                result = project.resumePoint.plan(project.reactor, project.changes, project.path)
+            else:
+                result = planChangedBuild(project.reactor, project.changes, project.path)
+        except:
+            traceback.print_exc()
+            return None
+
+        project.changes.save()
+        print(f'Changes: {project.changes.statistics()}')
+        return result
+
+    def reactorSummary(self, module, status, duration):
+        project = self.buildProject
+        if project is None or project.modules is None:
+            return
+
+        key = project.reactor.findByName(module)
+        if key is None:
+            return
+
+        self.buildResults[key] = status
+        seconds = parseDuration(duration)
+        if status == 'SUCCESS' and seconds is not None:
+            project.buildTimes.record(key, seconds)
 
     def setCurrentProjectIndex(self, index):
         print('setCurrentProjectIndex', index, self.projectSelector.currentIndex())
@@ -1000,6 +1289,12 @@ class MavenRunnerFrame(QFrame):
     def startOptionFromPreferences(self, prefs):
         self.setStartOption(prefs.maven.startOption)
 
+        index = self.alsoMakeSelector.findData(prefs.maven.alsoMake)
+        self.quietUpdateCurrentIndex(self.alsoMakeSelector, max(index, 0))
+
+        index = self.threadsSelector.findData(prefs.maven.threads)
+        self.quietUpdateCurrentIndex(self.threadsSelector, max(index, 0))
+
     def moduleSelectionFromPreferences(self, prefs):
         modules = prefs.maven.moduleList
         if len(modules) == 0:
@@ -1013,29 +1308,79 @@ class MavenRunnerFrame(QFrame):
                     self.quietUpdateCurrentIndex(self.modulesSingleSelection, index)
                     break
 
-        # TODO Update multi selection
+        oldState = self.modulesMultiSelection.blockSignals(True)
+        for index in range(self.modulesMultiSelection.count()):
+            item = self.modulesMultiSelection.item(index)
+            item.setCheckState(Qt.Checked if item.data(Qt.UserRole) in modules else Qt.Unchecked)
+        self.modulesMultiSelection.blockSignals(oldState)
+        self.updateSelectionInfo()
+
+    def setScanner(self, scanner):
+        '''Read the modules in the background instead of in updateModules().'''
+        self.scanner = scanner
+        scanner.modulesFound.connect(self.modulesFound)
 
     def updateModules(self):
         self.modulesSingleSelection.clear()
+        self.modulesMultiSelection.clear()
         if self.currentProject is None:
             print('updateModules: no current project')
             self.modulesSingleSelection.setEnabled(False)
             self.modulesMultiSelection.setEnabled(False)
             return
 
-        items = []
-        self.collectMavenModules(items, self.currentProject.rootPom)
+        if self.scanner is None:
+            pomCache = self.currentProject.pomCache
+            self.currentProject.modules = pomCache.scan(self.currentProject.path)
+            print('updateModules', pomCache.statistics())
+        else:
+            # Show what we know; the scan updates the list when POMs have changed
+            self.scanner.scan([self.currentProject])
 
-        print('updateModules', len(items))
+        if self.currentProject.modules is not None:
+            self.showModules(self.currentProject.modules)
+
+    def modulesFound(self, project, modules, complete):
+        if project is not self.currentProject:
+            return
+
+        if not complete and project.modules is not None:
+            # The list from the last scan is complete; wait for the end of this one
+            return
+
+        self.showModules(modules)
+        if self.projectPreferences is not None:
+            self.moduleSelectionFromPreferences(self.projectPreferences)
+
+    def showModules(self, modules):
+        items = [self.toModulesSingleSelectionItem(pom, level, '    ') for level, pom in modules]
+        current = [
+            (self.modulesSingleSelection.itemText(index), self.modulesSingleSelection.itemData(index))
+            for index in range(self.modulesSingleSelection.count())
+        ]
+        if items == current:
+            return
+
+        print('showModules', len(items))
+        selected = self.modulesSingleSelection.currentIndex()
+        oldState = self.modulesSingleSelection.blockSignals(True)
+        self.modulesSingleSelection.clear()
         for name, value in items:
             self.modulesSingleSelection.addItem(name, value)
+        self.modulesSingleSelection.setCurrentIndex(min(max(selected, 0), len(items) - 1))
+        self.modulesSingleSelection.blockSignals(oldState)
 
-    def collectMavenModules(self, items, pom, level=0, indent='    '):
-        items.append(self.toModulesSingleSelectionItem(pom, level, indent))
-
-        level += 1
-        for childPom in pom.childPoms:
-            self.collectMavenModules(items, childPom, level, indent)
+        checked = set(self.checkedModules())
+        oldState = self.modulesMultiSelection.blockSignals(True)
+        self.modulesMultiSelection.clear()
+        for name, value in items:
+            item = QListWidgetItem(name)
+            item.setData(Qt.UserRole, value)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if value in checked else Qt.Unchecked)
+            self.modulesMultiSelection.addItem(item)
+        self.modulesMultiSelection.blockSignals(oldState)
+        self.updateSelectionInfo()
 
     def toModulesSingleSelectionItem(self, pom, level, indent):
         name = indent * level + pom.artifactId
@@ -1067,9 +1412,145 @@ class MavenRunnerFrame(QFrame):
         data = self.modulesSingleSelection.currentData()
         return ['--also-make', '--projects', data]
 
+    def mavenArgsForStartOptionBuildSelected(self):
+        selected = self.checkedModules()
+        if len(selected) == 0:
+            return []
+
+        # Maven finds the same modules as modulesToBuild(); that keeps the command line short
+        result = ['--projects', ','.join(selected)]
+        alsoMake = self.alsoMakeSelector.currentData()
+        if alsoMake != '':
+            result.append(alsoMake)
+        return result
+
+    def mavenArgsForStartOptionFirstChange(self):
+        snapshot = self.takeChangesSnapshot()
+        if snapshot is None:
+            return []
+
+        self.builtOnSuccess = None
+        key = self.currentProject.changes.firstChange(snapshot)
+        print(f'First changed module: {key}')
+        if key is None or key == next(iter(snapshot)):
+            # Nothing to skip
+            return []
+
+        return ['--resume-from', key]
+
+    def mavenArgsForStartOptionChanged(self):
+        result = self.findChangedBuild()
+        if result is None:
+            return []
+
+        plan, snapshot = result
+        print(plan.details())
+        self.selectionInfo.setText(plan.summary())
+        self.selectionInfo.setToolTip(plan.details())
+        self.changesSnapshot = (self.currentProject, snapshot)
+        # Only the modules which are built count as built when the build succeeds
+        self.builtOnSuccess = plan.modules
+        return plan.mavenArgs()
+
+    def mavenArgsForFailedTests(self, project, failedTests):
+        '''
+        Runs only the test classes in failedTests ({module name: [classes]})
+        and only in the modules where they failed. Maven can't pass a different
+        -Dtest to each module; the fully qualified names make sure that each
+        class only runs in its own module (LogFrame only keeps the simple name
+        when the Surefire of the module is too old for them). Classes of
+        unknown modules are looked up by their source. Returns None when there
+        is nothing to run.
+        '''
+        graph = project.reactor
+        byModule = {} # module key -> classes
+        for name, classes in failedTests.items():
+            key = None if name is None else graph.findByName(name)
+            for it in classes:
+                found = key if key is not None else graph.findByTestClass(it)
+                tests = byModule.setdefault(found, [])
+                if it not in tests:
+                    tests.append(it)
+
+        # The tests of one module stay together, in build order
+        keys = graph.ordered([it for it in byModule if it is not None])
+        if None in byModule:
+            if len(keys) > 0:
+                print(f'Unknown modules for {byModule[None]}; they only run when they are in {keys}')
+            else:
+                print(f'Unknown modules for {byModule[None]}; searching them in all modules')
+
+        tests = []
+        for key in keys + ([None] if None in byModule else []):
+            for it in byModule[key]:
+                if it not in tests:
+                    tests.append(it)
+
+        if len(tests) == 0:
+            return None
+
+        args = []
+        if len(keys) > 0:
+            args.extend(['--projects', ','.join(keys)])
+        args.extend(['test', '-Dtest=' + ','.join(tests), '-Dsurefire.failIfNoSpecifiedTests=false'])
+        args.extend(self.threadOptions())
+        extraOptions = self.mavenCmd.text()
+        if len(extraOptions) > 0:
+            args.extend(extraOptions.split(' '))
+        return args
+
+    def rerunFailedTests(self, project, failedTests):
+        if project is None:
+            project = self.currentProject
+        if project is None:
+            return
+
+        try:
+            args = self.mavenArgsForFailedTests(project, failedTests)
+        except:
+            traceback.print_exc()
+            return
+        if args is None:
+            print('No failed tests')
+            return
+
+        self.changesSnapshot = None
+        self.buildProject = project
+        self.buildResults = {}
+        self.resuming = False
+        self.resumeSuggested = False
+        prefs = self.projectPreferences if project is self.currentProject else project.preferences
+        self.startMaven.emit(project, prefs.customPatternPreferences, args)
+
+    def takeChangesSnapshot(self):
+        '''Remember the state of the modules; when the build succeeds, they count as unchanged.'''
+        project = self.currentProject
+        try:
+            snapshot = project.changes.snapshot(project.reactor)
+        except:
+            traceback.print_exc()
+            return None
+
+        project.changes.save()
+        print(f'Changes: {project.changes.statistics()}')
+        self.changesSnapshot = (project, snapshot)
+        return snapshot
+
     def emitStartMaven(self):
+        self.changesSnapshot = None
+        self.builtOnSuccess = []
+        self.buildProject = self.currentProject
+        self.buildResults = {}
+        self.resuming = self.startOptionWidget.currentData() == MavenPreferences.RESUME_FAILED
+        self.resumeSuggested = False
+        startOption = self.mavenStartOption()
+        if startOption is None:
+            print('Nothing to build')
+            self.buildProject = None
+            return
+
         args = []
-        args.extend(self.mavenStartOption())
+        args.extend(startOption)
         if len(self.goals) > 0:
             args.extend(self.goals.split(' '))
         extraOptions = self.mavenCmd.text()
@@ -1077,19 +1558,73 @@ class MavenRunnerFrame(QFrame):
             args.extend(extraOptions.split(' '))
         if self.skipTestsButton.isChecked():
             args.append('-DskipTests')
+        args.extend(self.threadOptions())
+        if not ('install' in args or 'deploy' in args):
+            # Maven can only resume after modules which are in the local repository
+            self.changesSnapshot = None
+        else:
+            if self.changesSnapshot is None:
+                # The reactor summary tells which modules were built
+                self.takeChangesSnapshot()
+            if self.startOptionWidget.currentData() == MavenPreferences.START_ALL:
+                self.builtOnSuccess = None
         self.startMaven.emit(self.currentProject, self.projectPreferences.customPatternPreferences, args)
 
 
+class UiUpdateCoordinator(QObject):
+    '''
+    Event handlers only call markDirty(). A timer then runs the registered
+    updaters for everything which is dirty, in the order of registration.
+    There are never more than maxUpdatesPerSecond ticks per second, no matter
+    how many events arrive. The timer stops when nothing is dirty.
+    Tests can pass a timer which they fire themselves.
+    '''
+    DEFAULT_MAX_UPDATES_PER_SECOND = 25
+
+    def __init__(self, maxUpdatesPerSecond=DEFAULT_MAX_UPDATES_PER_SECOND, parent=None, timer=None):
+        super().__init__(parent)
+
+        self.maxUpdatesPerSecond = maxUpdatesPerSecond
+        self.updaters = {}
+        self.dirty = {}
+
+        # Statistics to check the cap
+        self.ticks = 0
+        self.updates = 0
+
+        self.timer = QTimer(self) if timer is None else timer
+        self.timer.setInterval(1000 // maxUpdatesPerSecond)
+        self.timer.timeout.connect(self.tick)
+
+    def register(self, name, updater):
+        self.updaters[name] = updater
+
+    def markDirty(self, name):
+        self.dirty[name] = True
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def tick(self):
+        if len(self.dirty) == 0:
+            self.timer.stop()
+            return
+
+        self.ticks += 1
+        # Updaters may mark later updaters dirty; they run in the same tick
+        for name, updater in self.updaters.items():
+            if self.dirty.pop(name, False):
+                updater()
+                self.updates += 1
+
 class TestOutputFoldInfo(QTextBlockUserData):
-    def __init__(self, startPos, endPos):
+    def __init__(self, name, segment):
         super().__init__()
 
-        self.startPos, self.endPos = startPos, endPos
-        self.visible = True
-        self.frame = None
+        self.name, self.segment = name, segment
+        self.visible = False
 
     def __repr__(self):
-        return f'TestOutputFoldInfo(range=[{self.startPos}, {self.endPos}, visible={self.visible}]'
+        return f'TestOutputFoldInfo({self.name!r}, {self.segment}, visible={self.visible})'
 
 
 class LogView(QTextBrowser):
@@ -1139,6 +1674,10 @@ class LogView(QTextBrowser):
         self.mavenPluginFormat = QTextCharFormat()
         self.mavenPluginFormat.setFontWeight(QFont.Bold)
 
+        self.foldedTestOutputFormat = QTextCharFormat()
+        self.foldedTestOutputFormat.setForeground(QBrush(self.preferences.debugColor))
+        self.foldedTestOutputFormat.setFontItalic(True)
+
         fixedFont = QFontDatabase.systemFont(QFontDatabase.FixedFont)
 
         self.dependencyFormat = QTextCharFormat()
@@ -1152,6 +1691,14 @@ class LogView(QTextBrowser):
         self.warningFormat.setForeground(self.warningBrush)
         self.warningFormat.setFont(fixedFont)
 
+        # Formats of lines in test output which can be spilled; the key is stored with the line
+        self.spilledLineFormats = {
+            'error': self.errorFormat,
+            'warning': self.warningFormat,
+            'dependency': self.dependencyFormat,
+            'hidden': self.foldedTestOutputFormat,
+        }
+
         self.tableFormat = QTextTableFormat()
         #print(dir(self.tableFormat))
         # TODO Qt 5.14
@@ -1168,6 +1715,9 @@ class LogView(QTextBrowser):
         self.flushTimer.timeout.connect(self.flushTimeout)
         self.flushTimer.start(100)
 
+        self.coordinator = None
+        self.testOutputStore = None
+
         self.clear()
         self.setPlainText('Ready.\n')
 
@@ -1195,7 +1745,14 @@ class LogView(QTextBrowser):
         self.cursor.setPosition(0)
         self.reactorBuildOrderTable = None
         self.reactorSummaryTable = None
-        self.startTestPosition = None
+        self.startTestLine = None
+        self.testSuccess = False
+        self.lineCount = 0
+        self.pendingSpills = []
+
+        if self.testOutputStore is not None:
+            self.testOutputStore.close()
+        self.testOutputStore = SegmentStore()
 
         self.pendingUpdates = []
 
@@ -1203,14 +1760,29 @@ class LogView(QTextBrowser):
         if format is None:
             format = self.defaultFormat
 
-        self.pendingUpdates.append((text, format))
+        self.pendingUpdates.append((text, format, self.lineCount))
+        self.lineCount += 1
+
+        if self.coordinator is not None:
+            self.coordinator.markDirty('log')
+
+    def setCoordinator(self, coordinator):
+        '''Flush and scroll in the ticks of the coordinator instead of using an own timer.'''
+        self.flushTimer.stop()
+        self.coordinator = coordinator
+        coordinator.register('log', self.flushUpdates)
+        coordinator.register('logScroll', self.scrollToBottom)
+
+    def nextLine(self):
+        '''Logical number of the next line. Doesn't flush pending updates.'''
+        return self.lineCount
 
     def flushTimeout(self):
         self.flushUpdates()
 
     def flushUpdates(self):
         #print('flush', len(self.pendingUpdates))
-        if len(self.pendingUpdates) == 0:
+        if len(self.pendingUpdates) == 0 and len(self.pendingSpills) == 0:
             return
 
         stopUpdates = len(self.pendingUpdates) > 5
@@ -1221,30 +1793,44 @@ class LogView(QTextBrowser):
         self.cursor.movePosition(QTextCursor.End)
         self.cursor.beginEditBlock();
 
-        for line, format in self.pendingUpdates:
-            start = 0
-            for match in WEB_URL_PATTERN.finditer(line):
-                self.cursor.insertText(line[start:match.start(0)], format)
-
-                url = match.group(0)
-                url = url.replace('"', '&quot;')
-                link = f'<a href="{url}">{url}</a>'
-                self.cursor.insertHtml(link)
-
-                start = match.end(0)
-
-            self.cursor.insertText(line[start:], format)
+        for line, format, lineNumber in self.pendingUpdates:
+            self.insertLineText(self.cursor, line, format)
+            self.cursor.block().setUserState(lineNumber)
             self.cursor.insertBlock()
 
         self.cursor.endEditBlock();
 
+        self.pendingUpdates = []
+
+        spills, self.pendingSpills = self.pendingSpills, []
+        for spill in spills:
+            self.spillTestOutput(*spill)
+
         if stopUpdates:
             self.setUpdatesEnabled(True)
 
-        self.pendingUpdates = []
-
         if self.autoscroll:
+            self.requestScrollToBottom()
+
+    def insertLineText(self, cursor, line, format):
+        start = 0
+        for match in WEB_URL_PATTERN.finditer(line):
+            cursor.insertText(line[start:match.start(0)], format)
+
+            url = match.group(0)
+            url = url.replace('"', '&quot;')
+            link = f'<a href="{url}">{url}</a>'
+            cursor.insertHtml(link)
+
+            start = match.end(0)
+
+        cursor.insertText(line[start:], format)
+
+    def requestScrollToBottom(self):
+        if self.coordinator is None:
             self.scrollToBottom()
+        else:
+            self.coordinator.markDirty('logScroll')
 
     def scrollToBottom(self):
         scrollBar = self.verticalScrollBar()
@@ -1254,6 +1840,32 @@ class LogView(QTextBrowser):
         self.flushUpdates()
         return self.cursor.position()
 
+    def lineState(self, block):
+        # Table cells, horizontal lines, etc. have no line number; use the next block which has one
+        while block.isValid() and block.userState() < 0:
+            block = block.next()
+        return block.userState() if block.isValid() else self.lineCount
+
+    def blockOfLine(self, line):
+        '''Last block which shows the logical line or a line before it (folded lines resolve to the fold header).'''
+        document = self.document()
+        low, high = 0, document.blockCount()
+        while low < high:
+            mid = (low + high) // 2
+            if self.lineState(document.findBlockByNumber(mid)) <= line:
+                low = mid + 1
+            else:
+                high = mid
+
+        return document.findBlockByNumber(max(low - 1, 0))
+
+    def positionOfLine(self, line):
+        self.flushUpdates()
+        block = self.blockOfLine(line)
+        if not block.isValid():
+            return self.cursor.position()
+        return block.position()
+
     def mavenStarted(self, project, args):
         self.clear()
         cmdLine = ' '.join(args)
@@ -1285,7 +1897,7 @@ class LogView(QTextBrowser):
 
     def startedTest(self, name):
         self.appendLine(name, self.testFormat)
-        self.startTestPosition = self.endPosition()
+        self.startTestLine = self.lineCount
         self.testSuccess = True
     
     def finishedTest(self, name, numberOfTests, failures, errors, skipped, duration):
@@ -1298,52 +1910,111 @@ class LogView(QTextBrowser):
         else:
             format = self.testFormat
 
-        endOfTestOutput = self.endPosition()
+        # Folding is done by the next flush; no need to update the document now
+        if self.testSuccess and self.startTestLine is not None:
+            self.pendingSpills.append((name, self.startTestLine, self.lineCount))
+        self.startTestLine = None
 
         self.appendLine(text, format)
 
-        if self.testSuccess:
-            foldHeader = self.prepareHideTestOutput(self.startTestPosition, endOfTestOutput)
-            #self.foldTestOutput(foldHeader, False)
-            pass
-
-    def prepareHideTestOutput(self, startPos, endPos):
-        firstBlock = self.document().findBlock(startPos)
-        headerBlock = firstBlock.previous()
-        foldInfo = TestOutputFoldInfo(startPos, endPos)
-        headerBlock.setUserData(foldInfo)
+    def spillTestOutput(self, name, startLine, endLine):
+        if startLine >= endLine:
+            return
 
-        testOutputCursor = QTextCursor(self.document())
-        testOutputCursor.setPosition(startPos)
-        testOutputCursor.setPosition(endPos, QTextCursor.KeepAnchor)
+        document = self.document()
+        lines = []
+        keys = []
+        block = self.blockOfLine(startLine)
+        startPos = block.position()
+        while block.isValid() and self.lineState(block) < endLine:
+            lines.append(block.text())
+            keys.append(self.spilledFormatKey(block))
+            block = block.next()
+        endPos = block.position()
+        endState = block.userState()
+
+        segment = self.testOutputStore.store(lines, keys)
+
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        cursor.setPosition(startPos)
+        cursor.setPosition(endPos, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+        foldInfo = TestOutputFoldInfo(name, segment)
+        cursor.insertText(self.foldedTestOutputText(foldInfo), self.foldedTestOutputFormat)
+        cursor.insertBlock(self.defaultBlockFormat, self.defaultFormat)
+        cursor.block().setUserState(endState)
+        foldHeader = cursor.block().previous()
+        foldHeader.setUserData(foldInfo)
+        foldHeader.setUserState(startLine)
+        cursor.endEditBlock()
 
-        frameFormat = QTextFrameFormat()
-        frame = testOutputCursor.insertFrame(frameFormat)
-        foldInfo.frame = frame
+        self.cursor.movePosition(QTextCursor.End)
 
+    def spilledFormatKey(self, block):
+        '''The key of the format of the line in spilledLineFormats; '' for the default format.'''
+        it = block.begin()
+        while not it.atEnd():
+            format = it.fragment().charFormat()
+            # Links have their own format
+            if not format.isAnchor():
+                for key, candidate in self.spilledLineFormats.items():
+                    if format == candidate:
+                        return key
+                return ''
+            it += 1
+        return ''
+
+    def foldedTestOutputText(self, foldInfo):
+        n = foldInfo.segment.lineCount
+        marker = '[-]' if foldInfo.visible else '[+]'
+        return f'{marker} {n} lines of output'
 
     def foldTestOutput(self, foldHeader, visible):
         foldInfo = foldHeader.userData()
-        print('foldTestOutput', foldInfo, visible)
-        if foldInfo is None:
-            print('No foldInfo')
+        if not isinstance(foldInfo, TestOutputFoldInfo):
             return
 
-        if foldInfo.startPos == foldInfo.endPos:
-            print('Empty output')
+        if foldInfo.visible == visible:
             return
 
-        # TODO set all blocks in frame to invisible
-        # TODO force relayout of frame if visible == True
+        self.flushUpdates()
+
+        cursor = QTextCursor(foldHeader)
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.EndOfBlock)
+
+        if visible:
+            lineNumber = foldHeader.userState()
+            for key, line in self.testOutputStore.loadWithKeys(foldInfo.segment):
+                format = self.spilledLineFormats.get(key, self.defaultFormat)
+                cursor.insertBlock(self.defaultBlockFormat, self.defaultFormat)
+                self.insertLineText(cursor, line, format)
+                cursor.block().setUserState(lineNumber)
+                lineNumber += 1
+        else:
+            lastBlock = foldHeader
+            for i in range(foldInfo.segment.lineCount):
+                lastBlock = lastBlock.next()
+            cursor.setPosition(lastBlock.position() + lastBlock.length() - 1, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+
+        foldInfo.visible = visible
+
+        cursor.setPosition(foldHeader.position())
+        cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+        cursor.insertText(self.foldedTestOutputText(foldInfo), self.foldedTestOutputFormat)
+        cursor.endEditBlock()
+
+        self.cursor.movePosition(QTextCursor.End)
 
     def mousePressEvent(self, event):
         cursor = self.cursorForPosition(event.pos())
         block = cursor.block()
-        print('mousePressEvent', cursor, block)
         if block is not None and block.isValid():
             foldInfo = block.userData()
-            print('mousePressEvent', foldInfo)
-            if foldInfo is not None and isinstance(foldInfo, TestOutputFoldInfo):
+            if isinstance(foldInfo, TestOutputFoldInfo):
                 self.foldTestOutput(block, not foldInfo.visible)
 
         super().mousePressEvent(event)
@@ -1358,6 +2029,13 @@ class LogView(QTextBrowser):
             format = self.testHeaderFormat
         self.appendLine(text, format)
 
+    def addTableRow(self, cell, text):
+        # Each table row counts as one logical line
+        cursor = cell.firstCursorPosition()
+        cursor.insertText(text)
+        cursor.block().setUserState(self.lineCount)
+        self.lineCount += 1
+
     def reactorBuildOrder(self, module, packaging):
         self.flushUpdates()
 
@@ -1368,7 +2046,7 @@ class LogView(QTextBrowser):
 
         lastRow = self.reactorBuildOrderTable.rows() - 1
         cell = self.reactorBuildOrderTable.cellAt(lastRow, 0)
-        cell.firstCursorPosition().insertText(module)
+        self.addTableRow(cell, module)
 
         cell = self.reactorBuildOrderTable.cellAt(lastRow, 1)
         cell.firstCursorPosition().insertText(packaging)
@@ -1383,7 +2061,7 @@ class LogView(QTextBrowser):
 
         lastRow = self.reactorSummaryTable.rows() - 1
         cell = self.reactorSummaryTable.cellAt(lastRow, 0)
-        cell.firstCursorPosition().insertText(module)
+        self.addTableRow(cell, module)
         
         cell = self.reactorSummaryTable.cellAt(lastRow, 1)
         cursor = cell.firstCursorPosition()
@@ -1423,15 +2101,208 @@ class LogView(QTextBrowser):
         self.cursor.insertBlock(self.defaultBlockFormat, self.defaultFormat)
 
         if self.autoscroll:
-            self.scrollToBottom()
+            self.requestScrollToBottom()
 
     def dependencyTree(self, dependency):
         self.appendLine(dependency, self.dependencyFormat)
 
+    def linesHidden(self, count):
+        self.appendLine(f'... {count} lines hidden because the display couldn\'t keep up; see the log file ...', self.foldedTestOutputFormat)
+
+class BuildTreeNode:
+    __slots__ = ('parent', 'row', 'text', 'type', 'line', 'foreground', 'children', 'visibleCount', 'fetched')
+
+    def __init__(self, parent, row, text, type, line, foreground):
+        self.parent, self.row = parent, row
+        self.text, self.type, self.line, self.foreground = text, type, line, foreground
+        self.children = []
+        self.visibleCount = 0
+        self.fetched = False
+
+    def __repr__(self):
+        return f'BuildTreeNode({self.text!r}, line={self.line}, children={len(self.children)})'
+
+class BuildTreeModel(QAbstractItemModel):
+    '''
+    Tree of modules, plugins, tests, warnings and errors. addNode() only appends
+    to the node store; flush() tells the views about all new rows at once.
+    Children of nodes which were never expanded are only shown when the view asks
+    for them (fetchMore).
+    '''
+    NodeTypeRole = Qt.UserRole + 1
+    LineRole = Qt.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.root = self.createRoot()
+        self.dirty = {}
+
+    def createRoot(self):
+        root = BuildTreeNode(None, 0, 'ROOT', '', 0, None)
+        root.fetched = True
+        return root
+
+    def clear(self):
+        self.beginResetModel()
+        self.root = self.createRoot()
+        self.dirty = {}
+        self.endResetModel()
+
+    def addNode(self, parent, text, type='', line=0, foreground=None):
+        '''
+        Nodes with line None are waiting for their text. They are always at the
+        end; new nodes which already have a line are inserted before them.
+        '''
+        if parent is None:
+            parent = self.root
+
+        row = len(parent.children)
+        if line is not None:
+            while row > 0 and parent.children[row - 1].line is None:
+                row -= 1
+
+        node = BuildTreeNode(parent, row, text, type, line, foreground)
+        if row == len(parent.children):
+            parent.children.append(node)
+            self.dirty[id(parent)] = parent
+        else:
+            self.insertNode(parent, node)
+        return node
+
+    def insertNode(self, parent, node):
+        row = node.row
+        visible = row < parent.visibleCount
+        if visible:
+            self.beginInsertRows(self.indexOfNode(parent), row, row)
+
+        parent.children.insert(row, node)
+        for sibling in parent.children[row + 1:]:
+            sibling.row += 1
+
+        if visible:
+            parent.visibleCount += 1
+            self.endInsertRows()
+        else:
+            self.dirty[id(parent)] = parent
+
+    def isVisible(self, node):
+        while node.parent is not None:
+            if node.row >= node.parent.visibleCount:
+                return False
+            node = node.parent
+        return True
+
+    def flush(self):
+        # Parents are always added before their children, so they are processed first
+        dirty, self.dirty = self.dirty, {}
+        for node in dirty.values():
+            if node.fetched:
+                self.showChildren(node)
+            elif node.visibleCount == 0 and node.parent is not None and self.isVisible(node):
+                # The view needs to draw the expand indicator
+                index = self.indexOfNode(node)
+                self.dataChanged.emit(index, index)
+
+    def showChildren(self, node):
+        first, last = node.visibleCount, len(node.children) - 1
+        if first > last:
+            return
+
+        self.beginInsertRows(self.indexOfNode(node), first, last)
+        node.visibleCount = last + 1
+        self.endInsertRows()
+
+    def indexOfNode(self, node):
+        if node is None or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def nodeOfIndex(self, index):
+        if not index.isValid():
+            return self.root
+        return index.internalPointer()
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.nodeOfIndex(parent)
+        if column != 0 or row < 0 or row >= node.visibleCount:
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.indexOfNode(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self.nodeOfIndex(parent).visibleCount
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        return len(self.nodeOfIndex(parent).children) > 0
+
+    def canFetchMore(self, parent):
+        node = self.nodeOfIndex(parent)
+        return node.visibleCount < len(node.children)
+
+    def fetchMore(self, parent):
+        node = self.nodeOfIndex(parent)
+        node.fetched = True
+        self.showChildren(node)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        node = index.internalPointer()
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            return node.text
+        if role == Qt.ForegroundRole:
+            return node.foreground
+        if role == self.NodeTypeRole:
+            return node.type
+        if role == self.LineRole:
+            return node.line
+        return None
+
+class TreeState:
+    '''Where LogFrame adds the next nodes of the build tree.'''
+    __slots__ = ('module', 'plugin', 'lastLeaf', 'addedReactorSummary')
+
+    def __init__(self):
+        self.module = None
+        self.plugin = None
+        self.lastLeaf = None
+        self.addedReactorSummary = False
+
+    @property
+    def parent(self):
+        return self.module if self.plugin is None else self.plugin
+
+    def enterModule(self, item):
+        self.module = item
+        self.plugin = None
+        self.lastLeaf = None
+
+    def enterPlugin(self, item):
+        self.plugin = item
+        self.lastLeaf = None
+
+    def leafAdded(self, item):
+        if item is not None:
+            self.lastLeaf = item
+
 class LogFrame(QFrame):
     autoscrollChanged = pyqtSignal(bool)
-    NodeTypeRole = Qt.UserRole + 1
-    TextPositionRole = Qt.UserRole + 2
+    rerunFailedTests = pyqtSignal(object, object) # Project, {module name: [test classes]}
+    NodeTypeRole = BuildTreeModel.NodeTypeRole
+    LineRole = BuildTreeModel.LineRole
+    # Older versions of Surefire only understand the simple name of a test class in -Dtest
+    SUREFIRE_QUALIFIED_NAMES = (2, 19)
     
     NT_Module, NT_Plugin, NT_Anchor = range(3)
     
@@ -1444,11 +2315,17 @@ class LogFrame(QFrame):
         self.warnings = 0
         self.started = None
         self.state = 'Idle'
-        self.currentModule = None
-        self.currentPlugin = None
-        self.lastLeaf = None
-        self.addedReactorSummary = False
+        self.treeState = TreeState()
+        self.priorityState = TreeState()
+        self.pendingPriority = collections.deque()
+        self.resetEarlyStreams()
         self.autoscroll = True
+        self.pendingExpand = []
+        self.scrollTarget = None
+        self.project = None
+        self.module = None
+        self.surefireVersion = None
+        self.failedTests = {} # module name -> [test classes] with failures or errors
 
         layout = QVBoxLayout(self)
         
@@ -1466,12 +2343,22 @@ class LogFrame(QFrame):
         self.statisticsLabel.setSizePolicy(QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed))
         hbox.addWidget(self.statisticsLabel)
 
+        self.rerunButton = QPushButton('Rerun Fail&ed Tests')
+        self.rerunButton.setToolTip('Run only the tests which failed, in the modules where they failed')
+        self.rerunButton.setEnabled(False)
+        self.rerunButton.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        self.rerunButton.clicked.connect(lambda: self.rerunFailedTests.emit(self.project, self.failedTests))
+        hbox.addWidget(self.rerunButton)
+
         self.splitter = QSplitter()
         self.splitter.setOrientation(Qt.Horizontal)
         layout.addWidget(self.splitter)
 
-        self.tree = QScrollableTreeWidget()
+        self.treeModel = BuildTreeModel(self)
+        self.tree = QScrollableTreeView()
         self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setModel(self.treeModel)
         self.tree.clicked.connect(self.treeNodeClicked)
         self.splitter.addWidget(self.tree)
         
@@ -1485,13 +2372,20 @@ class LogFrame(QFrame):
         self.errorBrush = QBrush(preferences.errorColor)
         self.successBrush = QBrush(preferences.successColor)
 
+        # Event handlers only mark things as dirty; the UI is updated once per tick
+        self.coordinator = UiUpdateCoordinator(parent=self)
+        self.logView.setCoordinator(self.coordinator)
+        self.coordinator.register('tree', self.updateTree)
+        self.coordinator.register('treeScroll', self.scrollToBottom)
+        self.coordinator.register('statistics', self.showStatistics)
+
     def setAutoscroll(self, enabled, fireEvent=True):
         self.autoscroll = enabled
         self.logView.autoscroll = enabled
 
         if enabled:
-            self.logView.scrollToBottom()
-            self.scrollToBottom()
+            self.coordinator.markDirty('logScroll')
+            self.coordinator.markDirty('treeScroll')
 
         if fireEvent:
             self.autoscrollChanged.emit(enabled)
@@ -1500,37 +2394,152 @@ class LogFrame(QFrame):
         scrollBar = self.tree.verticalScrollBar()
         scrollBar.setValue(scrollBar.maximum())
 
+    def updateTree(self):
+        self.treeModel.flush()
+
+        for node in self.pendingExpand:
+            self.tree.expand(self.treeModel.indexOfNode(node))
+        self.pendingExpand = []
+
+        if self.scrollTarget is not None:
+            if self.autoscroll:
+                index = self.treeModel.indexOfNode(self.scrollTarget)
+                self.tree.scrollTo(index, QAbstractItemView.PositionAtBottom)
+            self.scrollTarget = None
+
     def treeNodeClicked(self, index):
-        item = self.tree.itemFromIndex(index)
-        pos = item.data(0, self.TextPositionRole)
+        line = index.data(self.LineRole)
+        if line is None:
+            # The log view didn't catch up yet
+            return
+
+        pos = self.logView.positionOfLine(line)
         self.logView.scrollToPosition(pos)
         self.setAutoscroll(False)
 
-    def mavenStarted(self, *args):
-        self.tree.clear()
+    def startBuild(self):
+        self.treeModel.clear()
+        self.pendingExpand = []
+        self.scrollTarget = None
         
         self.started = time.time()
         self.errors = 0
         self.warnings = 0
         self.state = 'Running'
 
-        self.currentModule = None
-        self.currentPlugin = None
-        self.lastLeaf = None
-        self.addedReactorSummary = False
+        self.treeState = TreeState()
+        self.priorityState = TreeState()
+        self.pendingPriority = collections.deque()
+        self.resetEarlyStreams()
+
+        self.module = None
+        self.surefireVersion = None
+        self.failedTests = {}
+        self.rerunButton.setEnabled(False)
 
         self.updateStatistics()
 
+    def priorityEvent(self, name, args, adjacent):
+        '''
+        Events from the priority lane arrive before the log view caught up. They
+        update the tree and the counters right away. The same event arrives
+        again later from the normal lane; it then only adds the text to the log
+        view and fills in the line of the node.
+
+        The modules of a parallel build which are read ahead have streams of
+        their own, so their nodes don't get mixed up with the ones of the
+        module which is shown live.
+        '''
+        state = self.priorityState
+        pending = self.pendingPriority
+        if name == EARLY_RECORD:
+            stream, name, args = args
+            state = self.earlyStates.setdefault(stream, TreeState())
+            pending = self.pendingEarly.setdefault(stream, collections.deque())
+
+            if name == STREAM_LIVE:
+                # The rest of the module comes on the normal priority lane
+                self.priorityState = state
+                return
+
+        if name == 'mavenStarted':
+            self.startBuild()
+            item = None
+        elif name == 'mavenModule':
+            item = self.addModule(state, *args)
+        elif name == 'mavenPlugin':
+            item = self.addPlugin(state, *args)
+        elif name == 'reactorSummary':
+            item = self.addReactorSummary(state)
+        elif name == 'error':
+            item = self.addError(state, *args, adjacent=adjacent)
+        elif name == 'finishedTest':
+            item = self.addTestResult(state, *args, adjacent=adjacent)
+        elif name == 'testsFinished':
+            item = self.addTestsFinished(state, *args, adjacent=adjacent)
+        else:
+            # Not shown in the tree
+            return
+
+        pending.append((name, args, item))
+
+    def resetEarlyStreams(self):
+        self.earlyStates = {} # stream -> TreeState
+        self.pendingEarly = {} # stream -> deque like pendingPriority
+        self.earlyStream = None # The stream which the normal lane is in
+
+    def takePriority(self, name, args):
+        '''Returns (True, node) when the event was already handled by priorityEvent().'''
+        if self.earlyStream is not None:
+            pending = self.pendingEarly[self.earlyStream]
+            if self.matchesPending(pending, name, args):
+                return self.takePending(pending)
+
+            if len(pending) == 0:
+                # The rest of the module was shown live
+                del self.pendingEarly[self.earlyStream]
+                self.earlyStream = None
+
+        if self.matchesPending(self.pendingPriority, name, args):
+            return self.takePending(self.pendingPriority)
+
+        if name == 'mavenModule':
+            for stream, pending in self.pendingEarly.items():
+                if self.matchesPending(pending, name, args):
+                    self.earlyStream = stream
+                    return self.takePending(pending)
+
+        return False, None
+
+    def matchesPending(self, pending, name, args):
+        return len(pending) > 0 and pending[0][0] == name and pending[0][1] == args
+
+    def takePending(self, pending):
+        name, args, item = pending.popleft()
+        if item is not None:
+            item.line = self.logView.nextLine()
+        return True, item
+
+    def mavenStarted(self, *args):
+        handled, item = self.takePriority('mavenStarted', args)
+        if not handled:
+            self.startBuild()
+        self.project = args[0]
+
         self.logView.mavenStarted(*args)
         self.setAutoscroll(True)
     
     def mavenFinished(self, rc):
         self.state = 'Done'
         self.updateStatistics()
+        self.rerunButton.setEnabled(len(self.failedTests) > 0)
 
         self.logView.mavenFinished(rc)
         
     def updateStatistics(self):
+        self.coordinator.markDirty('statistics')
+
+    def showStatistics(self):
         if self.started is None:
             startTimestamp = '-'
             duration = '-'
@@ -1541,70 +2550,135 @@ class LogFrame(QFrame):
         self.statisticsLabel.setText(f'State: {self.state} Started: {startTimestamp} Running: {duration!s} Errors: {self.errors} Warnings: {self.warnings}')
 
     def mavenModule(self, coordinate):
-        item = self.createItem(coordinate, None)
-
-        self.scrollToItem(item)
-        item.setExpanded(True)
-        
-        self.currentModule = item
-        self.currentPlugin = None
-        self.lastLeaf = None
+        handled, item = self.takePriority('mavenModule', (coordinate,))
+        if handled:
+            self.treeState.enterModule(item)
+        else:
+            self.addModule(self.treeState, coordinate)
+        # The normal lane has the order of a serial build, even for parallel builds, so the
+        # tests which follow belong to this module
+        self.module = coordinate
+        self.surefireVersion = None
     
         self.logView.mavenModule(coordinate)
         self.updateStatistics()
 
-    def reactorSummary(self, *args):
-        if not self.addedReactorSummary:
-            item = self.createItem('Reactor Summary', None)
+    def addModule(self, state, coordinate):
+        item = self.createItem(coordinate, None, pending=state is not self.treeState)
 
-            self.scrollToItem(item)
-            item.setExpanded(True)
-            
-            self.currentModule = item
-            self.currentPlugin = None
-            self.lastLeaf = None
-            self.addedReactorSummary = True
+        self.scrollToItem(item)
+        self.expandItem(item)
+        
+        state.enterModule(item)
+        return item
+
+    def reactorSummary(self, *args):
+        handled, item = self.takePriority('reactorSummary', args)
+        if not handled:
+            self.addReactorSummary(self.treeState)
+        elif item is not None:
+            self.treeState.enterModule(item)
+            self.treeState.addedReactorSummary = True
 
         self.logView.reactorSummary(*args)
         self.updateStatistics()
+
+    def addReactorSummary(self, state):
+        if state.addedReactorSummary:
+            return None
+
+        item = self.createItem('Reactor Summary', None, pending=state is not self.treeState)
+
+        self.scrollToItem(item)
+        self.expandItem(item)
+        
+        state.enterModule(item)
+        state.addedReactorSummary = True
+        return item
     
     def mavenPlugin(self, coordinate):
-        item = self.createItem(coordinate, self.currentModule)
+        handled, item = self.takePriority('mavenPlugin', (coordinate,))
+        if handled:
+            self.treeState.enterPlugin(item)
+        else:
+            self.addPlugin(self.treeState, coordinate)
 
-        self.scrollToItem(item)
-        item.setExpanded(True)
-        self.currentPlugin = item
-        self.lastLeaf = None
+        # "maven-surefire-plugin:2.12.4:test (default-test) @ foo"
+        parts = coordinate.split(' ', 1)[0].split(':')
+        if parts[0] == 'maven-surefire-plugin' and len(parts) > 1:
+            self.surefireVersion = parts[1]
 
         self.logView.mavenPlugin(coordinate)
         self.updateStatistics()
+
+    def addPlugin(self, state, coordinate):
+        item = self.createItem(coordinate, state.module, pending=state is not self.treeState)
+
+        self.scrollToItem(item)
+        self.expandItem(item)
+
+        state.enterPlugin(item)
+        return item
     
     def startedTest(self, name):
-        item = self.createItem(name, self.currentPlugin)
+        item = self.createItem(name, self.treeState.plugin)
         
         self.scrollToItem(item)
-        self.lastLeaf = None
+        self.treeState.lastLeaf = None
 
         self.logView.startedTest(name)
         self.updateStatistics()
     
     def finishedTest(self, name, numberOfTests, failures, errors, skipped, duration):
+        args = (name, numberOfTests, failures, errors, skipped, duration)
+        handled, item = self.takePriority('finishedTest', args)
+        if handled:
+            self.treeState.leafAdded(item)
+        else:
+            self.addTestResult(self.treeState, *args)
+
+        if (failures > 0 or errors > 0) and name is not None:
+            tests = self.failedTests.setdefault(self.module, [])
+            name = self.rerunTestName(name)
+            if name not in tests:
+                tests.append(name)
+        
+        self.logView.finishedTest(*args)
+
+    def rerunTestName(self, name):
+        '''How -Dtest of the Surefire which ran the test needs the name of the test class.'''
+        version = [] if self.surefireVersion is None else [int(it) for it in re.findall(r'\d+', self.surefireVersion)[:2]]
+        if tuple(version) >= self.SUREFIRE_QUALIFIED_NAMES:
+            return name
+        return name.rsplit('.', 1)[-1]
+
+    def addTestResult(self, state, name, numberOfTests, failures, errors, skipped, duration, adjacent=True):
         if failures > 0 or errors > 0:
             self.errors += failures + errors
             self.updateStatistics()
-            self.addLeaf(f"Test {name}: {failures} failures, {errors} errors", type='error', foreground=self.errorBrush)
+            return self.addLeaf(state, f"Test {name}: {failures} failures, {errors} errors", type='error', foreground=self.errorBrush, adjacent=adjacent)
         elif skipped > 0:
-            self.addLeaf(f"{skipped} skipped, {numberOfTests} passed", type='error', foreground=self.warningBrush)
-        
-        self.logView.finishedTest(name, numberOfTests, failures, errors, skipped, duration)
+            return self.addLeaf(state, f"{skipped} skipped, {numberOfTests} passed", type='error', foreground=self.warningBrush, adjacent=adjacent)
+        return None
 
     def testsFinished(self, numberOfTests, failures, errors, skipped):
+        args = (numberOfTests, failures, errors, skipped)
+        handled, item = self.takePriority('testsFinished', args)
+        if handled:
+            self.treeState.leafAdded(item)
+        else:
+            self.addTestsFinished(self.treeState, *args)
+
+        self.logView.testsFinished(*args)
+
+    def addTestsFinished(self, state, numberOfTests, failures, errors, skipped, adjacent=True):
         msg = f"{numberOfTests} Tests: {failures} failures, {errors} errors, {skipped} skipped"
         type = ''
         foreground = self.successBrush
         if failures > 0 or errors > 0 or skipped > 0:
             self.errors += failures + errors
             self.warnings += skipped
+            self.updateStatistics()
 
         if failures > 0 or errors > 0:
             type = 'error'
@@ -1613,513 +2687,432 @@ class LogFrame(QFrame):
             type = 'warning'
             foreground=self.warningBrush
         
-        self.addLeaf(msg, type=type, foreground=foreground)
-
-        self.logView.testsFinished(numberOfTests, failures, errors, skipped)
-    
-    def saveTextPosition(self, item):
-        pos = self.logView.endPosition()
-        item.setData(0, self.TextPositionRole, pos)
+        return self.addLeaf(state, msg, type=type, foreground=foreground, adjacent=adjacent)
     
     def warning(self, message):
         self.warnings += 1
         self.updateStatistics()
-        self.addLeaf(message, type='warning', foreground=self.warningBrush)
+        self.addLeaf(self.treeState, message, type='warning', foreground=self.warningBrush)
 
         self.logView.warning(message)
 
     def error(self, message):
-        self.errors += 1
-        self.updateStatistics()
-        self.addLeaf(message, type='error', foreground=self.errorBrush)
+        handled, item = self.takePriority('error', (message,))
+        if handled:
+            self.treeState.leafAdded(item)
+        else:
+            self.addError(self.treeState, message)
 
         self.logView.error(message)
 
+    def addError(self, state, message, adjacent=True):
+        self.errors += 1
+        self.updateStatistics()
+        return self.addLeaf(state, message, type='error', foreground=self.errorBrush, adjacent=adjacent)
+
     def output(self, *args):
-        self.lastLeaf = None
+        self.treeState.lastLeaf = None
 
         self.logView.appendLine(*args)
         
     def testOutput(self, *args):
-        self.lastLeaf = None
+        self.treeState.lastLeaf = None
 
         self.logView.testOutput(*args)
 
-    def addLeaf(self, message, type='', foreground=None, background=None):
-        if self.currentPlugin is None:
-            if self.currentModule is None:
-                parent = None
-            else:
-                parent = self.currentModule
-        else:
-            parent = self.currentPlugin
-
-        if self.lastLeaf is not None:
-            lastType = self.lastLeaf.data(0, self.NodeTypeRole)
-            if lastType == type:
-                return
+    def addLeaf(self, state, message, type='', foreground=None, adjacent=True):
+        # adjacent is False when the priority lane skipped other output since the last event
+        if adjacent and state.lastLeaf is not None:
+            if state.lastLeaf.type == type:
+                return None
     
-        item = self.createItem(message, parent, foreground, background)
-        item.setData(0, self.NodeTypeRole, type)
+        item = self.createItem(message, state.parent, foreground, type, pending=state is not self.treeState)
         
-        self.lastLeaf = item
+        state.lastLeaf = item
         self.scrollToItem(item)
+        return item
 
-    def createItem(self, message, parent, foreground=None, background=None):
+    def createItem(self, message, parent, foreground=None, type='', pending=False):
         maxLength = 200
         if len(message) > maxLength:
             message = message[0:maxLength] + '...'
 
-        try:
-            parentTitle = "ROOT" if parent is None else parent.text(0)
-        except RuntimeError:
-            # TODO To track down RuntimeError: wrapped C/C++ object of type QTreeWidgetItem has been deleted
-            print('message', message)
-            print('currentModule', self.currentModule)
-            print('currentPlugin', self.currentPlugin)
-            print('lastLeaf', self.lastLeaf)
-            print('rowCount', self.tree.model().rowCount())
-            print('parent', parent)
-            raise
-            
-        if parent is None:
-            parent = self.tree
-        #print(f'Adding node {message!r} to {parentTitle!r}')
-        item = QTreeWidgetItem(parent)
-        item.setText(0, message)
-        item.setToolTip(0, message)
-        self.saveTextPosition(item)
-
-        if foreground is not None:
-            item.setForeground(0, foreground)
-        if background is not None:
-            item.setBackground(0, background)
-        
-        return item
-    
+        # Only the logical line; the position in the document is resolved when the node is clicked.
+        # Nodes from the priority lane get their line when the text arrives.
+        line = None if pending else self.logView.nextLine()
+        self.coordinator.markDirty('tree')
+        return self.treeModel.addNode(parent, message, type, line, foreground)
+
+    def expandItem(self, item):
+        # Children of live nodes are shown as soon as they are added
+        item.fetched = True
+        self.pendingExpand.append(item)
+
     def scrollToItem(self, item):
-        if self.autoscroll:
-            index = self.tree.indexFromItem(item, 0)
-            self.tree.scrollTo(index, QAbstractItemView.PositionAtBottom)
+        self.scrollTarget = item
+        self.coordinator.markDirty('tree')
 
-class UnitTestParser(QObject):
-    endOfTests = pyqtSignal(int, int, int, int) # numberOfTests, failures, errors, skipped
-    nextPlugin = pyqtSignal(str) # [INFO] --- ...
-    
-    def __init__(self, runner, customPatternPreferences, logger):
+class LogArchiveModel(QAbstractListModel):
+    OUTPUT_PREFIX = FileLogger.OUTPUT_TYPE + ' '
+
+    def __init__(self, preferences, archive, parent=None):
+        super().__init__(parent)
+
+        self.archive = archive
+        self.errorBrush = QBrush(preferences.errorColor)
+        self.warningBrush = QBrush(preferences.warningColor)
+        self.debugBrush = QBrush(preferences.debugColor)
+
+    def rowCount(self, index=QtCore.QModelIndex()):
+        return 0 if index.isValid() else self.archive.lineCount
+
+    def data(self, index, role):
+        if role == Qt.DisplayRole:
+            line = self.archive.line(index.row())
+            if line.startswith(self.OUTPUT_PREFIX):
+                return line[len(self.OUTPUT_PREFIX):]
+            return line
+        elif role == Qt.ForegroundRole:
+            line = self.archive.line(index.row())
+            if not line.startswith(self.OUTPUT_PREFIX):
+                return self.debugBrush
+            if line.startswith('[ERROR]', len(self.OUTPUT_PREFIX)):
+                return self.errorBrush
+            if line.startswith('[WARNING]', len(self.OUTPUT_PREFIX)):
+                return self.warningBrush
+
+class EventReplayer(QThread):
+    '''Parses a log without a complete index again, away from the UI thread.'''
+    eventsReplayed = pyqtSignal(list) # [(kind, line, args)]
+
+    def __init__(self, path, customPatternPreferences):
         super().__init__()
 
-        self.runner = runner
+        self.path = path
         self.customPatternPreferences = customPatternPreferences
-        self.logger = logger
-        
-        self.state = self.skipTestHeaders
-        self.linesWithDashes = 0
-        self.lastFewLines = []
-
-        factory = LogLevelStrategyFactory(self.customPatternPreferences)
-        self.logLevelStrategy = factory.build()
-
-        self.signalPerLogLevel = {
-            LogLevelStrategy.ERROR: self.runner.error,
-            LogLevelStrategy.WARNING: self.runner.warning,
-            # TODO
-            #LogLevelStrategy.INFO: self.runner.info,
-            #LogLevelStrategy.DEBUG: self.runner.debug,
-            #LogLevelStrategy.TRACE: self.runner.trace,
-            LogLevelStrategy.INFO: self.runner.testOutput,
-            LogLevelStrategy.DEBUG: self.runner.testOutput,
-            LogLevelStrategy.TRACE: self.runner.testOutput,
-            LogLevelStrategy.UNKNOWN: self.runner.testOutput,
-        }
-        
-    def parse(self, line):
+
+    def run(self):
         try:
-            #print(self.state, repr(line))
-            self.state(line)
-        except Exception as ex:
-            raise Exception(f'Error processing {line!r}') from ex
+            events = replayEvents(self.path, self.customPatternPreferences)
+        except:
+            traceback.print_exc()
+            events = []
 
-    def skipTestHeaders(self, line):
-        line = line.strip()
-        if len(line) == 0:
-            return
-        
-        if line == '[INFO] No tests to run.':
-            self.runner.output.emit(line)
-            self.state = self.done
-
-            numberOfTests = 0
-            failures = 0
-            errors = 0
-            skipped = 0
-            self.endOfTests.emit(numberOfTests, failures, errors, skipped)
-            return
+        self.eventsReplayed.emit(events)
 
-        if line == '[INFO] Tests are skipped.':
-            self.runner.output.emit(line)
-            self.state = self.done
+class LogArchiveWindow(QMainWindow):
+    LineRole = BuildTreeModel.LineRole
 
-            numberOfTests = 0
-            failures = 0
-            errors = 0
-            skipped = 0
-            self.endOfTests.emit(numberOfTests, failures, errors, skipped)
-            return
+    def __init__(self, preferences, path, parent=None, customPatternPreferences=None):
+        super().__init__(parent)
 
-        if len(line.strip('-')) == 0:
-            if self.linesWithDashes == 0:
-                self.runner.testsStarted.emit()
+        self.preferences = preferences
+        self.customPatternPreferences = CustomPatternPreferences() if customPatternPreferences is None else customPatternPreferences
+        self.archive = LogArchive(path)
 
-            self.linesWithDashes += 1
-            if self.linesWithDashes == 2:
-                self.state = self.parseUnitTestOutput
-                return
+        self.setWindowTitle(f'{path.name} - Python Maven Runner')
+        self.setAttribute(Qt.WA_DeleteOnClose)
 
-        if line.startswith('[INFO]'):
-            self.runner.output.emit(line)
-            return
+        self.warningBrush = QBrush(preferences.warningColor)
+        self.errorBrush = QBrush(preferences.errorColor)
+        self.successBrush = QBrush(preferences.successColor)
 
-        # Ignore anything else
+        splitter = QSplitter()
+        splitter.setOrientation(Qt.Horizontal)
+        self.setCentralWidget(splitter)
 
-    TEST_START_PREFIX = 'Running '
-    TEST_FINISHED_PREFIX = 'Tests run: '
-    TEST_FINISHED_PATTERN = re.compile(r'Tests run: (\d+), Failures: (\d+), Errors: (\d+), Skipped: (\d+), Time elapsed: (.*)')
-    TESTS_FINISHED_PATTERN = re.compile(r'Tests run: (\d+), Failures: (\d+), Errors: (\d+), Skipped: (\d+)')
-    FAILURE_PATTERN = '<<< FAILURE!'
+        self.treeModel = BuildTreeModel(self)
+        self.tree = QScrollableTreeView()
+        self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setModel(self.treeModel)
+        self.tree.clicked.connect(self.treeNodeClicked)
+        splitter.addWidget(self.tree)
 
-    def parseUnitTestOutput(self, line):
-        if line.startswith(self.TEST_START_PREFIX):
-            name = line[len(self.TEST_START_PREFIX):].strip()
-            self.currentTest = name
-            self.runner.startedTest.emit(name)
-            return
-        
-        if line.startswith(self.TEST_FINISHED_PREFIX):
-            match = self.TEST_FINISHED_PATTERN.fullmatch(line)
-            if match is not None:
-                numberOfTests = int(match.group(1))
-                failures = int(match.group(2))
-                errors = int(match.group(3))
-                skipped = int(match.group(4))
-                duration = match.group(5)
-                self.runner.finishedTest.emit(self.currentTest, numberOfTests, failures, errors, skipped, duration)
-                return
-        
-        if line.endswith(self.FAILURE_PATTERN):
-            signal = self.signalPerLogLevel[LogLevelStrategy.ERROR]
-            signal.emit(line)
-            return
+        self.lines = QListView()
+        self.lines.setUniformItemSizes(True)
+        self.lines.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.lines.setModel(LogArchiveModel(preferences, self.archive, self))
+        splitter.addWidget(self.lines)
 
-        if line == '':
-            self.lastFewLines = ['']
-            self.state = self.mightBeEndOfTests1
-            return
-        
-        level = self.logLevelStrategy.apply(line)
-        signal = self.signalPerLogLevel[level]
-        signal.emit(line)
-    
-    def wasSomethingElse(self):
-        n = len(self.lastFewLines)
-        self.logger.log('MTESTPARSER.wasSomethingElse', f'Emitting {n} lines')
-        for line in self.lastFewLines:
-            self.runner.testOutput.emit(line)
-        
-        self.lastFewLines = []
-        self.state = self.parseUnitTestOutput
-    
-    def mightBeEndOfTests1(self, line):
-        self.logger.log('MTESTPARSER.mightBeEndOfTests1', repr(line))
-        if line.endswith(self.FAILURE_PATTERN):
-            self.wasSomethingElse()
-            signal = self.signalPerLogLevel[LogLevelStrategy.ERROR]
-            signal.emit(line)
-            return
+        splitter.setStretchFactor(0, 30)
+        splitter.setStretchFactor(1, 70)
 
-        self.lastFewLines.append(line)
-        if line == 'Results :':
-            self.state = self.mightBeEndOfTests3
-        elif line == '':
-            return
-        else:
-            self.wasSomethingElse()
-    
-    def mightBeEndOfTests3(self, line):
-        self.logger.log('MTESTPARSER.mightBeEndOfTests3', repr(line))
-        self.lastFewLines.append(line)
-        if line.startswith('Tests run: '):
-            self.testSummaryLine = line
-            self.state = self.mightBeEndOfTests5
-            self.flushLastFewLines()
-        elif line.startswith('Failed tests:') or line.startswith('Tests in error:'):
-            self.lastFewLines.pop(-1)
-            self.flushLastFewLines()
-            self.runner.error.emit(line)
-
-            self.state = self.mightBeEndOfTests4
-        elif line == '':
-            pass
-        else:
-            self.wasSomethingElse()
+        self.replayer = None
+        self.loadEvents()
+        self.resize(1000, 700)
 
-    def flushLastFewLines(self):
-        for line in self.lastFewLines:
-            self.runner.testOutput.emit(line)
+    def loadEvents(self):
+        if self.archive.index.complete:
+            self.populateTree(self.archive.events)
+            return
 
-        self.lastFewLines = []
+        # The build didn't finish writing the index; the tree is filled when the replay is done
+        self.replayer = EventReplayer(self.archive.path, self.customPatternPreferences)
+        self.replayer.eventsReplayed.connect(self.populateTree)
+        self.replayer.start()
+
+    def populateTree(self, events):
+        module = None
+        plugin = None
+        summary = None
+        lastLeaf = None
+
+        for kind, line, args in events:
+            parent = module if plugin is None else plugin
+            if kind == 'module':
+                module = self.addNode(None, args[0], line)
+                plugin = None
+                lastLeaf = None
+            elif kind == 'plugin':
+                plugin = self.addNode(module, args[0], line)
+                lastLeaf = None
+            elif kind == 'startedTest':
+                self.addNode(parent, args[0], line)
+                lastLeaf = None
+            elif kind == 'finishedTest':
+                name, numberOfTests, failures, errors, skipped, duration = args
+                if failures > 0 or errors > 0:
+                    self.addNode(parent, f'Test {name}: {failures} failures, {errors} errors', line, self.errorBrush)
+            elif kind == 'testsFinished':
+                numberOfTests, failures, errors, skipped = args
+                foreground = self.errorBrush if failures > 0 or errors > 0 else self.warningBrush if skipped > 0 else self.successBrush
+                self.addNode(parent, f'{numberOfTests} Tests: {failures} failures, {errors} errors, {skipped} skipped', line, foreground)
+            elif kind in ('warning', 'error'):
+                # Like LogFrame, only the first of a sequence of warnings or errors gets a node
+                if lastLeaf != kind:
+                    foreground = self.errorBrush if kind == 'error' else self.warningBrush
+                    self.addNode(parent, args[0], line, foreground)
+                    lastLeaf = kind
+            elif kind == 'reactorSummary':
+                if summary is None:
+                    summary = self.addNode(None, 'Reactor Summary', line)
+                name, state, duration = args
+                foreground = self.successBrush if state == 'SUCCESS' else self.errorBrush if state == 'FAILURE' else None
+                self.addNode(summary, f'{name} {state} {duration}', line, foreground)
+            elif kind == 'resume':
+                self.addNode(None, f'Resume with -rf {args[0]}', line, self.errorBrush)
+
+        # Only the top level is shown; the rest is added when a node is expanded
+        self.treeModel.flush()
+
+    def addNode(self, parent, message, line, foreground=None):
+        maxLength = 200
+        if len(message) > maxLength:
+            message = message[0:maxLength] + '...'
 
-    def mightBeEndOfTests4(self, line):
-        self.logger.log('MTESTPARSER.mightBeEndOfTests4', repr(line))
-        if line.startswith('Tests run: '):
-            self.testSummaryLine = line
-            self.state = self.mightBeEndOfTests5
-            return
+        return self.treeModel.addNode(parent, message, line=line, foreground=foreground)
 
-        self.runner.error.emit(line)
-    
-    def mightBeEndOfTests5(self, line):
-        self.logger.log('MTESTPARSER.mightBeEndOfTests5', repr(line))
-        if line.startswith('[INFO] '):
-            self.flushLastFewLines()
-            self.emitTestSummary()
+    def treeNodeClicked(self, index):
+        line = index.data(self.LineRole)
+        self.scrollToLine(line)
 
-            if line[7:].strip('-') == '':
-                self.runner.hr.emit()
+    def scrollToLine(self, line):
+        index = self.lines.model().index(line, 0)
+        self.lines.scrollTo(index, QAbstractItemView.PositionAtCenter)
+        self.lines.setCurrentIndex(index)
 
-            if line.startswith('[INFO] --- '):
-                self.nextPlugin.emit(line)
+    def closeEvent(self, event):
+        # The model must not touch the archive after it was closed
+        self.lines.setModel(None)
+        self.archive.close()
 
-            self.state = self.done
+        # Destroying a running QThread aborts the process
+        if self.replayer is not None:
+            self.replayer.eventsReplayed.disconnect(self.populateTree)
+            self.replayer.wait()
 
-    def emitTestSummary(self):
-        self.logger.log('MTESTPARSER.emitTestSummary', 'Emitting end-of-tests signal')
-        match = self.TESTS_FINISHED_PATTERN.fullmatch(self.testSummaryLine)
-        if match is None:
-            raise Exception(f"Can't parse final test result: {self.testSummaryLine!r}")
-        
-        numberOfTests = int(match.group(1))
-        failures = int(match.group(2))
-        errors = int(match.group(3))
-        skipped = int(match.group(4))
-        
-        self.endOfTests.emit(numberOfTests, failures, errors, skipped)
+        super().closeEvent(event)
 
-    def done(self, line):
-        raise Exception(f'Called after end of tests: {line!r}')
+class MavenOutputProcessor(QThread):
+    def __init__(self, runner, process, project, customPatternPreferences, logger, pipeline=None):
+        super().__init__()
 
-class MavenOutputParser:
-    def __init__(self, runner, customPatternPreferences, logger):
         self.runner = runner
+        self.process = process
+        self.project = project
         self.customPatternPreferences = customPatternPreferences
         self.logger = logger
+        self.drainer = None
 
-        self.state = self.output
-        self.isReactorBuild = False
-        self.currentPlugin = ('', '', '')
+        # Without a pipeline, the parser emits the signals of the runner directly
+        if pipeline is None:
+            self.emitter = self.runner
+        else:
+            self.emitter = PipelineEmitter(pipeline, MavenRunner.SIGNAL_NAMES)
 
-    def parse(self, line):
-        try:
-            self.state(line)
-        except Exception as ex:
-            raise Exception(f'Error processing {line!r}') from ex
-
-    MODULE_START_PREFIX = '[INFO] Building '
-    SUMMARY_START_PREFIX = '[INFO] Reactor Summary'
-    MAVEN_PLUGIN_PREFIX = '[INFO] --- '
-    MAVEN_PLUGIN_SUFFIX = ' ---'
-    MAVEN_RESUME_PATTERN = re.compile(r'\[ERROR\]\s+mvn <[^>]+> -rf (\S+)')
-
-    def output(self, line):
-        if line == '[INFO] Reactor Build Order:':
-            self.state = self.reactorBuildOrderSkipEmptyLine
-            self.isReactorBuild = True
-            return
-        if line.startswith(self.MODULE_START_PREFIX):
-            if self.currentPlugin[0] == 'maven-jar-plugin':
-                self.runner.output.emit(line)
-                return
-            if self.currentPlugin[0] == 'maven-source-plugin':
-                self.runner.output.emit(line)
-                return
+        self.parser = MavenOutputParser(self.emitter, self.customPatternPreferences, self.logger)
 
-            self.detectedModuleStart(line[len(self.MODULE_START_PREFIX):])
-            return
-        if line.startswith(self.SUMMARY_START_PREFIX):
-            self.delectedSummaryStart(line[len(self.SUMMARY_START_PREFIX):])
-            return
-        if line.startswith(self.MAVEN_PLUGIN_PREFIX) and line.endswith(self.MAVEN_PLUGIN_SUFFIX):
-            rest = line[len(self.MAVEN_PLUGIN_PREFIX):-len(self.MAVEN_PLUGIN_SUFFIX)]
-            self.detectedMavenPlugin(rest)
-            return
+        if hasattr(self.logger, 'event'):
+            self.installEventLogging()
 
-        if line.startswith('[WARNING]'):
-            self.runner.warning.emit(line[9:].strip())
-            return
-        if line.startswith('[ERROR]'):
-            if ' -rf ' in line:
-                print(f'Parser: Might be resume: {line!r}')
-                match = self.MAVEN_RESUME_PATTERN.fullmatch(line)
-                if match is not None:
-                    resumeOption = match.group(1)
-                    self.runner.resumeDetected.emit(resumeOption)
-                else:
-                    print(f'Parser: Resume: No match')
-            
-            self.runner.error.emit(line[7:].strip())
-            return
-        if line.startswith('[INFO] ') and line[7:].strip('-') == '':
-            self.runner.hr.emit()
-            return
+    def installEventLogging(self):
+        # Direct connections to record the events in the reader thread, next to the lines which caused them
+        installEventLogging(self.emitter, self.logger, Qt.DirectConnection)
 
-        self.runner.output.emit(line)
-
-    def reactorBuildOrderSkipEmptyLine(self, line):
-        if line == '[INFO]':
-            return
+    def run(self):
+        try:
+            self.emitter.mavenStarted.emit(self.project, self.process.args)
 
-        self.state = self.reactorBuildOrder
-        self.state(line)
+            print('Reading from process')
+            # Another thread empties the pipe so Maven never has to wait for the parser
+            self.drainer = PipeDrainer(self.process.stdout).start()
+            for line in self.drainer.lines():
+                self.logger.log('MOUT', line)
+                self.parser.parse(line)
 
-    def reactorBuildOrder(self, line):
-        if line == '[INFO]':
-            self.state = self.output
-            return
+            self.parser.flush()
+            print(f'Pipe drainer: {self.drainer.statistics()}')
+        except:
+            error = traceback.format_exc()
+            self.emitter.error.emit(error)
+        finally:
+            try:
+                rc = self.process.wait(10)
+                self.emitter.mavenFinished.emit(rc)
+            except subprocess.TimeoutExpired:
+                self.emitter.error.emit('Timeout waiting for Maven process to finish')
+                self.emitter.mavenFinished.emit(-1)
 
-        pos1 = line.index(']')
-        pos2 = line.find('[', pos1)
-        if pos2 == -1:
-            module = line[pos1+1:].strip()
-            packaging = ''
-        else:
-            module = line[pos1+1:pos2].strip()
-            packaging = line[pos2+1:-1]
+            if self.logger is not None:
+                self.logger.close()
+                self.runner.cleanupLogs()
 
-        self.runner.reactorBuildOrder.emit(module, packaging)
+class MavenWorkerProcessor(QThread):
+    '''
+    Like MavenOutputProcessor but Maven is started, read and parsed by a
+    ParserWorker in another process. This thread only moves the records into
+    the pipeline.
+    '''
 
-    def detectedModuleStart(self, line):
-        if self.isReactorBuild:
-            pos1 = line.find('[')
-            if pos1 == -1:
-                namePlusVersion = line.strip()
-            else:
-                pos2 = line.index(']', pos1)
-                namePlusVersion = line[:pos1].strip()
-                progress = [int(x) for x in line[pos1+1:pos2].split('/')]
+    def __init__(self, runner, worker, project, pipeline):
+        super().__init__()
 
-                self.runner.progress.emit(*progress)
+        self.runner = runner
+        self.worker = worker
+        self.project = project
+        self.pipeline = pipeline
 
-            self.runner.mavenModule.emit(namePlusVersion)
-        else:
-            self.runner.mavenModule.emit(line)
+    def run(self):
+        finished = False
+        try:
+            self.pipeline.put('mavenStarted', (self.project, self.worker.args))
 
-    def detectedMavenPlugin(self, line):
-        self.runner.mavenPlugin.emit(line.strip())
-        
-        self.currentPlugin = line.strip().split(' ')[0].split(':')
-        
-        if self.currentPlugin[0] == 'maven-surefire-plugin':
-            self.detectedStartOfUnitTests()
-        elif self.currentPlugin[0] == 'maven-dependency-plugin' and self.currentPlugin[2] == 'tree':
-            self.state = self.parseDependencyTree
-    
-    def parseDependencyTree(self, line):
-        if line.startswith('[INFO] ---------------') or line == '[INFO]':
-            self.state = self.output
-            self.output(line)
-        elif line.startswith('[INFO] '):
-            line = line[6:].strip()
-            self.runner.dependencyTree.emit(line)
-        else:
-            self.runner.warning.emit(f'Unexpected output in dependency:tree: {line!r}')
+            print('Starting parser process')
+            self.worker.start()
+            for name, args in self.worker.records():
+                self.pipeline.put(name, args)
+                finished = finished or name == 'mavenFinished'
 
-    def detectedStartOfUnitTests(self):
-        self.logger.log('MPARSER', 'Detected unit test start')
-        self.testParser = UnitTestParser(self.runner, self.customPatternPreferences, self.logger)
-        self.testParser.endOfTests.connect(self.endOfTests)
-        self.testParser.nextPlugin.connect(self.nextPlugin)
-        self.state = self.parseUnitTests
+            print(f'Parser process: {self.worker.statistics()}')
+        except:
+            error = traceback.format_exc()
+            self.pipeline.put('error', (error,))
+        finally:
+            if not finished:
+                self.pipeline.put('error', ('The parser process ended unexpectedly',))
+                self.pipeline.put('mavenFinished', (-1,))
 
-    def parseUnitTests(self, line):
-        self.testParser.parse(line)
+            self.runner.cleanupLogs()
 
-    def nextPlugin(self, line):
-        self.output(line)
+class MavenLogTailProcessor(MavenOutputProcessor):
+    '''
+    Like MavenOutputProcessor but reads a log file which another Maven process
+    writes. Following the same file again continues where the last run of
+    this processor stopped.
+    '''
 
-    def endOfTests(self, numberOfTests, failures, errors, skipped):
-        self.runner.testsFinished.emit(numberOfTests, failures, errors, skipped)
-        self.state = self.output
+    def __init__(self, runner, source, project, customPatternPreferences, logger, pipeline=None):
+        super().__init__(runner, None, project, customPatternPreferences, logger, pipeline)
 
-    def delectedSummaryStart(self, line):
-        self.state = self.reactorSummarySkipEmptyLine
+        self.source = source
 
-    def reactorSummarySkipEmptyLine(self, line):
-        if line == '[INFO]':
-            return
+    def run(self):
+        rc = -1
+        try:
+            self.emitter.mavenStarted.emit(self.project, ['tail', str(self.source)])
+
+            checkpoint = TailCheckpoint(checkpointPath(self.project, self.source))
+            tail, previous = attach(self.source, self.parser, checkpoint)
+            if previous is not None:
+                # The parser of the history must not touch the context which was restored for the tail
+                history = MavenOutputParser(self.emitter, self.customPatternPreferences, self.logger)
+                replayed = replayHistory(previous['log'], previous['lineNumber'], history, self.logger)
+                if replayed < previous['lineNumber']:
+                    self.emitter.output.emit(f'Continuing after line {previous["lineNumber"]} of {self.source}; only {replayed} lines before it are left in {previous["log"]}')
+
+            print(f'Following {self.source}')
+            rc = followLog(tail, self.parser, self.logger, self.emitter, checkpoint, self.isInterruptionRequested)
+            if rc is None:
+                self.emitter.output.emit(f'Stopped following {self.source}')
+                rc = -1
+        except:
+            error = traceback.format_exc()
+            self.emitter.error.emit(error)
+        finally:
+            self.emitter.mavenFinished.emit(rc)
 
-        self.state = self.reactorSummary
-        self.state(line)
+            if self.logger is not None:
+                self.logger.close()
+                self.runner.cleanupLogs()
 
-    def reactorSummary(self, line):
-        if line.startswith('[INFO] ---'):
-            self.state = self.output
-            return
+class PomScanner(QThread):
+    '''
+    Reads the module trees of projects in the background, one project after
+    the other. The modules are reported after each level of the tree.
+    '''
+    modulesFound = pyqtSignal(object, list, bool) # project, [(level, CachedPom)], complete
 
-        pos1 = line.index(']')
-        pos2 = line.find('[', pos1)
+    def __init__(self, parent=None):
+        super().__init__(parent)
 
-        if pos2 == -1:
-            moduleAndState = line[pos1+1:].strip()
-            duration = ''
-        else:
-            moduleAndState = line[pos1+1:pos2].strip()
-            duration = line[pos2+1:-1]
+        self.lock = threading.Lock()
+        self.pending = []
+        self.active = False
 
-        pos3 = moduleAndState.rindex(' ')
-        moduleWithDots = moduleAndState[:pos3]
-        module = moduleWithDots.rstrip(' .')
-        state = moduleAndState[pos3:].strip()
+    def scan(self, projects):
+        with self.lock:
+            for project in projects:
+                if project not in self.pending:
+                    self.pending.append(project)
 
-        self.runner.reactorSummary.emit(module, state, duration)
+            if self.active or len(self.pending) == 0:
+                return
+            self.active = True
 
-class MavenOutputProcessor(QThread):
-    def __init__(self, runner, process, project, customPatternPreferences, logger):
-        super().__init__()
+        # run() may still be returning
+        self.wait()
+        self.start()
 
-        self.runner = runner
-        self.process = process
-        self.project = project
-        self.customPatternPreferences = customPatternPreferences
-        self.logger = logger
+    def nextProject(self):
+        with self.lock:
+            if len(self.pending) == 0 or self.isInterruptionRequested():
+                self.active = False
+                return None
 
-        self.parser = MavenOutputParser(self.runner, self.customPatternPreferences, self.logger)
+            return self.pending.pop(0)
 
     def run(self):
-        try:
-            self.runner.mavenStarted.emit(self.project, self.process.args)
-
-            print('Reading from process')
+        # Spawn the workers only when a project has many outdated POMs; fork() isn't safe with Qt
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
             while True:
-                line = self.process.stdout.readline()
-                if line == '':
+                project = self.nextProject()
+                if project is None:
                     break
 
-                line = line.rstrip()
-                self.logger.log('MOUT', line)
-                self.parser.parse(line)
-        except:
-            error = traceback.format_exc()
-            self.runner.error.emit(error)
-        finally:
-            try:
-                rc = self.process.wait(10)
-                self.runner.mavenFinished.emit(rc)
-            except subprocess.TimeoutExpired:
-                self.runner.error.emit('Timeout waiting for Maven process to finish')
-                self.runner.mavenFinished.emit(-1)
+                try:
+                    modules = project.pomCache.scan(project.path, executor, lambda modules: self.modulesFound.emit(project, modules, False))
+                    project.modules = modules
+                    self.modulesFound.emit(project, modules, True)
+                    print(f'Scanned {project.name}: {project.pomCache.statistics()}')
+                except:
+                    traceback.print_exc()
 
-            if self.logger is not None:
-                self.logger.close()
+    def stop(self):
+        with self.lock:
+            self.pending = []
+        self.requestInterruption()
+        self.wait()
 
 class MavenRunner(QObject):
     mavenStarted = pyqtSignal(Project, list) # project, args
@@ -2140,6 +3133,14 @@ class MavenRunner(QObject):
     resumeDetected = pyqtSignal(str) # resumeOption
     hr = pyqtSignal() # Horizontal line
     dependencyTree = pyqtSignal(str) # dependency
+    linesHidden = pyqtSignal(int) # number of output lines which the UI didn't get
+    priorityEvent = pyqtSignal(str, object, bool) # signal name, args, adjacent to the previous priority event
+
+    SIGNAL_NAMES = SIGNAL_NAMES
+
+    # Limit the work per tick so the UI stays responsive when the parser is faster
+    DRAIN_INTERVAL = 20 # ms
+    DRAIN_BATCH_SIZE = 1000
 
     def __init__(self, project, customPatternPreferences, cmdLine, logger=None):
         super().__init__()
@@ -2148,10 +3149,22 @@ class MavenRunner(QObject):
         self.customPatternPreferences = customPatternPreferences
         self.cmdLine = cmdLine
         self.logger = logger
+        self.retention = None
+        self.pipeline = None
+        self.processor = None
+        self.timeToFirstError = None
+
+        self.drainTimer = QTimer(self)
+        self.drainTimer.setInterval(self.DRAIN_INTERVAL)
+        self.drainTimer.timeout.connect(self.drainPipeline)
 
         self.osInfo = OsSpecificInfo()
 
     def start(self):
+        if self.project.preferences.output.parserProcess:
+            self.startWorker()
+            return
+
         logger = self.logger
         if logger is None:
             logger = self.createLogger()
@@ -2159,38 +3172,90 @@ class MavenRunner(QObject):
         try:
             process = self.createMavenProcess()
 
-            self.processor = MavenOutputProcessor(self, process, self.project, self.customPatternPreferences, logger)
+            self.pipeline = self.createPipeline()
+            self.processor = MavenOutputProcessor(self, process, self.project, self.customPatternPreferences, logger, self.pipeline)
+            self.drainTimer.start()
             self.processor.start()
         except:
             error = traceback.format_exc()
             self.error.emit(error)
 
+    def startWorker(self):
+        try:
+            worker = ParserWorker(self.mavenCommandLine(), self.project.path, self.customPatternPreferences, self.createLogPath())
+
+            self.pipeline = self.createPipeline()
+            self.processor = MavenWorkerProcessor(self, worker, self.project, self.pipeline)
+            self.drainTimer.start()
+            self.processor.start()
+        except:
+            error = traceback.format_exc()
+            self.error.emit(error)
+
+    def follow(self, source):
+        '''Parse the log file source of a Maven build which was started elsewhere.'''
+        logger = self.logger
+        if logger is None:
+            logger = self.createLogger()
+
+        try:
+            self.pipeline = self.createPipeline()
+            self.processor = MavenLogTailProcessor(self, source, self.project, self.customPatternPreferences, logger, self.pipeline)
+            self.drainTimer.start()
+            self.processor.start()
+        except:
+            error = traceback.format_exc()
+            self.error.emit(error)
+
+    def createPipeline(self):
+        preferences = self.project.preferences.output
+        return IngestPipeline(preferences.queueSize, preferences.overloadPolicy)
+
+    def drainPipeline(self):
+        for name, args, adjacent, timestamp in self.pipeline.drainPriority():
+            if self.timeToFirstError is None and (name == 'error' or name == EARLY_RECORD and args[1] == 'error'):
+                self.timeToFirstError = time.monotonic() - timestamp
+                print(f'First error was shown {self.timeToFirstError * 1000:.0f} ms after it was parsed')
+
+            self.priorityEvent.emit(name, args, adjacent)
+
+        for name, args in self.pipeline.drain(self.DRAIN_BATCH_SIZE):
+            getattr(self, name).emit(*args)
+
+            if name == 'mavenFinished':
+                self.drainTimer.stop()
+                print(f'Pipeline: {self.pipeline.statistics()}')
+
+    def stop(self):
+        '''Don't block the reader anymore when nobody is listening.'''
+        self.drainTimer.stop()
+        if self.pipeline is not None:
+            self.pipeline.close()
+        # Only a followed log can stop early; Maven processes keep running
+        if self.processor is not None:
+            self.processor.requestInterruption()
+
     def createLogger(self):
-        timestamp = time.strftime('%Y-%m-%d_%H%M%S', time.localtime(time.time()))
-        filename = f'pmr-{timestamp}.log'
-        folder = Path(tempfile.gettempdir()) / 'PyMavenRunner'
-        logger = FileLogger(folder / filename)
-        return logger
+        return AsyncFileLogger(self.createLogPath())
 
-    def createMavenProcess(self):
-        args = [self.osInfo.mavenCommand]
-        args.extend(self.cmdLine)
-        args.append('-Dfile.encoding=UTF-8')
-        args.append('--show-version')
-        args.append('--batch-mode')
+    def createLogPath(self):
+        self.retention = LogRetention(projectLogFolder(self.project), self.project.preferences.logs)
+        return newLogPath(self.project)
+
+    def cleanupLogs(self):
+        if self.retention is not None:
+            self.retention.start()
+
+    def mavenCommandLine(self):
+        args = mavenCommandLine(self.osInfo.mavenCommand, self.cmdLine)
         print(args)
+        return args
+
+    def createMavenProcess(self):
+        args = self.mavenCommandLine()
 
         try:
-            return subprocess.Popen(
-                args,
-                stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                close_fds=True,
-                cwd=self.project.path,
-                encoding='UTF-8',
-                errors='backslashreplace',
-            )
+            return subprocess.Popen(args, cwd=self.project.path, **MAVEN_POPEN_OPTIONS)
         except Exception as ex:
             osPath = '\n'.join(self.osInfo.commandSearchPath())
             raise Exception(f'Unable to start process: {args!r}\nIs Maven on the path?\n{osPath}') from ex
@@ -2225,12 +3290,17 @@ class MainWindow(QMainWindow):
         self.app = app
         self.projects = []
         self.preferences = QtPreferences()
+        self.runner = None
+        self.scanner = PomScanner(self)
 
         self.settings = QSettings('de.pdark', 'PyMavenRunner')
         self.loadSettings()        
 
         self.createUI()
 
+        # Read the modules of the other projects when the UI is idle, so switching to them is instant
+        QTimer.singleShot(0, lambda: self.scanner.scan(self.projects))
+
     def loadSettings(self):
         self.settings.beginGroup('MainWindow')
         self._size = self.settings.value("size", QSize(800, 600))
@@ -2281,6 +3351,11 @@ class MainWindow(QMainWindow):
         self.header.saveProjectPreferences()
         self.saveSettings()
 
+        if self.runner is not None:
+            self.runner.stop()
+
+        self.scanner.stop()
+
     def createUI(self):
         self.setWindowTitle(f"Python Maven Runner v{pmr.VERSION}")
 
@@ -2289,9 +3364,13 @@ class MainWindow(QMainWindow):
 
         self.header = MavenRunnerFrame(self.projects, self.preferences)
         self.header.startMaven.connect(self.startMaven)
+        self.header.openLog.connect(self.openLog)
+        self.header.followLog.connect(self.followLog)
+        self.header.setScanner(self.scanner)
         self.header.setCurrentProjectIndex(self.currentProjectIndex)
 
         self.logFrame = LogFrame(self.preferences)
+        self.logFrame.rerunFailedTests.connect(self.header.rerunFailedTests)
         self.logView = self.logFrame.logView
 
         layout = QVBoxLayout(frame)
@@ -2306,7 +3385,40 @@ class MainWindow(QMainWindow):
         self.resize(visible.size())
         self.move(visible.topLeft())
 
+    def openLog(self, path):
+        customPatternPreferences = None if self.header.projectPreferences is None else self.header.projectPreferences.customPatternPreferences
+        try:
+            window = LogArchiveWindow(self.preferences, path, self, customPatternPreferences)
+        except:
+            traceback.print_exc()
+            QMessageBox.warning(self, 'Open Log', f'Unable to open {path}:\n{traceback.format_exc(limit=1)}')
+            return
+        window.show()
+
+    def priorityEvent(self, name, args, adjacent):
+        if name == 'resumeDetected':
+            self.header.resumeDetected(*args)
+
     def startMaven(self, project, customPatternPreferences, args):
+        runner = self.createRunner(project, customPatternPreferences, args)
+
+        print('Start background thread')
+        runner.start()
+
+    def followLog(self, path):
+        project = self.header.currentProject
+        if project is None:
+            return
+
+        runner = self.createRunner(project, self.header.projectPreferences.customPatternPreferences, [])
+
+        print(f'Follow {path}')
+        runner.follow(path)
+
+    def createRunner(self, project, customPatternPreferences, args):
+        if self.runner is not None:
+            self.runner.stop()
+
         print('Create MavenRunner')
         runner = MavenRunner(project, customPatternPreferences, args)
 
@@ -2327,9 +3439,14 @@ class MainWindow(QMainWindow):
         runner.hr.connect(self.logView.horizontalLine)
         runner.dependencyTree.connect(self.logView.dependencyTree)
         runner.testsStarted.connect(self.logView.testsStarted)
+        runner.linesHidden.connect(self.logView.linesHidden)
 
-        runner.resumeDetected.connect(self.header.resumeDetected)
+        runner.priorityEvent.connect(self.logFrame.priorityEvent)
+        # resumeDetected reaches the header through the priority lane
+        runner.priorityEvent.connect(self.priorityEvent)
+        runner.reactorSummary.connect(self.header.reactorSummary)
         runner.mavenFinished.connect(self.header.mavenFinished)
 
-        print('Start background thread')
-        runner.start()
+        # The runner drains the pipeline with a timer; keep it alive
+        self.runner = runner
+        return runner
@@ -1,7 +1,8 @@
 #!python3
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtWidgets import QHeaderView, QTreeWidget
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QHeaderView, QTreeView, QTreeWidget
 
 # Copied from https://stackoverflow.com/questions/6625188/qtreeview-horizontal-scrollbar-problems
 class QScrollableTreeWidget(QTreeWidget):
@@ -42,3 +43,45 @@ class QScrollableTreeWidget(QTreeWidget):
         # column's content to automatically resize to the width of the viewport.
         if column_count != 1:
             self.header().setStretchLastSection(True)
+
+class QScrollableTreeView(QTreeView):
+    '''
+    :class:`QTreeView` with the same horizontal scrollbar behavior as
+    :class:`QScrollableTreeWidget`. Instead of measuring the column after each
+    insert (``ResizeToContents``), the column is resized at most once per
+    ``resizeInterval`` milliseconds after rows were added.
+    '''
+
+    def __init__(self, *args, resizeInterval=500, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        header_view = self.header()
+        header_view.setSectionResizeMode(QHeaderView.Interactive)
+        header_view.setStretchLastSection(False)
+
+        self.resizeTimer = QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setInterval(resizeInterval)
+        self.resizeTimer.timeout.connect(self.resizeColumns)
+
+        self.expanded.connect(self.fetchChildren)
+
+    def setModel(self, model) -> None:
+        super().setModel(model)
+
+        model.rowsInserted.connect(self.resizeColumnsLater)
+        model.modelReset.connect(self.resizeColumnsLater)
+
+    def fetchChildren(self, index) -> None:
+        # QTreeView only fetches during the next layout; do it now so the rows exist right away
+        model = self.model()
+        if model.canFetchMore(index):
+            model.fetchMore(index)
+
+    def resizeColumnsLater(self, *args) -> None:
+        if not self.resizeTimer.isActive():
+            self.resizeTimer.start()
+
+    def resizeColumns(self) -> None:
+        for column in range(self.header().count()):
+            self.resizeColumnToContents(column)
@@ -0,0 +1,262 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+import multiprocessing
+import os
+import pickle
+import subprocess
+import tempfile
+import traceback
+from pmr.drainer import PipeDrainer
+from pmr.ingest import PipelineEmitter
+from pmr.logging import AsyncFileLogger, DummyLogger, FileLogger
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser, installEventLogging
+
+MAVEN_POPEN_OPTIONS = dict(
+    stdin=subprocess.DEVNULL,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.STDOUT,
+    close_fds=True,
+    encoding='UTF-8',
+    errors='backslashreplace',
+)
+
+def mavenCommandLine(mavenCommand, cmdLine):
+    args = [mavenCommand]
+    args.extend(cmdLine)
+    args.append('-Dfile.encoding=UTF-8')
+    args.append('--show-version')
+    args.append('--batch-mode')
+    return args
+
+def runMaven(args, cwd, parser, logger, emitter, afterBatch=None):
+    '''Starts Maven, logs and parses its output. Returns the exit code. Problems are emitted as errors.'''
+    process = None
+    try:
+        process = subprocess.Popen(args, cwd=cwd, **MAVEN_POPEN_OPTIONS)
+
+        drainer = PipeDrainer(process.stdout).start()
+        for batch in drainer.batches():
+            for line in batch:
+                logger.log('MOUT', line)
+                parser.parse(line)
+
+            if afterBatch is not None:
+                afterBatch()
+
+        parser.flush()
+        print(f'Pipe drainer: {drainer.statistics()}')
+    except:
+        emitter.error.emit(traceback.format_exc())
+
+    if process is None:
+        return -1
+
+    try:
+        return process.wait(10)
+    except subprocess.TimeoutExpired:
+        emitter.error.emit('Timeout waiting for Maven process to finish')
+        return -1
+
+# Batches which are bigger than this go through the spool file instead of the pipe
+SPOOL_THRESHOLD = 64 * 1024
+
+class BatchSender:
+    '''
+    Stands in for the IngestPipeline in the worker process. The records are
+    collected and sent to the UI process when flush() is called or the batch is
+    full. Large batches are written to the spool file; only their position goes
+    through the pipe. The UI process acknowledges every spooled batch after
+    reading it; once all of them are read, the spool file starts over.
+    '''
+    DEFAULT_BATCH_SIZE = 1000
+    # The records are put into an IngestPipeline in the UI process
+    acceptsEarlyRecords = True
+
+    def __init__(self, connection, spoolPath, spoolThreshold=SPOOL_THRESHOLD, batchSize=DEFAULT_BATCH_SIZE, acknowledgements=None):
+        self.connection = connection
+        self.acknowledgements = acknowledgements
+        self.spoolPath = spoolPath
+        self.spoolThreshold = spoolThreshold
+        self.batchSize = batchSize
+
+        self.records = []
+        self.spool = None
+        self.spoolSize = 0
+        self.acknowledged = 0
+
+    def put(self, name, args=()):
+        self.records.append((name, args))
+
+        if len(self.records) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.records) == 0:
+            return
+
+        data = pickle.dumps(self.records, pickle.HIGHEST_PROTOCOL)
+        self.records = []
+
+        if len(data) < self.spoolThreshold:
+            self.connection.send(('records', data))
+            return
+
+        if self.spool is None:
+            self.spool = open(self.spoolPath, mode='wb')
+
+        self.readAcknowledgements()
+        if self.spoolSize > 0 and self.acknowledged == self.spoolSize:
+            # Nothing in the spool file is pending anymore
+            self.spool.seek(0)
+            self.spool.truncate()
+            self.spoolSize = 0
+            self.acknowledged = 0
+
+        self.spool.write(data)
+        # The UI process reads it from the page cache
+        self.spool.flush()
+        self.connection.send(('spool', self.spoolSize, len(data)))
+        self.spoolSize += len(data)
+
+    def readAcknowledgements(self):
+        if self.acknowledgements is None:
+            return
+
+        while self.acknowledgements.poll():
+            self.acknowledged = self.acknowledgements.recv()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+        if self.acknowledgements is not None:
+            self.acknowledgements.close()
+
+        if self.spool is not None:
+            self.spool.close()
+
+def runWorker(connection, acknowledgements, args, cwd, customPatternPreferences, logPath, spoolPath, spoolThreshold):
+    '''Main function of the worker process: Starts Maven, parses its output and sends the records to the UI process.'''
+    sender = BatchSender(connection, spoolPath, spoolThreshold, acknowledgements=acknowledgements)
+    emitter = PipelineEmitter(sender, SIGNAL_NAMES)
+
+    logger = DummyLogger() if logPath is None else AsyncFileLogger(Path(logPath))
+    if hasattr(logger, 'event'):
+        installEventLogging(emitter, logger)
+
+    parser = MavenOutputParser(emitter, customPatternPreferences, logger)
+    # Send what we have whenever Maven is slower than the parser
+    rc = runMaven(args, cwd, parser, logger, emitter, sender.flush)
+
+    logger.close()
+    emitter.mavenFinished.emit(rc)
+    sender.close()
+
+class ParserWorker:
+    '''
+    Runs Maven in a worker process which also reads and parses the output, so
+    the parser doesn't compete with the UI for the GIL. records() yields the
+    (signal name, args) records of the parser in the UI process.
+    '''
+
+    def __init__(self, args, cwd, customPatternPreferences, logPath=None, spoolThreshold=SPOOL_THRESHOLD):
+        self.args = args
+        self.cwd = cwd
+        self.customPatternPreferences = customPatternPreferences
+        self.logPath = logPath
+        self.spoolThreshold = spoolThreshold
+
+        self.process = None
+        self.connection = None
+        self.acknowledgements = None
+        self.spoolPath = None
+
+        # Statistics
+        self.batches = 0
+        self.spooledBatches = 0
+
+    def start(self):
+        # fork() isn't safe in a process which runs Qt and several threads
+        context = multiprocessing.get_context('spawn')
+        self.connection, childConnection = context.Pipe(duplex=False)
+        # A second pipe carries the acknowledgements of spooled batches back to the worker
+        childAcknowledgements, self.acknowledgements = context.Pipe(duplex=False)
+
+        fd, path = tempfile.mkstemp(prefix='pmr-spool-')
+        os.close(fd)
+        self.spoolPath = Path(path)
+
+        if self.logPath is not None:
+            # Keep the retention away from it while the worker writes it
+            FileLogger.openLogs.add(self.logPath)
+
+        self.process = context.Process(
+            target=runWorker,
+            args=(
+                childConnection, childAcknowledgements, self.args, str(self.cwd), self.customPatternPreferences,
+                None if self.logPath is None else str(self.logPath),
+                str(self.spoolPath), self.spoolThreshold,
+            ),
+            name='pmr-parser',
+            daemon=True,
+        )
+        self.process.start()
+
+        # Only the worker may keep the sending end open; otherwise recv() would never see EOF
+        childConnection.close()
+        childAcknowledgements.close()
+        return self
+
+    def records(self):
+        spool = None
+        try:
+            while True:
+                try:
+                    message = self.connection.recv()
+                except EOFError:
+                    break
+
+                self.batches += 1
+                if message[0] == 'spool':
+                    offset, size = message[1:]
+                    if spool is None:
+                        spool = open(self.spoolPath, mode='rb')
+
+                    spool.seek(offset)
+                    data = spool.read(size)
+                    self.spooledBatches += 1
+                    self.acknowledge(offset + size)
+                else:
+                    data = message[1]
+
+                yield from pickle.loads(data)
+        finally:
+            if spool is not None:
+                spool.close()
+
+            self.close()
+
+    def acknowledge(self, end):
+        try:
+            self.acknowledgements.send(end)
+        except OSError:
+            # The worker is already gone
+            pass
+
+    def close(self):
+        self.connection.close()
+        self.acknowledgements.close()
+        self.process.join(10)
+
+        if self.logPath is not None:
+            FileLogger.openLogs.discard(self.logPath)
+
+        try:
+            self.spoolPath.unlink()
+        except OSError as ex:
+            print(f'Unable to delete {self.spoolPath}: {ex}')
+
+    def statistics(self):
+        return f'{self.batches} batches, {self.spooledBatches} of them through the spool file'
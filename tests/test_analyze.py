@@ -0,0 +1,98 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.analyze import *
+from pmr.logging import FileLogger
+from pathlib import Path
+import gzip
+import json
+import shutil
+import subprocess
+import sys
+
+rootFolder = Path(__file__).parent.parent.resolve()
+cannedOutput = rootFolder / 'tests' / 'expected_output' / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+
+def createFolder(request):
+    folder = rootFolder / 'tmp' / 'test_analyze' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+    return folder
+
+def test_parse_duration():
+    assert parseDuration('[  0.163 s]') == 0.163
+    assert parseDuration('0.138 sec') == 0.138
+    assert parseDuration('01:02 min') == 62.0
+    assert parseDuration('1:02:03 h') == 3723.0
+    assert parseDuration('') is None
+
+def test_format_duration():
+    assert formatDuration(1.53) == '1.5 s'
+    assert formatDuration(62) == '01:02 min'
+    assert formatDuration(3723) == '1:02:03 h'
+    for text in ('01:02 min', '1:02:03 h'):
+        assert formatDuration(parseDuration(text)) == text
+
+def test_summary_of_raw_log():
+    summary = analyzeFile(cannedOutput)
+
+    assert summary['result'] == 'FAILURE'
+    assert summary['totalTime'] == 1.53
+    assert summary['parseError'] is None
+    assert [(it['name'], it['status'], it['duration']) for it in summary['modules']] == [
+        ('IT2 Parent Project 1.0', 'SUCCESS', 0.163),
+        ('IT2 First Module 1.0', 'SUCCESS', 1.0),
+        ('IT2-module2 1.0', 'FAILURE', 0.297),
+    ]
+    assert summary['tests'] == {'run': 6, 'failures': 1, 'errors': 0, 'skipped': 0}
+    assert [it['test'] for it in summary['failedTests']] == ['de.pdark.python.pmr.it2.module2.Foo3Test']
+    assert summary['resume'] == [':IT2-module2']
+
+    surefire = next(it for it in summary['plugins'] if it['name'] == 'maven-surefire-plugin:2.12.4:test')
+    assert surefire['executions'] == 2
+
+def test_file_logger_format_and_gzip(request):
+    folder = createFolder(request)
+    path = folder / 'pmr.log'
+
+    logger = FileLogger(path, index=False)
+    with open(cannedOutput, mode='r', encoding='utf-8') as fh:
+        for line in fh.read().rstrip('\n').split('\n'):
+            logger.log('MOUT', line.rstrip())
+            logger.log('MPARSER', 'not Maven output')
+    logger.close()
+
+    gzPath = folder / 'pmr.log.gz'
+    with open(path, mode='rb') as src, gzip.open(gzPath, mode='wb') as dest:
+        dest.write(src.read())
+
+    expected = analyzeFile(cannedOutput)
+    expected.pop('path')
+    for it in (path, gzPath):
+        summary = analyzeFile(it)
+        assert summary.pop('path') == str(it)
+        assert summary == expected
+
+def test_folder_in_parallel(request):
+    folder = createFolder(request)
+    for i in range(3):
+        shutil.copy(cannedOutput, folder / f'build{i}.log')
+    (folder / 'notes.md').write_text('ignored')
+
+    output = folder / 'summary.csv'
+    assert main(['--format', 'csv', '--jobs', '2', '--output', str(output), str(folder)]) == 0
+
+    lines = output.read_text().splitlines()
+    assert lines[0] == ','.join(CSV_COLUMNS)
+    assert len(lines) == 1 + 3 * 3
+    assert lines[3].endswith(',IT2-module2 1.0,FAILURE,0.297,1,1,0,0,4,53')
+
+def test_cli_doesnt_import_qt():
+    code = 'import sys, pmr.analyze; print("PyQt5" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=str(rootFolder), stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+    result = subprocess.run([sys.executable, str(rootFolder / 'pmr-analyze.py'), '--jobs', '1', str(cannedOutput)], cwd=str(rootFolder), stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0
+    assert json.loads(result.stdout)[0]['result'] == 'FAILURE'
@@ -0,0 +1,185 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.changes import *
+from pmr.maven import PomCache
+from pmr.reactor import ReactorGraph
+from pathlib import Path
+import shutil
+import subprocess
+
+rootFolder = Path(__file__).parent.parent.resolve()
+multiModuleProject = rootFolder / 'it' / 'multi-module-project'
+
+PARENT = 'de.pdark.python.pmr.it2:IT2-parent'
+MODULE1 = 'de.pdark.python.pmr.it2:IT2-module1'
+MODULE2 = 'de.pdark.python.pmr.it2:IT2-module2'
+
+def copyProject(request):
+    folder = rootFolder / 'tmp' / 'test_changes' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    shutil.copytree(multiModuleProject, folder / 'project', ignore=shutil.ignore_patterns('target'))
+    return folder, ReactorGraph(PomCache().scan(folder / 'project'))
+
+def git(folder, *args):
+    subprocess.run(['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com'] + list(args), cwd=folder, check=True, stdout=subprocess.DEVNULL)
+
+def commitProject(folder):
+    git(folder, 'init', '-q')
+    git(folder, 'add', '.')
+    git(folder, 'commit', '-q', '-m', 'Initial')
+
+def test_module_files(request):
+    folder, graph = copyProject(request)
+
+    files = sorted(relPath for relPath, stat in moduleFiles(folder / 'project' / 'module2'))
+    assert files == [
+        'pom.xml',
+        'src/main/java/de/pdark/python/pmr/it2/module2/Foo3.java',
+        'src/test/java/de/pdark/python/pmr/it2/module2/Foo3Test.java',
+        'src/test/resources/logback-test.xml',
+    ]
+
+def test_first_change(request):
+    folder, graph = copyProject(request)
+    detector = ChangeDetector(folder / 'changes.json')
+
+    # Nothing was built yet
+    snapshot = detector.snapshot(graph)
+    assert list(snapshot) == graph.buildOrder()
+    assert detector.firstChange(snapshot) == graph.buildOrder()[0]
+
+    detector.markBuilt(snapshot)
+    detector.save()
+
+    detector = ChangeDetector(folder / 'changes.json')
+    detector.load()
+    snapshot = detector.snapshot(graph)
+    assert detector.firstChange(snapshot) is None
+    # Nothing was read again
+    assert detector.hashed == 0
+
+    source = folder / 'project' / 'module2' / 'src' / 'main' / 'java' / 'de' / 'pdark' / 'python' / 'pmr' / 'it2' / 'module2' / 'Foo3.java'
+    source.write_text(source.read_text() + '\n// changed\n')
+    assert detector.firstChange(detector.snapshot(graph)) == MODULE2
+    assert detector.hashed == 1
+
+def test_same_content_is_no_change(request):
+    folder, graph = copyProject(request)
+    detector = ChangeDetector()
+    detector.markBuilt(detector.snapshot(graph))
+    hashed = detector.hashed
+
+    path = folder / 'project' / 'module1' / 'pom.xml'
+    path.write_bytes(path.read_bytes())
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    assert detector.firstChange(detector.snapshot(graph)) is None
+    assert detector.hashed == hashed + 1
+
+def test_new_and_deleted_files(request):
+    folder, graph = copyProject(request)
+    detector = ChangeDetector()
+    detector.markBuilt(detector.snapshot(graph))
+
+    resources = folder / 'project' / 'module1' / 'src' / 'test' / 'resources'
+    (resources / 'new.txt').write_text('new')
+    assert detector.firstChange(detector.snapshot(graph)) == MODULE1
+
+    (resources / 'new.txt').unlink()
+    assert detector.firstChange(detector.snapshot(graph)) is None
+
+    (resources / 'logback-test.xml').unlink()
+    assert detector.firstChange(detector.snapshot(graph)) == MODULE1
+
+def test_git_changed_files(request):
+    folder, graph = copyProject(request)
+    project = folder / 'project'
+    commitProject(project)
+    assert gitChangedFiles(project) == []
+
+    source = project / 'module2' / 'src' / 'main' / 'java' / 'de' / 'pdark' / 'python' / 'pmr' / 'it2' / 'module2' / 'Foo3.java'
+    source.write_text(source.read_text() + '\n// changed\n')
+    (project / 'README.md').write_text('new')
+    (project / 'module1' / 'notes.txt').write_text('new')
+    git(project, 'mv', 'module1/src/test/resources/logback-test.xml', 'module1/src/test/resources/logback.xml')
+
+    files = gitChangedFiles(project)
+    changed, ignored = modulesOfFiles(graph, files)
+    assert changed == {
+        MODULE1: ['src/test/resources/logback.xml', 'src/test/resources/logback-test.xml'],
+        MODULE2: ['src/main/java/de/pdark/python/pmr/it2/module2/Foo3.java'],
+    }
+    assert {path.name: reason for path, reason in ignored.items()} == {
+        'README.md': f'not a source of {PARENT}',
+        'notes.txt': f'not a source of {MODULE1}',
+    }
+
+def test_plan_changed_build(request):
+    folder, graph = copyProject(request)
+    project = folder / 'project'
+    commitProject(project)
+    detector = ChangeDetector()
+
+    plan, snapshot = planChangedBuild(graph, detector, project)
+    assert plan.changed == []
+    assert plan.mavenArgs() is None
+    assert plan.summary() == 'Nothing changed'
+
+    # Modules which were never built are compared with git
+    path = project / 'module2' / 'pom.xml'
+    path.write_text(path.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+    plan, snapshot = planChangedBuild(graph, detector, project)
+    assert plan.reasons == {MODULE2: 'changed in git: pom.xml'}
+    assert plan.skipped == [PARENT, MODULE1]
+    assert plan.mavenArgs() == ['--projects', MODULE2, '--also-make-dependents']
+    assert plan.summary() == '1 changed, 0 need them, 2 skipped'
+
+    # After a build, the modules are compared with what was built
+    detector.markBuilt(snapshot)
+    git(project, 'commit', '-q', '-a', '-m', 'Change')
+    path = project / 'pom.xml'
+    path.write_text(path.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+
+    plan, snapshot = planChangedBuild(graph, detector, project)
+    assert plan.reasons == {PARENT: 'changed since the last build'}
+    assert plan.dependents == [MODULE1, MODULE2]
+    assert plan.modules == [PARENT, MODULE1, MODULE2]
+    assert 'Built because they need a changed module:\n  ' + MODULE1 in plan.details()
+
+def test_resume_point(request):
+    folder, graph = copyProject(request)
+    detector = ChangeDetector()
+    snapshot = detector.snapshot(graph)
+
+    resume = ResumePoint(folder / 'resume.json')
+    # The failed build ran the modules in a different order
+    resume.record({MODULE2: 'SUCCESS', PARENT: 'SUCCESS', MODULE1: 'FAILURE'})
+    resume.save()
+    detector.markBuilt({PARENT: snapshot[PARENT], MODULE2: snapshot[MODULE2]})
+
+    resume = ResumePoint(folder / 'resume.json')
+    resume.load()
+    plan, snapshot = resume.plan(graph, detector, folder / 'project')
+    assert plan.reasons == {MODULE1: 'FAILURE in the last build'}
+    assert plan.skipped == [PARENT, MODULE2]
+    assert plan.mavenArgs() == ['--projects', MODULE1]
+    assert 'Skipped because they succeeded in the last build and didn\'t change:' in plan.details()
+
+    # A change of the parent needs all modules again, but only the ones of the failed build
+    path = folder / 'project' / 'pom.xml'
+    path.write_text(path.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+    resume.record({PARENT: 'SUCCESS', MODULE1: 'FAILURE'})
+    plan, snapshot = resume.plan(graph, detector, folder / 'project')
+    assert plan.reasons == {PARENT: 'changed since the last build', MODULE1: 'FAILURE in the last build'}
+    assert plan.mavenArgs() == ['--projects', f'{PARENT},{MODULE1}']
+
+    # A resumed build keeps the results of the modules which it skipped
+    resume.record({MODULE1: 'FAILURE'}, resumed=True)
+    assert resume.results == {PARENT: 'SUCCESS', MODULE1: 'FAILURE'}
+
+    resume.clear()
+    resume.save()
+    assert not (folder / 'resume.json').exists()
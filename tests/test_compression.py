@@ -0,0 +1,48 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.compression import *
+from pathlib import Path
+import gzip
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+
+def createFolder(request):
+    folder = rootFolder / 'tmp' / 'test_compression' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+    return folder
+
+def test_compress_and_read_range(request):
+    folder = createFolder(request)
+    source = folder / 'data.txt'
+    data = b''.join(f'line {i}\n'.encode('ascii') for i in range(1000))
+    source.write_bytes(data)
+
+    target = folder / 'data.txt.gz'
+    compressFile(source, target, blockSize=100)
+
+    # Plain gzip tools can read all the blocks
+    assert gzip.decompress(target.read_bytes()) == data
+
+    reader = BlockGzipReader(target)
+    assert reader.size == len(data)
+    assert reader.read(0, 7) == data[0:7]
+    assert reader.read(95, 305) == data[95:305]
+    assert reader.read(len(data) - 5, len(data) + 100) == data[-5:]
+    reader.close()
+
+def test_compress_empty_file(request):
+    folder = createFolder(request)
+    source = folder / 'empty.txt'
+    source.write_bytes(b'')
+
+    target = folder / 'empty.txt.gz'
+    compressFile(source, target)
+
+    reader = BlockGzipReader(target)
+    assert reader.size == 0
+    assert reader.read(0, 10) == b''
+    reader.close()
@@ -0,0 +1,111 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.drainer import *
+import io
+import time
+
+def test_memory_only():
+    buffer = SpillingLineBuffer()
+    buffer.put('a')
+    buffer.put('b')
+    buffer.close()
+
+    assert buffer.take() == ['a', 'b']
+    assert buffer.take() == []
+    assert buffer.spilledLines == 0
+
+def test_spill_keeps_order():
+    buffer = SpillingLineBuffer(memoryLimit=6)
+    for i in range(10):
+        buffer.put(f'line{i}')
+    buffer.close()
+
+    result = []
+    while True:
+        batch = buffer.take(3)
+        if len(batch) == 0:
+            break
+        result.extend(batch)
+
+    assert result == [f'line{i}' for i in range(10)]
+    assert buffer.spilledLines == 9
+    assert buffer.backlog == 0
+    # The spill file is truncated after it was read
+    assert buffer.spillWriteOffset == 0
+
+def test_back_to_memory_after_spill():
+    buffer = SpillingLineBuffer(memoryLimit=12)
+    buffer.put('aaaa')
+    buffer.put('bbbb')
+    buffer.put('cccccc')
+    assert buffer.spilledLines == 1
+
+    assert buffer.take() == ['aaaa', 'bbbb']
+    assert buffer.take() == ['cccccc']
+
+    buffer.put('dddd')
+    assert buffer.spilledLines == 1
+    assert buffer.take() == ['dddd']
+
+def test_memory_limit_counts_bytes():
+    buffer = SpillingLineBuffer(memoryLimit=10)
+    # 4 characters but 8 bytes plus the newline
+    buffer.put('äöüß')
+    buffer.put('x')
+    assert buffer.memorySize == 9
+    assert buffer.spilledLines == 1
+    assert buffer.backlog == 11
+
+    assert buffer.take() == ['äöüß']
+    assert buffer.take() == ['x']
+    assert buffer.memorySize == 0
+    assert buffer.backlog == 0
+
+def test_would_have_blocked():
+    buffer = SpillingLineBuffer(pipeCapacity=10)
+    buffer.put('0123456789')
+    time.sleep(0.05)
+    buffer.take()
+
+    assert buffer.wouldHaveBlocked >= 0.04
+    assert buffer.maxBacklog == 11
+
+def test_drainer():
+    stream = io.StringIO('a\nb  \nc\n')
+    drainer = PipeDrainer(stream).start()
+
+    assert list(drainer.lines()) == ['a', 'b', 'c']
+    assert drainer.wouldHaveBlocked == 0.0
+
+class BrokenStream:
+    def __init__(self):
+        self.lines = ['a\n']
+
+    def readline(self):
+        if len(self.lines) == 0:
+            raise Exception('Broken pipe')
+        return self.lines.pop(0)
+
+def test_drainer_error():
+    drainer = PipeDrainer(BrokenStream()).start()
+
+    result = []
+    try:
+        for line in drainer.lines():
+            result.append(line)
+        assert False, 'Expected exception'
+    except Exception as ex:
+        assert str(ex) == 'Broken pipe'
+
+    assert result == ['a']
+
+def test_discard():
+    buffer = SpillingLineBuffer(memoryLimit=1)
+    buffer.put('a')
+    buffer.put('b')
+    buffer.discard()
+
+    buffer.put('c')
+    assert buffer.spillFile is None
+    assert len(buffer.lines) == 0
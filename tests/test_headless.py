@@ -0,0 +1,90 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.headless import *
+from pmr.logging import LogArchive
+from pathlib import Path
+import io
+import json
+import shutil
+import subprocess
+import sys
+
+rootFolder = Path(__file__).parent.parent.resolve()
+cannedOutput = rootFolder / 'tests' / 'expected_output' / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+
+# Stands in for Maven: Prints the canned output and fails like the build in it
+FAKE_MAVEN = ['-c', 'import sys; sys.stdout.buffer.write(open(sys.argv[1], "rb").read()); sys.exit(1)', str(cannedOutput)]
+
+def createFolder(request):
+    folder = rootFolder / 'tmp' / 'test_headless' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    return folder
+
+def test_headless_run(request):
+    folder = createFolder(request)
+    logPath = folder / 'pmr.log'
+    out = io.StringIO()
+
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+    runner = HeadlessRunner(project, FAKE_MAVEN, logPath, out=out, mavenCommand=sys.executable)
+    assert runner.run() == 1
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith(f'Building multi-module-project: {sys.executable} -c ')
+    assert lines[1:] == [
+        '[1/3] IT2 Parent Project 1.0',
+        '[2/3] IT2 First Module 1.0',
+        '  ERROR 20:19:36.999 [main] ERROR de.pdark.python.pmr.it2.module1.Foo2 - Just a test',
+        '  ERROR \tat de.pdark.python.pmr.it2.module1.Foo2.logException(Foo2.java:16)',
+        '  Tests: 5 run, 0 failures, 0 errors, 0 skipped',
+        '[3/3] IT2-module2 1.0',
+        '  ERROR 20:19:37,366 |-ERROR in ch.qos.logback.core.joran.action.AppenderRefAction - Could not find an appender named [NO_SUCH_APPENDER]. Did you define it below instead of above in the configuration file?',
+        '  FAILED de.pdark.python.pmr.it2.module2.Foo3Test: 1 failures, 0 errors',
+        '  ERROR testStrip(de.pdark.python.pmr.it2.module2.Foo3Test)  Time elapsed: 0.096 sec  <<< FAILURE!',
+        '  ERROR \tat org.junit.Assert.assertEquals(Assert.java:117)',
+        '  ERROR Failed tests:   testStrip(de.pdark.python.pmr.it2.module2.Foo3Test): expected:<X[YZ]> but was:<X[]>',
+        '  Tests: 1 run, 1 failures, 0 errors, 0 skipped',
+        'Reactor Summary:',
+        '  IT2 Parent Project SUCCESS 0.163 s',
+        '  IT2 First Module SUCCESS 1.000 s',
+        '  IT2-module2 FAILURE 0.297 s',
+        '  ERROR Failed to execute goal org.apache.maven.plugins:maven-surefire-plugin:2.12.4:test (default-test) on project IT2-module2: There are test failures.',
+        'Resume with: -rf :IT2-module2',
+        '  ERROR mvn <args> -rf :IT2-module2',
+        'Maven finished with exit code 1',
+    ]
+
+    with open(resultPath(logPath), encoding='utf-8') as fh:
+        result = json.load(fh)
+    assert result['exitCode'] == 1
+    assert result['log'] == str(logPath)
+    assert result['resume'] == [':IT2-module2']
+    assert result['tests'] == {'run': 6, 'failures': 1, 'errors': 0, 'skipped': 0}
+
+    archive = LogArchive(logPath)
+    assert archive.index.complete
+    assert [args[0] for kind, line, args in archive.events if kind == 'module'] == [
+        'IT2 Parent Project 1.0',
+        'IT2 First Module 1.0',
+        'IT2-module2 1.0',
+    ]
+    archive.close()
+
+def test_missing_maven(request):
+    folder = createFolder(request)
+    out = io.StringIO()
+
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+    runner = HeadlessRunner(project, [], folder / 'pmr.log', folder / 'result.json', out=out, mavenCommand=str(folder / 'no-such-mvn'))
+    assert runner.run() == -1
+
+    assert 'no-such-mvn' in out.getvalue()
+    with open(folder / 'result.json', encoding='utf-8') as fh:
+        assert json.load(fh)['exitCode'] == -1
+
+def test_doesnt_import_qt():
+    code = 'import sys, pmr.headless; print("PyQt5" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=str(rootFolder), stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    assert result.stdout.strip() == 'False'
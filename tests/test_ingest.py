@@ -0,0 +1,197 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.ingest import *
+import threading
+import time
+
+def test_records_keep_their_order():
+    pipeline = IngestPipeline()
+    pipeline.put('output', ('a',))
+    pipeline.put('warning', ('b',))
+    pipeline.put('hr')
+
+    assert pipeline.drain() == [('output', ('a',)), ('warning', ('b',)), ('hr', ())]
+    assert pipeline.drain() == []
+
+def test_drain_is_limited():
+    pipeline = IngestPipeline()
+    for i in range(5):
+        pipeline.put('output', (str(i),))
+
+    assert pipeline.drain(3) == [('output', ('0',)), ('output', ('1',)), ('output', ('2',))]
+    assert len(pipeline) == 2
+
+def test_block_waits_for_the_ui():
+    pipeline = IngestPipeline(capacity=2, policy=BLOCK)
+
+    def reader():
+        for i in range(10):
+            pipeline.put('output', (str(i),))
+    thread = threading.Thread(target=reader)
+    thread.start()
+
+    records = []
+    while len(records) < 10:
+        assert len(pipeline) <= 2
+        records.extend(pipeline.drain())
+        time.sleep(0.001)
+    thread.join()
+
+    assert [args[0] for name, args in records] == [str(i) for i in range(10)]
+    assert pipeline.maxDepth == 2
+    assert pipeline.hiddenLines == 0
+
+def test_degrade_hides_output():
+    pipeline = IngestPipeline(capacity=2, policy=DEGRADE)
+    for i in range(5):
+        pipeline.put('output', (str(i),))
+    pipeline.put('testOutput', ('x',))
+
+    assert pipeline.drain(1) == [('output', ('0',))]
+    pipeline.put('output', ('5',))
+
+    assert pipeline.drain() == [('output', ('1',)), (LINES_HIDDEN, (4,)), ('output', ('5',))]
+    assert pipeline.hiddenLines == 4
+
+def test_degrade_hidden_lines_at_end():
+    pipeline = IngestPipeline(capacity=1, policy=DEGRADE)
+    pipeline.put('output', ('0',))
+    pipeline.put('output', ('1',))
+
+    assert pipeline.drain() == [('output', ('0',)), (LINES_HIDDEN, (1,))]
+
+def test_degrade_never_drops_warnings():
+    pipeline = IngestPipeline(capacity=2, policy=DEGRADE)
+
+    def reader():
+        for i in range(10):
+            pipeline.put('output', (str(i),))
+            pipeline.put('warning', (f'W{i}',))
+            pipeline.put('error', (f'E{i}',))
+    thread = threading.Thread(target=reader)
+    thread.start()
+
+    records = []
+    while thread.is_alive() or len(pipeline) > 0:
+        records.extend(pipeline.drain())
+        time.sleep(0.001)
+    thread.join()
+    records.extend(pipeline.drain())
+
+    assert [args[0] for name, args in records if name == 'warning'] == [f'W{i}' for i in range(10)]
+    assert [args[0] for name, args in records if name == 'error'] == [f'E{i}' for i in range(10)]
+
+    shown = len([1 for name, args in records if name == 'output'])
+    hidden = sum(args[0] for name, args in records if name == LINES_HIDDEN)
+    assert shown + hidden == 10
+
+def test_close_releases_the_reader():
+    pipeline = IngestPipeline(capacity=1, policy=BLOCK)
+    pipeline.put('output', ('0',))
+
+    thread = threading.Thread(target=lambda: pipeline.put('output', ('1',)))
+    thread.start()
+    pipeline.close()
+    thread.join(5)
+
+    assert not thread.is_alive()
+
+def test_records_after_close_are_dropped():
+    pipeline = IngestPipeline(capacity=1, policy=BLOCK)
+    pipeline.put('output', ('0',))
+    pipeline.close()
+
+    for i in range(100):
+        pipeline.put('output', (str(i),))
+    pipeline.put('error', ('broken',))
+
+    assert len(pipeline) == 1
+    assert pipeline.drainPriority() == []
+    assert pipeline.dropped == 101
+
+def test_emitter():
+    pipeline = IngestPipeline()
+    emitter = PipelineEmitter(pipeline, ['output', 'warning'])
+
+    seen = []
+    emitter.warning.connect(lambda *args: seen.append(args))
+
+    emitter.output.emit('a')
+    emitter.warning.emit('b')
+
+    assert seen == [('b',)]
+    assert pipeline.drain() == [('output', ('a',)), ('warning', ('b',))]
+
+def test_unknown_policy():
+    try:
+        IngestPipeline(policy='drop')
+        assert False, 'Expected exception'
+    except Exception as ex:
+        assert str(ex) == "Unsupported overload policy 'drop', expected one of ('block', 'degrade')"
+
+def test_priority_lane():
+    pipeline = IngestPipeline()
+    pipeline.put('mavenModule', ('foo',))
+    pipeline.put('output', ('a',))
+    pipeline.put('error', ('E1',))
+    pipeline.put('error', ('E2',))
+    pipeline.put('finishedTest', ('FooTest', 1, 0, 0, 0, '1 s'))
+    pipeline.put('finishedTest', ('BarTest', 1, 1, 0, 0, '1 s'))
+
+    priority = [(name, args, adjacent) for name, args, adjacent, timestamp in pipeline.drainPriority()]
+    assert priority == [
+        ('mavenModule', ('foo',), False),
+        ('error', ('E1',), False),
+        ('error', ('E2',), True),
+        ('finishedTest', ('BarTest', 1, 1, 0, 0, '1 s'), False),
+    ]
+    assert pipeline.drainPriority() == []
+
+    # The normal lane still has everything
+    assert len(pipeline.drain()) == 6
+
+def test_priority_lane_while_reader_is_blocked():
+    pipeline = IngestPipeline(capacity=1, policy=BLOCK)
+    pipeline.put('output', ('a',))
+
+    thread = threading.Thread(target=lambda: pipeline.put('error', ('E1',)))
+    thread.start()
+
+    priority = []
+    while len(priority) == 0:
+        priority = pipeline.drainPriority()
+        time.sleep(0.001)
+
+    assert priority[0][:2] == ('error', ('E1',))
+    assert thread.is_alive()
+
+    pipeline.drain()
+    thread.join()
+
+def test_early_records():
+    pipeline = IngestPipeline()
+    early = EarlyRecords(pipeline, 1)
+    early.put('mavenModule', ('bar',))
+    early.put('output', ('b',))
+    early.put('error', ('E1',))
+    early.put('error', ('E2',))
+
+    priority = [(name, args, adjacent) for name, args, adjacent, timestamp in pipeline.drainPriority()]
+    assert priority == [
+        (EARLY_RECORD, (1, 'mavenModule', ('bar',)), False),
+        (EARLY_RECORD, (1, 'error', ('E1',)), False),
+        (EARLY_RECORD, (1, 'error', ('E2',)), True),
+    ]
+    # Only the priority lane gets them
+    assert len(pipeline) == 0
+
+    # The lines are parsed again later; they were already on the priority lane
+    pipeline.put(REPLAYING, (True,))
+    pipeline.put('mavenModule', ('bar',))
+    pipeline.put('error', ('E1',))
+    pipeline.put(REPLAYING, (False,))
+    pipeline.put('error', ('E3',))
+
+    assert [args for name, args, adjacent, timestamp in pipeline.drainPriority()] == [('E3',)]
+    assert pipeline.drain() == [('mavenModule', ('bar',)), ('error', ('E1',)), ('error', ('E3',))]
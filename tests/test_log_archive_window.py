@@ -0,0 +1,121 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.logging import FileLogger
+from pmr.ui import QtPreferences, LogArchiveWindow
+from pathlib import Path
+from PyQt5.QtCore import Qt
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+
+def createLog(request):
+    path = rootFolder / 'tmp' / 'test_log_archive_window' / request.node.name / 'pmr.log'
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+
+    log = FileLogger(path)
+    log.log('MOUT', '[INFO] Building foo 1.0')
+    log.event('module', 'foo 1.0')
+    log.log('MOUT', '[INFO] --- maven-surefire-plugin:2.12.4:test (default-test) @ foo ---')
+    log.event('plugin', 'maven-surefire-plugin:2.12.4:test (default-test) @ foo')
+    log.log('MOUT', '[WARNING] first')
+    log.event('warning', 'first')
+    log.log('MOUT', '[WARNING] second')
+    log.event('warning', 'second')
+    log.log('MOUT', '[ERROR] broken')
+    log.event('error', 'broken')
+    log.close()
+
+    return path
+
+def test_tree_from_events(qtbot, request):
+    path = createLog(request)
+
+    window = LogArchiveWindow(QtPreferences(), path)
+    qtbot.addWidget(window)
+
+    tree = window.treeModel
+    module = tree.index(0, 0)
+    assert module.data() == 'foo 1.0'
+    # Children are added when the node is expanded
+    assert tree.rowCount(module) == 0
+    window.tree.expand(module)
+    plugin = tree.index(0, 0, module)
+    assert plugin.data() == 'maven-surefire-plugin:2.12.4:test (default-test) @ foo'
+    window.tree.expand(plugin)
+    assert [tree.index(i, 0, plugin).data() for i in range(tree.rowCount(plugin))] == ['first', 'broken']
+    assert tree.index(1, 0, plugin).data(LogArchiveWindow.LineRole) == 4
+
+    model = window.lines.model()
+    assert model.rowCount() == 5
+    assert model.data(model.index(4, 0), Qt.DisplayRole) == '[ERROR] broken'
+
+    window.scrollToLine(4)
+    assert window.lines.currentIndex().row() == 4
+
+    window.close()
+
+def test_tree_of_crashed_build(qtbot, request):
+    path = rootFolder / 'tmp' / 'test_log_archive_window' / request.node.name / 'pmr.log'
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+
+    log = FileLogger(path)
+    log.log('MOUT', '[INFO] Building foo 1.0')
+    log.log('MOUT', '[WARNING] first')
+    # Simulate a crash: The index has no events
+    log.fh.close()
+    log.index.flushOffsets()
+    log.index.fh.close()
+
+    window = LogArchiveWindow(QtPreferences(), path)
+    qtbot.addWidget(window)
+
+    # The log is parsed again in the background
+    tree = window.treeModel
+    qtbot.waitUntil(lambda: tree.rowCount() > 0)
+    module = tree.index(0, 0)
+    assert module.data() == 'foo 1.0'
+    window.tree.expand(module)
+    assert tree.index(0, 0, module).data() == 'first'
+    assert tree.index(0, 0, module).data(LogArchiveWindow.LineRole) == 1
+
+    window.close()
+
+def test_log_without_index(qtbot, request):
+    path = rootFolder / 'tmp' / 'test_log_archive_window' / request.node.name / 'build.log'
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+    path.parent.mkdir(parents=True)
+    # Written by "mvn -l"
+    path.write_text('[INFO] Building foo 1.0\n[WARNING] first\n', encoding='utf-8')
+
+    window = LogArchiveWindow(QtPreferences(), path)
+    qtbot.addWidget(window)
+
+    # The log is parsed again in the background
+    tree = window.treeModel
+    qtbot.waitUntil(lambda: tree.rowCount() > 0)
+    module = tree.index(0, 0)
+    assert module.data() == 'foo 1.0'
+    window.tree.expand(module)
+    assert tree.index(0, 0, module).data() == 'first'
+
+    model = window.lines.model()
+    assert model.data(model.index(1, 0), Qt.DisplayRole) == '[WARNING] first'
+
+    window.close()
+
+def test_close_during_replay(qtbot, request):
+    path = rootFolder / 'tmp' / 'test_log_archive_window' / request.node.name / 'build.log'
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+    path.parent.mkdir(parents=True)
+    path.write_text('[INFO] Building foo 1.0\n' * 10000, encoding='utf-8')
+
+    window = LogArchiveWindow(QtPreferences(), path)
+    qtbot.addWidget(window)
+    window.close()
+
+    assert window.replayer.isFinished()
@@ -1,10 +1,15 @@
 #!python3
 # -*- coding: utf-8 -*-
 
+from pmr.ingest import IngestPipeline, PipelineEmitter
+from pmr.logging import DummyLogger
 from pmr.model import *
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser
 from pmr.ui import QtPreferences, LogFrame
 from pathlib import Path
 
+rootFolder = Path(__file__).parent.parent.resolve()
+
 def test_maven_started(qtbot, qtmodeltester):
 	prefs = QtPreferences()
 	widget = LogFrame(prefs)
@@ -39,4 +44,241 @@ def test_hierarchy(qtbot, qtmodeltester):
 	widget.startedTest('next test')
 
 	# TODO Core dump
-	#qtmodeltester.check(widget.tree.model())
\ No newline at end of file
+	#qtmodeltester.check(widget.tree.model())
+
+def test_tree_nodes_dont_flush(qtbot):
+	prefs = QtPreferences()
+	widget = LogFrame(prefs)
+	qtbot.addWidget(widget)
+
+	widget.mavenModule('foo:1.0')
+	widget.output('output')
+	for i in range(10):
+		widget.warning(f'WARN {i}')
+		widget.output('output')
+
+	assert widget.logView.document().toPlainText() == 'Ready.\n'
+
+	widget.updateTree()
+
+	model = widget.treeModel
+	index = model.index(8, 0, model.index(0, 0))
+	assert index.data() == 'WARN 8'
+	assert index.data(LogFrame.LineRole) == 18
+
+	widget.treeNodeClicked(index)
+
+	cursor = widget.logView.textCursor()
+	assert cursor.block().text() == 'WARN 8'
+
+def test_tree_is_updated_in_batches(qtbot):
+	prefs = QtPreferences()
+	widget = LogFrame(prefs)
+	qtbot.addWidget(widget)
+
+	widget.mavenModule('foo:1.0')
+	widget.mavenPlugin('maven-surefire-plugin:2.12.4:test')
+	for i in range(100):
+		widget.startedTest(f'Test{i}')
+
+	model = widget.treeModel
+	assert model.rowCount() == 0
+
+	widget.updateTree()
+
+	module = model.index(0, 0)
+	plugin = model.index(0, 0, module)
+	assert model.rowCount() == 1
+	assert plugin.data() == 'maven-surefire-plugin:2.12.4:test'
+	assert model.rowCount(plugin) == 100
+	assert widget.tree.isExpanded(module)
+	assert widget.tree.isExpanded(plugin)
+
+	widget.startedTest('Test100')
+	widget.updateTree()
+	assert model.index(100, 0, plugin).data() == 'Test100'
+
+def test_statistics_are_updated_once_per_tick(qtbot):
+	prefs = QtPreferences()
+	widget = LogFrame(prefs)
+	qtbot.addWidget(widget)
+
+	for i in range(100):
+		widget.warning(f'WARN {i}')
+
+	assert widget.statisticsLabel.text() == 'Waiting.'
+
+	widget.coordinator.tick()
+	assert widget.statisticsLabel.text() == 'State: Idle Started: - Running: - Errors: 0 Warnings: 100'
+	assert widget.coordinator.ticks == 1
+
+def dumpTree(model, parent=None, indent=''):
+	from PyQt5.QtCore import QModelIndex
+	if parent is None:
+		parent = QModelIndex()
+
+	result = []
+	for row in range(model.rowCount(parent)):
+		index = model.index(row, 0, parent)
+		result.append(f'{indent}{index.data()} line={index.data(LogFrame.LineRole)} type={index.data(LogFrame.NodeTypeRole)!r}')
+		result.extend(dumpTree(model, index, indent + '  '))
+	return result
+
+buildEvents = [
+	('mavenStarted', (Project(Path('Foo')), ['mvn', 'install'])),
+	('warning', ('Early warning',)),
+	('mavenModule', ('foo 1.0',)),
+	('mavenPlugin', ('maven-surefire-plugin:2.12.4:test',)),
+	('startedTest', ('FooTest',)),
+	('testOutput', ('output',)),
+	('finishedTest', ('FooTest', 2, 1, 0, 0, '1 s')),
+	('startedTest', ('BarTest',)),
+	('finishedTest', ('BarTest', 1, 0, 0, 0, '1 s')),
+	('testsFinished', (3, 1, 0, 0)),
+	('error', ('E1',)),
+	('error', ('E2',)),
+	('output', ('output',)),
+	('error', ('E3',)),
+	('mavenModule', ('bar 1.0',)),
+	('mavenPlugin', ('maven-compiler-plugin:3.1:compile',)),
+	('warning', ('W1',)),
+	('reactorSummary', ('foo', 'FAILURE', '1 s')),
+	('reactorSummary', ('bar', 'SKIPPED', '0 s')),
+	('error', ('BUILD FAILURE',)),
+	('mavenFinished', (1,)),
+]
+
+def createLogFrame(qtbot):
+	widget = LogFrame(QtPreferences())
+	qtbot.addWidget(widget)
+	return widget
+
+def test_priority_lane_builds_the_same_tree(qtbot):
+	from pmr.ingest import IngestPipeline
+
+	direct = createLogFrame(qtbot)
+	for name, args in buildEvents:
+		getattr(direct, name)(*args)
+	direct.updateTree()
+	expected = dumpTree(direct.treeModel)
+
+	widget = createLogFrame(qtbot)
+	pipeline = IngestPipeline()
+	for name, args in buildEvents:
+		pipeline.put(name, args)
+
+	for name, args, adjacent, timestamp in pipeline.drainPriority():
+		widget.priorityEvent(name, args, adjacent)
+	widget.updateTree()
+
+	# Errors and failed tests are counted before the log view caught up
+	assert widget.errors == direct.errors
+	assert widget.logView.nextLine() == 0
+	assert widget.treeModel.index(0, 0).data() == 'foo 1.0'
+	assert widget.treeModel.index(0, 0).data(LogFrame.LineRole) is None
+
+	for name, args in pipeline.drain():
+		getattr(widget, name)(*args)
+	widget.updateTree()
+
+	assert dumpTree(widget.treeModel) == expected
+	assert (widget.errors, widget.warnings) == (direct.errors, direct.warnings)
+	assert len(widget.pendingPriority) == 0
+
+def test_rerun_failed_tests(qtbot):
+	prefs = QtPreferences()
+	widget = LogFrame(prefs)
+	qtbot.addWidget(widget)
+
+	project = Project(Path('Foo'))
+	widget.mavenStarted(project, ['mvn', 'clean', 'install'])
+	widget.mavenModule('module1 1.0')
+	widget.mavenPlugin('maven-surefire-plugin:2.22.2:test (default-test) @ module1')
+	widget.startedTest('a.OkTest')
+	widget.finishedTest('a.OkTest', 3, 0, 0, 0, '0.1 s')
+	widget.startedTest('a.BrokenTest')
+	widget.finishedTest('a.BrokenTest', 3, 1, 0, 0, '0.1 s')
+	widget.mavenModule('module2 1.0')
+	# Too old for qualified names
+	widget.mavenPlugin('maven-surefire-plugin:2.12.4:test (default-test) @ module2')
+	widget.startedTest('b.FailingTest')
+	widget.finishedTest('b.FailingTest', 1, 0, 1, 0, '0.1 s')
+	assert not widget.rerunButton.isEnabled()
+	widget.mavenFinished(1)
+
+	assert widget.rerunButton.isEnabled()
+	with qtbot.waitSignal(widget.rerunFailedTests) as blocker:
+		widget.rerunButton.click()
+	assert blocker.args == [project, {'module1 1.0': ['a.BrokenTest'], 'module2 1.0': ['FailingTest']}]
+
+	widget.mavenStarted(project, ['mvn', 'clean', 'install'])
+	assert not widget.rerunButton.isEnabled()
+	assert widget.failedTests == {}
+
+def withThread(name, lines):
+	# Lines of Maven show the name of the thread, the output of the tests doesn't
+	groups = []
+	for line in lines:
+		if line.startswith('[') or len(groups) == 0:
+			groups.append([f'[{name}] {line}'])
+		else:
+			groups[-1].append(line)
+	return groups
+
+def cannedLines():
+	path = rootFolder / 'tests' / 'expected_output' / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+	return [it.rstrip() for it in path.read_text(encoding='utf-8').split('\n')]
+
+def parallelOutput(lines):
+	# The parent and module2 with the failed test start at the same time; module1 follows the parent and waits for module2
+	parent = next(i for i, it in enumerate(lines) if it.startswith('[INFO] ---') and 'IT2-parent >' in it)
+	module2 = next(i for i, it in enumerate(lines) if it.startswith('[INFO] ---') and 'IT2-module2 >' in it)
+	summary = next(i for i, it in enumerate(lines) if it.startswith('[INFO] Reactor Summary')) - 1
+
+	# Each thread logs the empty line before the header of its module
+	thread1 = withThread('T1', lines[parent - 1:module2 - 1])
+	thread2 = withThread('T2', lines[module2 - 1:summary])
+	result = [f'[main] {it}' for it in lines[:parent - 1]]
+	while len(thread1) > 0 or len(thread2) > 0:
+		for groups in (thread1, thread2):
+			if len(groups) > 0:
+				result.extend(groups.pop(0))
+	result.extend(f'[main] {it}' if it.startswith('[') else it for it in lines[summary:])
+	return result
+
+def parseIntoLogFrame(widget, lines, priority=True):
+	pipeline = IngestPipeline(capacity=1000000)
+	parser = MavenOutputParser(PipelineEmitter(pipeline, SIGNAL_NAMES), CustomPatternPreferences(), DummyLogger())
+	widget.mavenStarted(Project(Path('Foo')), ['mvn', 'clean', 'install'])
+	for line in lines:
+		parser.parse(line)
+	parser.flush()
+
+	if priority:
+		for name, args, adjacent, timestamp in pipeline.drainPriority():
+			widget.priorityEvent(name, args, adjacent)
+	for name, args in pipeline.drain():
+		# Like MainWindow, only the signals which LogFrame handles
+		if hasattr(widget, name):
+			getattr(widget, name)(*args)
+	widget.updateTree()
+
+def test_failed_tests_of_parallel_build(qtbot):
+	widget = createLogFrame(qtbot)
+	parseIntoLogFrame(widget, parallelOutput(cannedLines()))
+
+	# Surefire 2.12.4 only understands the simple name
+	assert widget.failedTests == {'IT2-module2 1.0': ['Foo3Test']}
+
+def test_priority_lane_of_parallel_build(qtbot):
+	direct = createLogFrame(qtbot)
+	parseIntoLogFrame(direct, parallelOutput(cannedLines()), priority=False)
+
+	widget = createLogFrame(qtbot)
+	parseIntoLogFrame(widget, parallelOutput(cannedLines()))
+
+	# The modules which had to wait were read ahead; their nodes were matched when they reached the normal lane
+	assert dumpTree(widget.treeModel) == dumpTree(direct.treeModel)
+	assert (widget.errors, widget.warnings) == (direct.errors, direct.warnings)
+	assert len(widget.pendingPriority) == 0
+	assert widget.pendingEarly == {}
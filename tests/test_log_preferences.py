@@ -0,0 +1,27 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.model import *
+
+def test_no_pickle_defaults():
+    prefs = LogPreferences()
+    assert prefs.pickle() == None
+
+def test_unpickle_empty_dict():
+    prefs = LogPreferences()
+    prefs.unpickle({})
+    assert prefs.pickle() == None
+
+def test_pickle_and_unpickle():
+    prefs = LogPreferences()
+    prefs.maxCount = 3
+    prefs.maxAgeDays = 1
+    data = prefs.pickle()
+    assert data == {
+        'maxCount': 3,
+        'maxAgeDays': 1,
+    }
+
+    prefs = LogPreferences()
+    prefs.unpickle(data)
+    assert prefs.pickle() == data
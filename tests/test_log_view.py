@@ -408,3 +408,139 @@ def test_scrolling(qtbot):
     
     cursor = view.textCursor()
     assert [cursor.selectionStart(), cursor.selectionEnd()] == [0, 6]
+
+def test_successful_test_output_is_spilled(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.startedTest('FooTest')
+    view.testOutput('line 1')
+    view.testOutput('line 2')
+    view.finishedTest('FooTest', 1, 0, 0, 0, '1 s')
+
+    actual = dump(view)
+    assert actual == [
+        ['#BLOCK', 'F2:FooTest'],
+        ['#BLOCK,CF:2', 'F4:[+] 2 lines of output'],
+        ['#BLOCK', 'F2:Tests run: 1 Failures: 0 Errors: 0 Skipped: 0 Time elapsed: 1 s'],
+    ]
+
+def test_expand_and_collapse_spilled_test_output(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.startedTest('FooTest')
+    view.testOutput('line 1')
+    view.testOutput('line 2')
+    view.finishedTest('FooTest', 1, 0, 0, 0, '1 s')
+    view.flushUpdates()
+
+    foldHeader = view.document().findBlockByNumber(1)
+    view.foldTestOutput(foldHeader, True)
+
+    actual = dump(view)
+    assert actual == [
+        ['#BLOCK', 'F2:FooTest'],
+        ['#BLOCK,CF:2', 'F4:[-] 2 lines of output'],
+        ['#BLOCK', 'F0:line 1'],
+        ['#BLOCK', 'F0:line 2'],
+        ['#BLOCK', 'F2:Tests run: 1 Failures: 0 Errors: 0 Skipped: 0 Time elapsed: 1 s'],
+    ]
+
+    view.foldTestOutput(foldHeader, False)
+
+    actual = dump(view)
+    assert actual == [
+        ['#BLOCK', 'F2:FooTest'],
+        ['#BLOCK,CF:2', 'F4:[+] 2 lines of output'],
+        ['#BLOCK', 'F2:Tests run: 1 Failures: 0 Errors: 0 Skipped: 0 Time elapsed: 1 s'],
+    ]
+
+def test_spilled_test_output_keeps_formats(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.startedTest('FooTest')
+    view.testOutput('line 1')
+    view.dependencyTree('dependency')
+    view.linesHidden(3)
+    view.finishedTest('FooTest', 1, 0, 0, 0, '1 s')
+    view.flushUpdates()
+
+    foldHeader = view.document().findBlockByNumber(1)
+    view.foldTestOutput(foldHeader, True)
+
+    formats = []
+    block = foldHeader.next()
+    for i in range(3):
+        formats.append(block.begin().fragment().charFormat())
+        block = block.next()
+    assert formats[0] == view.defaultFormat
+    assert formats[1] == view.dependencyFormat
+    assert formats[2] == view.foldedTestOutputFormat
+
+def test_failed_test_output_is_kept(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.startedTest('FooTest')
+    view.testOutput('line 1')
+    view.finishedTest('FooTest', 1, 1, 0, 0, '1 s')
+
+    actual = dump(view)
+    assert actual == [
+        ['#BLOCK', 'F2:FooTest'],
+        ['#BLOCK,CF:2', 'F0:line 1'],
+        ['#BLOCK', 'F3:Tests run: 1 Failures: 1 Errors: 0 Skipped: 0 Time elapsed: 1 s'],
+    ]
+
+def test_position_of_line(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.appendLine('first')
+    view.startedTest('FooTest')
+    view.testOutput('line 1')
+    view.testOutput('line 2')
+    view.finishedTest('FooTest', 1, 0, 0, 0, '1 s')
+    assert view.nextLine() == 5
+    view.appendLine('last')
+
+    # Nothing was written to the document so far
+    assert view.document().toPlainText() == ''
+
+    document = view.document()
+    def textOfLine(line):
+        return document.findBlock(view.positionOfLine(line)).text()
+
+    assert textOfLine(0) == 'first'
+    assert textOfLine(1) == 'FooTest'
+    # Spilled lines resolve to the fold header
+    assert textOfLine(2) == '[+] 2 lines of output'
+    assert textOfLine(3) == '[+] 2 lines of output'
+    assert textOfLine(4) == 'Tests run: 1 Failures: 0 Errors: 0 Skipped: 0 Time elapsed: 1 s'
+    assert textOfLine(5) == 'last'
+
+    view.foldTestOutput(document.findBlockByNumber(2), True)
+    assert textOfLine(2) == 'line 1'
+    assert textOfLine(3) == 'line 2'
+    assert textOfLine(5) == 'last'
+
+def test_position_of_line_after_table(qtbot):
+    view = createLogView()
+    view.clear()
+    qtbot.addWidget(view)
+
+    view.appendLine('first')
+    view.reactorSummary('foo', 'SUCCESS', '1 s')
+    view.reactorSummary('bar', 'SUCCESS', '1 s')
+    view.appendLine('last')
+
+    document = view.document()
+    assert document.findBlock(view.positionOfLine(2)).text() == 'bar'
+    assert document.findBlock(view.positionOfLine(3)).text() == 'last'
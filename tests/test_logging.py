@@ -3,7 +3,10 @@
 
 from pmr.logging import *
 from pathlib import Path
+import pytest
 import shutil
+import sys
+import time
 
 rootFolder = Path(__file__).parent.parent.resolve()
 
@@ -19,6 +22,23 @@ def test_MockLogger():
     
     assert log.events == [('message',)]
 
+def test_projectDataFolder(monkeypatch):
+    class Project:
+        def __init__(self, path):
+            self.path = path
+            self.name = path.name
+
+    monkeypatch.setattr(sys, 'platform', 'linux')
+    monkeypatch.setenv('XDG_DATA_HOME', str(rootFolder / 'tmp' / 'data'))
+    first = projectDataFolder(Project(rootFolder / 'tmp' / 'a' / 'project'))
+    second = projectDataFolder(Project(rootFolder / 'tmp' / 'b' / 'project'))
+
+    assert first.parent == rootFolder / 'tmp' / 'data' / 'PyMavenRunner'
+    assert first.name.startswith('project-')
+    # Checkouts with the same name don't share their data
+    assert first != second
+    assert first == projectDataFolder(Project(rootFolder / 'tmp' / 'a' / '..' / 'a' / 'project'))
+
 def test_FileLogger(request):
     path = Path(rootFolder / 'tmp' / 'test_logging' / request.node.name / 'foo.log')
     if path.parent.exists():
@@ -41,4 +61,189 @@ def test_FileLogger(request):
 DEBUG test
 INFO test
 ERROR test
-'''
\ No newline at end of file
+'''
+def createLogFile(request):
+    path = Path(rootFolder / 'tmp' / 'test_logging' / request.node.name / 'foo.log')
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+    return path
+
+def test_FileLogger_index(request):
+    path = createLogFile(request)
+
+    log = FileLogger(path)
+    log.log('MOUT', '[INFO] Building foo 1.0')
+    log.log('MPARSER', 'Detected module')
+    log.event('module', 'foo 1.0')
+    log.log('MOUT', 'äöü')
+    log.log('MOUT', 'two\nlines')
+    log.close()
+
+    archive = LogArchive(path)
+    assert archive.index.complete
+    assert archive.lineCount == 5
+    assert list(archive.line(i) for i in range(archive.lineCount)) == [
+        'MOUT [INFO] Building foo 1.0',
+        'MPARSER Detected module',
+        'MOUT äöü',
+        'MOUT two',
+        'lines',
+    ]
+    assert archive.events == [['module', 0, ['foo 1.0']]]
+    archive.close()
+
+def test_LogArchive_without_trailer(request):
+    path = createLogFile(request)
+
+    log = FileLogger(path)
+    log.log('MOUT', 'a')
+    log.log('MOUT', 'b')
+    # Simulate a crash: The log and the line offsets are on disk but close() was never called
+    log.fh.close()
+    log.index.flushOffsets()
+    log.index.fh.close()
+
+    archive = LogArchive(path)
+    assert not archive.index.complete
+    assert archive.events == []
+    assert [archive.line(0), archive.line(1)] == ['MOUT a', 'MOUT b']
+    archive.close()
+
+def test_LogArchive_without_index(request):
+    path = createLogFile(request)
+
+    # A log of an old version
+    log = FileLogger(path, index=False)
+    log.log('MOUT', 'a')
+    log.log('MOUT', 'two\nlines')
+    log.close()
+
+    archive = LogArchive(path)
+    assert not archive.index.complete
+    assert archive.events == []
+    assert [archive.line(i) for i in range(archive.lineCount)] == ['MOUT a', 'MOUT two', 'lines']
+    archive.close()
+
+def test_LogArchive_of_maven_log(request):
+    path = createLogFile(request)
+    path.parent.mkdir(parents=True)
+    # Written by "mvn -l"; the last line has no newline
+    path.write_bytes(b'[INFO] Scanning for projects...\n\n[INFO] BUILD SUCCESS')
+
+    archive = LogArchive(path)
+    assert [archive.line(i) for i in range(archive.lineCount)] == [
+        'MOUT [INFO] Scanning for projects...',
+        'MOUT ',
+        'MOUT [INFO] BUILD SUCCESS',
+    ]
+    archive.close()
+
+def test_AsyncFileLogger(request):
+    path = createLogFile(request)
+
+    log = AsyncFileLogger(path, flushInterval=0.01)
+    for i in range(2500):
+        log.log('MOUT', f'line {i}')
+    log.event('module', 'foo')
+    log.log('INFO', 'last')
+    log.close()
+
+    assert log.queueDepth == 0
+    assert log.bytesWritten == path.stat().st_size
+
+    with open(path, encoding='utf-8') as fh:
+        lines = fh.read().split('\n')
+    assert lines[0] == 'MOUT line 0'
+    assert lines[2499] == 'MOUT line 2499'
+    assert lines[2500] == 'INFO last'
+
+    archive = LogArchive(path)
+    assert archive.lineCount == 2501
+    assert archive.events == [['module', 2499, ['foo']]]
+    archive.close()
+
+def test_AsyncFileLogger_index_is_flushed(request):
+    path = createLogFile(request)
+
+    log = AsyncFileLogger(path, flushInterval=0.01)
+    log.log('MOUT', 'a')
+    log.log('MOUT', 'b')
+
+    # Readable before close(), like after a crash
+    for i in range(500):
+        if indexPath(path).stat().st_size == len(LogIndexWriter.MAGIC) + 2 * 8:
+            break
+        time.sleep(0.01)
+    archive = LogArchive(path)
+    assert archive.lineCount == 2
+    assert archive.line(1) == 'MOUT b'
+    archive.close()
+
+    log.close()
+
+def test_AsyncFileLogger_event_line(request):
+    path = createLogFile(request)
+
+    log = AsyncFileLogger(path, flushInterval=0.01)
+    log.log('MOUT', 'a')
+    log.log('MPARSER', 'two\nlines')
+    log.log('MOUT', 'b')
+    assert log.currentOutputLine() == 3
+
+    # Like the events of lines which the parser reads after later lines
+    log.eventLine = 0
+    log.event('module', 'foo')
+    log.eventLine = None
+    log.event('module', 'bar')
+    log.close()
+
+    archive = LogArchive(path)
+    assert archive.events == [['module', 0, ['foo']], ['module', 3, ['bar']]]
+    archive.close()
+
+class BrokenAsyncFileLogger(AsyncFileLogger):
+    def encode(self, type, message):
+        raise OSError('No space left on device')
+
+def test_AsyncFileLogger_writer_error(request):
+    path = createLogFile(request)
+
+    log = BrokenAsyncFileLogger(path, queueSize=2, flushInterval=0.01)
+    log.log('MOUT', 'a')
+    with pytest.raises(Exception, match='Unable to write'):
+        # The queue is full long before this ends when nothing takes the records
+        for i in range(1000):
+            log.log('MOUT', 'b')
+            time.sleep(0.001)
+
+    log.close()
+    assert isinstance(log.writerError, OSError)
+    assert path not in FileLogger.openLogs
+
+def test_AsyncFileLogger_after_close(request):
+    path = createLogFile(request)
+
+    log = AsyncFileLogger(path, queueSize=2)
+    log.log('INFO', 'test')
+    log.close()
+
+    # Nothing takes records from the queue anymore; they must neither block nor vanish without a trace
+    for i in range(10):
+        log.log('INFO', 'late')
+        log.event('module', 'foo')
+    assert log.dropped == 20
+    assert log.queueDepth == 0
+
+    with open(path, encoding='utf-8') as fh:
+        assert fh.read() == 'INFO test\n'
+
+def test_AsyncFileLogger_close_twice(request):
+    path = createLogFile(request)
+
+    log = AsyncFileLogger(path)
+    log.log('INFO', 'test')
+    log.close()
+    log.close()
+
+    with open(path, encoding='utf-8') as fh:
+        assert fh.read() == 'INFO test\n'
@@ -3,8 +3,26 @@
 
 from pmr.model import *
 from pmr.ui import MainWindow
+from pathlib import Path
+
+rootFolder = Path(__file__).parent.parent.resolve()
 
 def test_create_MainWindow(qtbot, qapp):
     window = MainWindow(qapp)
     qtbot.addWidget(window)
     
+
+def test_resume_detected_once(qtbot, qapp):
+    window = MainWindow(qapp)
+    qtbot.addWidget(window)
+
+    calls = []
+    window.header.resumeDetected = calls.append
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+    runner = window.createRunner(project, CustomPatternPreferences(), [])
+
+    runner.pipeline = runner.createPipeline()
+    runner.pipeline.put('resumeDetected', (':IT2-module1',))
+    runner.drainPipeline()
+
+    assert calls == [':IT2-module1']
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 from pmr.model import *
+from pmr.logging import FileLogger, LogArchive
+from pmr.parser import ThreadDemultiplexer, splitThreadName
 from pmr.ui import MavenRunner, MavenOutputProcessor
 
 from pathlib import Path
@@ -70,11 +72,17 @@ def readCannedMavenOutput(testCase, fileName):
 
 
 class QtSignalCollector:
+    # Copies of the other signals which only exist to update the UI earlier
+    IGNORED = ('priorityEvent',)
+
     def __init__(self):
         self.log = []
     
     def install(self, runner):
         for name in dir(runner):
+            if name in self.IGNORED:
+                continue
+
             value = getattr(runner, name)
             
             #print(name, type(name), value)
@@ -433,3 +441,237 @@ def test_skip_tests(qtbot, request):
 
     log = run_process(qtbot, singleProject, ['clean', 'install', '-DskipTests=true'], stdout)
     assertSignalLog(request.node.name, log)
+
+
+def test_events_are_indexed(qtbot, request):
+    stdout = readCannedMavenOutput('multi-module-project', 'mvn-clean-install-existing-repo.log')
+    path = rootFolder / 'tmp' / 'test_maven_parser' / request.node.name / 'pmr.log'
+
+    process = MockProcess(['clean', 'install'], stdout)
+    logger = FileLogger(path)
+    customPatternPreferences = createCustomPatternPreferences()
+    runner = MockMavenRunner(singleProject, process.args, process, customPatternPreferences, logger)
+
+    processor = MavenOutputProcessor(runner, process, singleProject, customPatternPreferences, logger)
+    processor.run()
+
+    archive = LogArchive(path)
+    modules = list(
+        args[0]
+        for kind, line, args in archive.events
+        if kind == 'module' and archive.line(line).startswith(f'MOUT [INFO] Building {args[0]} ')
+    )
+    archive.close()
+
+    assert modules == [
+        'IT2 Parent Project 1.0',
+        'IT2 First Module 1.0',
+        'IT2-module2 1.0',
+    ]
+
+
+class WorkerMavenRunner(MavenRunner):
+    def __init__(self, project, cmdLine, customPatternPreferences, logPath):
+        super().__init__(project, customPatternPreferences, cmdLine)
+
+        self.logPath = logPath
+
+    def mavenCommandLine(self):
+        return self.cmdLine
+
+    def createLogPath(self):
+        return self.logPath
+
+
+def test_parser_process(qtbot, request):
+    import sys
+    path = expectedOutputFolder / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+    args = [sys.executable, '-c', 'import sys; sys.stdout.buffer.write(open(sys.argv[1], "rb").read())', str(path)]
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+
+    # The mock would see an empty line after the last newline; a real pipe doesn't
+    stdout = readCannedMavenOutput('multi-module-project', 'mvn-clean-install-existing-repo.log').rstrip('\n')
+    expected = run_process(qtbot, project, args, stdout)
+
+    project.preferences.output.parserProcess = True
+    logPath = rootFolder / 'tmp' / 'test_maven_parser' / request.node.name / 'pmr.log'
+    runner = WorkerMavenRunner(project, args, createCustomPatternPreferences(), logPath)
+    collector = QtSignalCollector()
+    collector.install(runner)
+
+    with qtbot.waitSignal(runner.mavenFinished, timeout=30 * 1000):
+        runner.start()
+
+    assert runner.processor.wait(10 * 1000)
+    assert collector.log == expected
+    assert logPath.exists()
+
+
+def parallelOutput(stdout):
+    '''
+    Turns the output of a serial build into the one of "mvn -T 2": The first
+    two modules start at the same time; the last one starts on the first
+    thread when its module is done. The lines of the threads alternate. Like
+    Maven, each thread logs the empty line before the header of its module.
+    '''
+    lines = stdout.split('\n')
+    starts = [index - 2 for index, line in enumerate(lines) if line.startswith('[INFO] Building ') and line.endswith(']')]
+    summary = next(index for index, line in enumerate(lines) if line.startswith('[INFO] Reactor Summary')) - 1
+
+    def withThread(name, lines):
+        # Only Maven's own lines show the name of the thread; each group is one of them plus the raw lines which follow
+        groups = []
+        for line in lines:
+            if line.startswith('[') or len(groups) == 0:
+                groups.append([f'[{name}] {line}' if line.startswith('[') else line])
+            else:
+                groups[-1].append(line)
+        return groups
+
+    thread1 = withThread('BuilderThread 1', lines[starts[0]:starts[1]] + lines[starts[2]:summary])
+    thread2 = withThread('BuilderThread 2', lines[starts[1]:starts[2]])
+
+    result = [f'[main] {it}' for it in lines[:starts[0]]]
+    while len(thread1) > 0 or len(thread2) > 0:
+        for groups in (thread1, thread2):
+            if len(groups) > 0:
+                result.extend(groups.pop(0))
+    result.extend(f'[main] {it}' if it.startswith('[') else it for it in lines[summary:])
+    return '\n'.join(result)
+
+
+def test_parallel_build(qtbot, request):
+    stdout = readCannedMavenOutput('multi-module-project', 'mvn-clean-install-existing-repo.log')
+    args = ['clean', 'install', '--threads', '2']
+    expected = run_process(qtbot, singleProject, args, stdout)
+
+    log = run_process(qtbot, singleProject, args, parallelOutput(stdout))
+    assert log == expected
+
+
+def test_parallel_build_is_demultiplexed():
+    stdout = readCannedMavenOutput('multi-module-project', 'mvn-clean-install-existing-repo.log')
+
+    lines = []
+    demultiplexer = ThreadDemultiplexer(lines.append)
+    for line in parallelOutput(stdout).split('\n'):
+        demultiplexer.add(line)
+    demultiplexer.flush()
+
+    # The empty lines before the headers must not end the modules in flight
+    assert demultiplexer.buffered > 0
+    assert lines == stdout.split('\n')
+
+
+def test_thread_demultiplexer():
+    assert splitThreadName('[BuilderThread 1] [INFO] x') == ('BuilderThread 1', '[INFO] x')
+    assert splitThreadName('[INFO] [jacoco] x') is None
+    assert splitThreadName('[stdout] no level') is None
+
+    lines = []
+    demultiplexer = ThreadDemultiplexer(lines.append)
+    demultiplexer.add('[main] [INFO] Scanning for projects...')
+    demultiplexer.add('[T1] [INFO] --------< g:a >--------')
+    demultiplexer.add('[T2] [INFO] --------< g:b >--------')
+    demultiplexer.add('[T1] [INFO] a1')
+    demultiplexer.add('[T2] [INFO] b1')
+    demultiplexer.add('raw b2')
+    # The first module is passed on at once, the second waits
+    assert lines == ['[INFO] Scanning for projects...', '[INFO] --------< g:a >--------', '[INFO] a1']
+
+    demultiplexer.add('[T1] [INFO] --------< g:c >--------')
+    assert lines[3:] == ['[INFO] --------< g:b >--------', '[INFO] b1', 'raw b2']
+    assert demultiplexer.inFlight
+
+    demultiplexer.add('[main] [INFO] Reactor Summary')
+    assert lines[6:] == ['[INFO] --------< g:c >--------', '[INFO] Reactor Summary']
+    assert not demultiplexer.inFlight
+
+
+def test_thread_demultiplexer_keeps_empty_line_before_header():
+    lines = []
+    demultiplexer = ThreadDemultiplexer(lines.append)
+    demultiplexer.add('[main] [INFO] Scanning for projects...')
+    demultiplexer.add('[main] [INFO] ')
+    demultiplexer.add('[T1] [INFO] ')
+    demultiplexer.add('[T1] [INFO] --------< g:a >--------')
+    demultiplexer.add('[T2] [INFO] ')
+    demultiplexer.add('[T2] [INFO] --------< g:b >--------')
+    demultiplexer.add('[T1] [INFO] a1')
+    demultiplexer.add('[T2] [INFO] b1')
+    # main builds no module, so its empty line is passed on at once; the others belong to the next module of their thread
+    assert lines == ['[INFO] Scanning for projects...', '[INFO] ', '[INFO] ', '[INFO] --------< g:a >--------', '[INFO] a1']
+
+    # The empty line at the end of a module belongs to the next one of its thread
+    demultiplexer.add('[T1] [INFO] ')
+    demultiplexer.add('[T1] [INFO] --------< g:c >--------')
+    assert lines[5:] == ['[INFO] ', '[INFO] --------< g:b >--------', '[INFO] b1']
+
+    # Without a header after it, the empty line stays in the module of its thread
+    demultiplexer.add('[T2] [INFO] ')
+    demultiplexer.add('[main] [INFO] Reactor Summary')
+    assert lines[8:] == ['[INFO] ', '[INFO] ', '[INFO] --------< g:c >--------', '[INFO] Reactor Summary']
+
+
+def test_events_of_parallel_build_are_indexed(request):
+    from pmr.ingest import IngestPipeline, PipelineEmitter
+    from pmr.parser import SIGNAL_NAMES, MavenOutputParser, installEventLogging
+
+    stdout = readCannedMavenOutput('multi-module-project', 'mvn-clean-install-existing-repo.log')
+    path = rootFolder / 'tmp' / 'test_maven_parser' / request.node.name / 'pmr.log'
+
+    logger = FileLogger(path)
+    emitter = PipelineEmitter(IngestPipeline(), SIGNAL_NAMES)
+    installEventLogging(emitter, logger)
+    parser = MavenOutputParser(emitter, CustomPatternPreferences(), logger)
+    for line in parallelOutput(stdout).split('\n'):
+        line = line.rstrip()
+        logger.log('MOUT', line)
+        parser.parse(line)
+    parser.flush()
+    logger.close()
+
+    # The events of the modules which waited point at their own lines, not at the ones which released them
+    archive = LogArchive(path)
+    modules = [(args[0], archive.line(line)) for kind, line, args in archive.events if kind == 'module']
+    archive.close()
+
+    assert [name for name, line in modules] == ['IT2 Parent Project 1.0', 'IT2 First Module 1.0', 'IT2-module2 1.0']
+    for name, line in modules:
+        assert f'[INFO] Building {name} ' in line
+
+
+def test_held_back_errors_are_read_ahead():
+    from pmr.ingest import EARLY_RECORD, IngestPipeline, PipelineEmitter
+    from pmr.logging import DummyLogger
+    from pmr.parser import SIGNAL_NAMES, MavenOutputParser
+
+    pipeline = IngestPipeline()
+    parser = MavenOutputParser(PipelineEmitter(pipeline, SIGNAL_NAMES), CustomPatternPreferences(), DummyLogger())
+    for line in (
+        '[main] [INFO] Scanning for projects...',
+        '[T1] [INFO] --------< g:a >--------',
+        '[T1] [INFO] Building a 1.0',
+        '[T2] [INFO] --------< g:b >--------',
+        '[T2] [INFO] Building b 1.0',
+        '[T2] [ERROR] broken in b',
+        '[T1] [INFO] a1',
+    ):
+        parser.parse(line)
+
+    # The error of the module which waits is on the priority lane before the first module is done
+    priority = [(name, args) for name, args, adjacent, timestamp in pipeline.drainPriority()]
+    assert priority == [
+        ('mavenModule', ('a 1.0',)),
+        (EARLY_RECORD, (1, 'mavenModule', ('b 1.0',))),
+        (EARLY_RECORD, (1, 'error', ('broken in b',))),
+    ]
+    assert ('error', ('broken in b',)) not in pipeline.drain()
+
+    parser.parse('[main] [INFO] Reactor Summary:')
+    parser.flush()
+
+    # The normal lane gets it in the order of a serial build; the priority lane doesn't get it again,
+    # it only learns that the rest of the module would come on the normal lanes
+    assert ('error', ('broken in b',)) in pipeline.drain()
+    assert [(name, args) for name, args, adjacent, timestamp in pipeline.drainPriority()] == [(EARLY_RECORD, (1, 'live', ()))]
@@ -17,10 +17,14 @@ def test_pickle():
     prefs.goals = 'xxx'
     prefs.startOption = MavenPreferences.BUILD_ONLY
     prefs.moduleList = ['a', 'b']
+    prefs.alsoMake = '--also-make-dependents'
+    prefs.threads = '1C'
     assert prefs.pickle() == {
         'goals': 'xxx',
         'startOption': 'BUILD_ONLY',
         'moduleList': ['a', 'b'], 
+        'alsoMake': '--also-make-dependents',
+        'threads': '1C',
     }
 
 def test_unpickle():
@@ -33,3 +37,13 @@ def test_unpickle():
     prefs = MavenPreferences()
     prefs.unpickle(data)
     assert prefs.pickle() == data
+
+def test_unpickle_unknown_also_make():
+    prefs = MavenPreferences()
+    prefs.unpickle({'alsoMake': '--make-everything'})
+    assert prefs.alsoMake == MavenPreferences.DEFAULT_ALSO_MAKE
+
+def test_unpickle_unknown_threads():
+    prefs = MavenPreferences()
+    prefs.unpickle({'threads': 'many'})
+    assert prefs.threads == MavenPreferences.DEFAULT_THREADS
@@ -1,9 +1,14 @@
 #!python3
 # -*- coding: utf-8 -*-
 
+from pmr.changes import ChangeDetector, ResumePoint
 from pmr.model import *
-from pmr.ui import QtPreferences, MavenRunnerFrame
+from pmr.reactor import BuildTimes
+from pmr.ui import QtPreferences, MavenRunnerFrame, PomScanner
+from PyQt5.QtCore import Qt
 from pathlib import Path
+import shutil
+import subprocess
 
 rootFolder = Path(__file__).parent.parent.resolve()
 
@@ -82,7 +87,7 @@ def getStartOptionState(widget):
     if widget.modulesSingleSelectionVisible:
         selected.append(widget.modulesSingleSelection.currentData())
     if widget.modulesMultiSelectionVisible:
-        raise Exception('TODO')
+        selected.extend(widget.checkedModules())
 
     return {
         'startOption': MavenPreferences.START_OPTION_NAMES[option],
@@ -286,5 +291,234 @@ def test_extra_options(qtbot):
     assert blocker.args == [
         widget.currentProject,
         widget.projectPreferences.customPatternPreferences,
-        ['clean', 'install', '--show-version', '--threads', '2.0C'],
+        # The parser needs the names of the threads
+        ['clean', 'install', '--show-version', '--threads', '2.0C', '-Dorg.slf4j.simpleLogger.showThreadName=true'],
     ]
+
+    widget.mavenCmd.setText('-T4')
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['clean', 'install', '-T4', '-Dorg.slf4j.simpleLogger.showThreadName=true']
+
+def test_threads(qtbot):
+    widget = createWithMultiModuleProject()
+    qtbot.addWidget(widget)
+
+    widget.threadsSelector.setCurrentIndex(widget.threadsSelector.findData('1C'))
+    assert widget.projectPreferences.maven.threads == '1C'
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+
+    # The parser needs the names of the threads
+    assert blocker.args[2] == ['clean', 'install', '--threads', '1C', '-Dorg.slf4j.simpleLogger.showThreadName=true']
+
+def test_scan_modules_in_background(qtbot):
+    scanner = PomScanner()
+    widget = MavenRunnerFrameForTests([], QtPreferences())
+    widget.setScanner(scanner)
+    qtbot.addWidget(widget)
+
+    with qtbot.waitSignal(scanner.modulesFound, check_params_cb=lambda project, modules, complete: complete):
+        widget.addProject(rootFolder / 'it' / 'multi-module-project')
+
+    scanner.stop()
+    assert [widget.modulesSingleSelection.itemData(i) for i in range(widget.modulesSingleSelection.count())] == [
+        'de.pdark.python.pmr.it2:IT2-parent',
+        'de.pdark.python.pmr.it2:IT2-module1',
+        'de.pdark.python.pmr.it2:IT2-module2',
+    ]
+    assert widget.currentProject.modules is not None
+
+def test_start_with_first_change(qtbot):
+    folder = rootFolder / 'tmp' / 'test_maven_runner_frame' / 'test_start_with_first_change'
+    if folder.exists():
+        shutil.rmtree(folder)
+    shutil.copytree(rootFolder / 'it' / 'multi-module-project', folder / 'multi-module-project', ignore=shutil.ignore_patterns('target'))
+
+    widget = MavenRunnerFrameForTests([], QtPreferences())
+    qtbot.addWidget(widget)
+    widget.addProject(folder / 'multi-module-project')
+    widget.currentProject._changes = ChangeDetector(folder / 'changes.json')
+    widget.setStartOption(MavenPreferences.START_FIRST_CHANGE)
+
+    # The first build has to build everything; the modules count as built when it was successful
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['clean', 'install']
+    widget.mavenFinished(0)
+
+    source = folder / 'multi-module-project' / 'module2' / 'pom.xml'
+    source.write_text(source.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--resume-from', 'de.pdark.python.pmr.it2:IT2-module2', 'clean', 'install']
+
+    # A failed build doesn't count
+    widget.mavenFinished(1)
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--resume-from', 'de.pdark.python.pmr.it2:IT2-module2', 'clean', 'install']
+
+def selectModules(widget, *keys):
+    for index in range(widget.modulesMultiSelection.count()):
+        item = widget.modulesMultiSelection.item(index)
+        item.setCheckState(Qt.Checked if item.data(Qt.UserRole) in keys else Qt.Unchecked)
+
+def test_build_selected(qtbot):
+    folder = rootFolder / 'tmp' / 'test_maven_runner_frame' / 'test_build_selected'
+    if folder.exists():
+        shutil.rmtree(folder)
+
+    widget = createWithMultiModuleProject()
+    qtbot.addWidget(widget)
+    widget.currentProject._buildTimes = BuildTimes(folder / 'buildtimes.json')
+
+    widget.setStartOption(MavenPreferences.BUILD_SELECTED)
+    # The preferences of the project select the parent
+    assert widget.checkedModules() == ['de.pdark.python.pmr.it2:IT2-parent']
+    selectModules(widget, 'de.pdark.python.pmr.it2:IT2-module1')
+
+    actual = getStartOptionState(widget)
+    assert actual == {
+        'startOption': 'BUILD_SELECTED',
+        'visible': ['multiSelection'],
+        'enabled': ['multiSelection'],
+        'selected': ['de.pdark.python.pmr.it2:IT2-module1'],
+    }
+    assert widget.projectPreferences.maven.moduleList == ['de.pdark.python.pmr.it2:IT2-module1']
+    # The parent is needed
+    assert widget.modulesToBuild() == ['de.pdark.python.pmr.it2:IT2-parent', 'de.pdark.python.pmr.it2:IT2-module1']
+    assert widget.selectionInfo.text() == '2 modules'
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--projects', 'de.pdark.python.pmr.it2:IT2-module1', '--also-make', 'clean', 'install']
+
+    widget.reactorSummary('IT2 Parent Project 1.0', 'SUCCESS', ' 0.5 s')
+    widget.reactorSummary('IT2 First Module', 'SUCCESS', ' 2.0 s')
+    widget.mavenFinished(0)
+    saved = BuildTimes(folder / 'buildtimes.json')
+    saved.load()
+    assert saved.durations == {
+        'de.pdark.python.pmr.it2:IT2-parent': 0.5,
+        'de.pdark.python.pmr.it2:IT2-module1': 2.0,
+    }
+    assert widget.selectionInfo.text() == '2 modules, about 2.5 s'
+
+    widget.alsoMakeSelector.setCurrentIndex(widget.alsoMakeSelector.findData('--also-make-dependents'))
+    selectModules(widget, 'de.pdark.python.pmr.it2:IT2-parent', 'de.pdark.python.pmr.it2:IT2-module1')
+    assert widget.projectPreferences.maven.alsoMake == '--also-make-dependents'
+    assert widget.selectionInfo.text() == '3 modules, about 3.8 s (1 never built)'
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--projects', 'de.pdark.python.pmr.it2:IT2-parent,de.pdark.python.pmr.it2:IT2-module1', '--also-make-dependents', 'clean', 'install']
+
+def test_build_changed(qtbot):
+    folder = rootFolder / 'tmp' / 'test_maven_runner_frame' / 'test_build_changed'
+    if folder.exists():
+        shutil.rmtree(folder)
+    project = folder / 'multi-module-project'
+    shutil.copytree(rootFolder / 'it' / 'multi-module-project', project, ignore=shutil.ignore_patterns('target'))
+    options = dict(cwd=project, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(['git', 'init', '-q'], **options)
+    subprocess.run(['git', 'add', '.'], **options)
+    subprocess.run(['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'Initial'], **options)
+
+    source = project / 'module1' / 'pom.xml'
+    source.write_text(source.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+
+    widget = MavenRunnerFrameForTests([], QtPreferences())
+    qtbot.addWidget(widget)
+    widget.addProject(project)
+    widget.currentProject._changes = ChangeDetector(folder / 'changes.json')
+    widget.setStartOption(MavenPreferences.BUILD_CHANGED)
+    assert widget.selectionInfo.text() == '1 changed, 0 need them, 2 skipped'
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--projects', 'de.pdark.python.pmr.it2:IT2-module1', '--also-make-dependents', 'clean', 'install']
+    widget.mavenFinished(0)
+
+    # The build is skipped when nothing changed since
+    with qtbot.assertNotEmitted(widget.startMaven):
+        widget.emitStartMaven()
+    assert widget.selectionInfo.text() == 'Nothing changed'
+
+def test_resume_failed_build(qtbot):
+    folder = rootFolder / 'tmp' / 'test_maven_runner_frame' / 'test_resume_failed_build'
+    if folder.exists():
+        shutil.rmtree(folder)
+    shutil.copytree(rootFolder / 'it' / 'multi-module-project', folder / 'multi-module-project', ignore=shutil.ignore_patterns('target'))
+
+    widget = MavenRunnerFrameForTests([], QtPreferences())
+    qtbot.addWidget(widget)
+    widget.addProject(folder / 'multi-module-project')
+    widget.currentProject._changes = ChangeDetector(folder / 'changes.json')
+    widget.currentProject._resumePoint = ResumePoint(folder / 'resume.json')
+    widget.currentProject._buildTimes = BuildTimes(folder / 'buildtimes.json')
+
+    with qtbot.waitSignal(widget.startMaven):
+        widget.emitStartMaven()
+    widget.resumeDetected(':IT2-module1')
+    widget.reactorSummary('IT2 Parent Project 1.0', 'SUCCESS', ' 0.5 s')
+    widget.reactorSummary('IT2 First Module', 'FAILURE', ' 2.0 s')
+    widget.reactorSummary('IT2-module2', 'SUCCESS', ' 1.0 s')
+    widget.mavenFinished(1)
+
+    assert widget.startOptionWidget.currentData() == MavenPreferences.RESUME_FAILED
+    assert widget.selectionInfo.text() == '1 changed, 0 need them, 2 skipped'
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--projects', 'de.pdark.python.pmr.it2:IT2-module1', 'clean', 'install']
+
+    # The resumed build fails again; module2 is changed before the next attempt
+    widget.reactorSummary('IT2 First Module', 'FAILURE', ' 2.0 s')
+    widget.mavenFinished(1)
+    source = folder / 'multi-module-project' / 'module2' / 'pom.xml'
+    source.write_text(source.read_text().replace('</project>', '<!-- changed -->\n</project>'))
+
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.emitStartMaven()
+    assert blocker.args[2] == ['--projects', 'de.pdark.python.pmr.it2:IT2-module1,de.pdark.python.pmr.it2:IT2-module2', 'clean', 'install']
+
+    widget.reactorSummary('IT2 First Module', 'SUCCESS', ' 2.0 s')
+    widget.reactorSummary('IT2-module2', 'SUCCESS', ' 1.0 s')
+    widget.mavenFinished(0)
+    assert widget.selectionInfo.text() == 'No failed build'
+    assert len(widget.currentProject.changes.changedModules(widget.currentProject.changes.snapshot(widget.currentProject.reactor))[0]) == 0
+
+def test_rerun_failed_tests(qtbot):
+    widget = createWithMultiModuleProject()
+    qtbot.addWidget(widget)
+    widget.mavenCmd.setText('--offline')
+
+    failedTests = {
+        'IT2-module2 1.0': ['de.pdark.python.pmr.it2.module2.Foo3Test'],
+        # Surefire of this module is too old for qualified names
+        'IT2 First Module 1.0': ['Foo2Test', 'FooTest'],
+    }
+    with qtbot.waitSignal(widget.startMaven) as blocker:
+        widget.rerunFailedTests(widget.currentProject, failedTests)
+    assert blocker.args[2] == [
+        '--projects', 'de.pdark.python.pmr.it2:IT2-module1,de.pdark.python.pmr.it2:IT2-module2',
+        'test', '-Dtest=Foo2Test,FooTest,de.pdark.python.pmr.it2.module2.Foo3Test', '-Dsurefire.failIfNoSpecifiedTests=false', '--offline',
+    ]
+
+    # Without the module, it's found by the source of the test
+    assert widget.mavenArgsForFailedTests(widget.currentProject, {None: ['de.pdark.python.pmr.it2.module2.Foo3Test']}) == [
+        '--projects', 'de.pdark.python.pmr.it2:IT2-module2',
+        'test', '-Dtest=de.pdark.python.pmr.it2.module2.Foo3Test', '-Dsurefire.failIfNoSpecifiedTests=false', '--offline',
+    ]
+    # Tests of unknown modules don't widen the build to the whole reactor
+    assert widget.mavenArgsForFailedTests(widget.currentProject, {'IT2-module2 1.0': ['de.pdark.python.pmr.it2.module2.Foo3Test'], 'Gone 1.0': ['x.FooTest']}) == [
+        '--projects', 'de.pdark.python.pmr.it2:IT2-module2',
+        'test', '-Dtest=de.pdark.python.pmr.it2.module2.Foo3Test,x.FooTest', '-Dsurefire.failIfNoSpecifiedTests=false', '--offline',
+    ]
+    # Only when nothing is known, the tests are searched everywhere
+    assert widget.mavenArgsForFailedTests(widget.currentProject, {None: ['x.FooTest']}) == [
+        'test', '-Dtest=x.FooTest', '-Dsurefire.failIfNoSpecifiedTests=false', '--offline',
+    ]
+    assert widget.mavenArgsForFailedTests(widget.currentProject, {}) is None
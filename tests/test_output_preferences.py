@@ -0,0 +1,38 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.model import *
+from pmr.ingest import DEGRADE
+
+def test_no_pickle_defaults():
+    prefs = OutputPreferences()
+    assert prefs.pickle() == None
+
+def test_pickle_and_unpickle():
+    prefs = OutputPreferences()
+    prefs.overloadPolicy = DEGRADE
+    prefs.queueSize = 100
+    data = prefs.pickle()
+    assert data == {
+        'overloadPolicy': 'degrade',
+        'queueSize': 100,
+    }
+
+    prefs = OutputPreferences()
+    prefs.unpickle(data)
+    assert prefs.pickle() == data
+
+def test_unpickle_unknown_policy():
+    prefs = OutputPreferences()
+    prefs.unpickle({'overloadPolicy': 'drop'})
+    assert prefs.overloadPolicy == OutputPreferences.DEFAULT_OVERLOAD_POLICY
+
+def test_pickle_parser_process():
+    prefs = OutputPreferences()
+    prefs.parserProcess = True
+    data = prefs.pickle()
+    assert data == {'parserProcess': True}
+
+    prefs = OutputPreferences()
+    prefs.unpickle(data)
+    assert prefs.parserProcess
@@ -1,10 +1,13 @@
 #!python3
 # -*- coding: utf-8 -*-
 
+from concurrent.futures import ThreadPoolExecutor
 from pmr.maven import *
 from pathlib import Path
+import os
 import pytest
 import re
+import shutil
 
 rootFolder = Path(__file__).parent.parent.resolve()
 integrationTestFolder = rootFolder / 'it'
@@ -124,3 +127,168 @@ def test_repr():
     pom = Pom(relPath)
 
     assert repr(pom) == f'Pom({resolvedPath})'
+
+def test_parent_multi_m1():
+    pom = Pom(multiModuleProject / 'module1')
+    assert pom.parent == 'de.pdark.python.pmr.it2:IT2-parent:1.0'
+    assert Pom(multiModuleProject).parent is None
+
+def test_dependencies_multi_m2():
+    pom = Pom(multiModuleProject / 'module2')
+    assert pom.dependencies == ['org.apache.commons:commons-lang3', 'ch.qos.logback:logback-classic', 'junit:junit']
+
+def copyProject(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    shutil.copytree(multiModuleProject, folder / 'project')
+    return folder
+
+def test_pom_cache(request):
+    folder = copyProject(request)
+    project = folder / 'project'
+
+    cache = PomCache(folder / 'poms.json')
+    root = cache.pom(project)
+    assert [it.coordinate for it in root.childPoms] == [Pom(project / 'module1').coordinate, Pom(project / 'module2').coordinate]
+    assert root.packaging == 'pom'
+    assert cache.misses == 3
+    cache.save()
+
+    cache = PomCache(folder / 'poms.json')
+    cache.load()
+    root = cache.pom(project)
+    assert root.modules == ['module1', 'module2']
+    assert root.childPoms[1].dependencies == Pom(project / 'module2').dependencies
+    assert (cache.hits, cache.misses) == (3, 0)
+
+def test_pom_cache_parses_changed_poms_again(request):
+    folder = copyProject(request)
+    project = folder / 'project'
+
+    cache = PomCache(folder / 'poms.json')
+    cache.pom(project).childPoms
+    cache.save()
+
+    path = project / 'module1' / 'pom.xml'
+    path.write_text(path.read_text().replace('IT2-module1', 'IT2-changed'))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    cache = PomCache(folder / 'poms.json')
+    cache.load()
+    children = cache.pom(project).childPoms
+    assert children[0].artifactId == 'IT2-changed'
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_read_metadata_like_pom():
+    for path in integrationTestFolder.rglob('pom.xml'):
+        assert readPomMetadata(path) == Pom(path).metadata()
+
+def test_read_metadata_skips_sections(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / 'pom.xml'
+    path.write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+    <parent><groupId>g</groupId><artifactId>p</artifactId><version>2</version></parent>
+    <artifactId>a</artifactId>
+    <!-- no <build> here -->
+    <dependencyManagement><dependencies><dependency><groupId>x</groupId><artifactId>managed</artifactId></dependency></dependencies></dependencyManagement>
+    <build><plugins><plugin><dependencies><dependency><groupId>x</groupId><artifactId>plugin</artifactId></dependency></dependencies></plugin></plugins></build>
+    <dependencies><dependency><groupId>${project.groupId}</groupId><artifactId>sibling</artifactId></dependency></dependencies>
+    <profiles><profile><build /><dependencies><dependency><groupId>x</groupId><artifactId>profile</artifactId></dependency></dependencies></profile></profiles>
+</project>
+''')
+
+    metadata = readPomMetadata(path)
+    assert metadata.coordinate == 'g:a:2'
+    assert metadata.parent == 'g:p:2'
+    assert metadata.packaging == 'jar'
+    assert metadata.dependencies == ['g:sibling']
+    assert metadata == Pom(path).metadata()
+
+def test_read_metadata_of_invalid_xml():
+    path = rootFolder / 'tests' / 'test_input' / 'not_a_maven_project' / 'pom.xml'
+    with pytest.raises(Exception, match=re.escape(f'{path}: Expected \'{{http://maven.apache.org/POM/4.0.0}}project\' but was \'foo\'')):
+        readPomMetadata(path)
+
+def createTree(folder, name='root', depth=2, width=3):
+    folder.mkdir(parents=True)
+    modules = [f'{name}-{i}' for i in range(width)] if depth > 0 else []
+    (folder / 'pom.xml').write_text(f'''<project xmlns="http://maven.apache.org/POM/4.0.0">
+    <groupId>g</groupId><artifactId>{name}</artifactId><version>1</version>
+    <modules>{''.join(f'<module>{it}</module>' for it in modules)}</modules>
+</project>
+''')
+    for it in modules:
+        createTree(folder / it, it, depth - 1, width)
+
+def test_scan_module_tree(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    createTree(folder / 'project')
+
+    levels = []
+    cache = PomCache(folder / 'poms.json')
+    modules = cache.scan(folder / 'project', levelScanned=lambda items: levels.append(len(items)))
+
+    assert [(level, pom.artifactId) for level, pom in modules[:6]] == [
+        (0, 'root'), (1, 'root-0'), (2, 'root-0-0'), (2, 'root-0-1'), (2, 'root-0-2'), (1, 'root-1'),
+    ]
+    assert len(modules) == 1 + 3 + 9
+    assert levels == [4, 13, 13]
+    assert (folder / 'poms.json').exists()
+
+def test_scan_in_parallel(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    createTree(folder / 'project', depth=3)
+
+    expected = [(level, pom.coordinate) for level, pom in PomCache().scan(folder / 'project')]
+
+    cache = PomCache()
+    cache.PARALLEL_THRESHOLD = 2
+    with ThreadPoolExecutor(4) as executor:
+        modules = cache.scan(folder / 'project', executor)
+
+    assert [(level, pom.coordinate) for level, pom in modules] == expected
+    assert cache.misses == len(expected)
+
+def test_scan_ignores_modules_which_point_back(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+    (folder / 'pom.xml').write_text('<project xmlns="http://maven.apache.org/POM/4.0.0"><groupId>g</groupId><artifactId>a</artifactId><version>1</version><modules><module>.</module></modules></project>')
+
+    assert [pom.artifactId for level, pom in PomCache().scan(folder)] == ['a']
+
+def test_read_plugins(request):
+    folder = rootFolder / 'tmp' / 'test_pom' / request.node.name
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / 'pom.xml'
+    path.write_text('''<project xmlns="http://maven.apache.org/POM/4.0.0">
+    <groupId>g</groupId><artifactId>a</artifactId><version>1</version>
+    <build>
+        <extensions><extension><groupId>x</groupId><artifactId>wagon</artifactId></extension></extensions>
+        <pluginManagement><plugins><plugin><artifactId>managed</artifactId></plugin></plugins></pluginManagement>
+        <plugins>
+            <plugin>
+                <artifactId>maven-dependency-plugin</artifactId>
+                <executions><execution><configuration><artifactItems><artifactItem><groupId>y</groupId><artifactId>copied</artifactId></artifactItem></artifactItems></configuration></execution></executions>
+            </plugin>
+            <plugin>
+                <groupId>${project.groupId}</groupId><artifactId>own-plugin</artifactId>
+                <dependencies><dependency><groupId>g</groupId><artifactId>plugin-dependency</artifactId></dependency></dependencies>
+            </plugin>
+        </plugins>
+    </build>
+</project>
+''')
+
+    metadata = readPomMetadata(path)
+    assert metadata.plugins == ['org.apache.maven.plugins:maven-dependency-plugin', 'g:own-plugin', 'g:plugin-dependency', 'x:wagon']
+    assert metadata == Pom(path).metadata()
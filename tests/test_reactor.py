@@ -0,0 +1,148 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.maven import PomCache
+from pmr.model import Project
+from pmr.reactor import *
+from pathlib import Path
+import os
+import pytest
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+
+def writePom(folder, artifactId, modules=(), dependencies=(), plugins=(), parent=True):
+    folder.mkdir(parents=True, exist_ok=True)
+    parentXml = '<parent><groupId>g</groupId><artifactId>root</artifactId><version>1</version></parent>' if parent else '<groupId>g</groupId><version>1</version>'
+    dependencyXml = ''.join(f'<dependency><groupId>g</groupId><artifactId>{it}</artifactId></dependency>' for it in dependencies)
+    pluginXml = ''.join(f'<plugin><groupId>g</groupId><artifactId>{it}</artifactId><configuration><artifactId>ignored</artifactId></configuration></plugin>' for it in plugins)
+    moduleXml = ''.join(f'<module>{it}</module>' for it in modules)
+    path = folder / 'pom.xml'
+    path.write_text(f'''<project xmlns="http://maven.apache.org/POM/4.0.0">
+    {parentXml}
+    <artifactId>{artifactId}</artifactId>
+    <modules>{moduleXml}</modules>
+    <dependencies>{dependencyXml}</dependencies>
+    <build><plugins>{pluginXml}</plugins></build>
+</project>
+''')
+    return path
+
+def createProject(request):
+    '''
+    root
+      api
+      impl -> api
+      plugin -> api
+      app -> impl, uses plugin
+      tools (nothing)
+    '''
+    folder = rootFolder / 'tmp' / 'test_reactor' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+
+    writePom(folder, 'root', modules=('app', 'impl', 'api', 'plugin', 'tools'), parent=False)
+    writePom(folder / 'app', 'app', dependencies=('impl', 'junit'), plugins=('plugin',))
+    writePom(folder / 'impl', 'impl', dependencies=('api',))
+    writePom(folder / 'api', 'api')
+    writePom(folder / 'plugin', 'plugin', dependencies=('api',))
+    writePom(folder / 'tools', 'tools')
+    return folder
+
+def test_build_order(request):
+    folder = createProject(request)
+    graph = ReactorGraph(PomCache().scan(folder))
+
+    assert graph.buildOrder() == ['g:root', 'g:api', 'g:impl', 'g:plugin', 'g:app', 'g:tools']
+    assert graph.upstream('g:app') == ['g:impl', 'g:plugin', 'g:root']
+    assert graph.downstream('g:api') == ['g:impl', 'g:plugin']
+    assert 'g:junit' not in graph
+
+def test_closures(request):
+    folder = createProject(request)
+    graph = ReactorGraph(PomCache().scan(folder))
+
+    assert graph.allUpstream(['g:app']) == {'g:impl', 'g:plugin', 'g:api', 'g:root'}
+    assert graph.allDownstream(['g:api']) == {'g:impl', 'g:plugin', 'g:app'}
+    assert graph.ordered(graph.allDownstream(['g:impl']) | {'g:impl'}) == ['g:impl', 'g:app']
+    assert graph.allDownstream(['g:tools']) == set()
+
+def test_critical_path(request):
+    folder = createProject(request)
+    graph = ReactorGraph(PomCache().scan(folder))
+
+    assert graph.criticalPath() == (4.0, ['g:root', 'g:api', 'g:impl', 'g:app'])
+
+    durations = {'g:root': 1, 'g:api': 10, 'g:impl': 5, 'g:plugin': 30, 'g:app': 2, 'g:tools': 50}
+    assert graph.criticalPath(durations) == (51.0, ['g:root', 'g:tools'])
+    durations['g:tools'] = 1
+    assert graph.criticalPath(durations) == (43.0, ['g:root', 'g:api', 'g:plugin', 'g:app'])
+
+def test_cycle(request):
+    folder = createProject(request)
+    writePom(folder / 'api', 'api', dependencies=('app',))
+
+    graph = ReactorGraph(PomCache().scan(folder))
+    with pytest.raises(Exception, match='The modules depend on each other: g:app -> g:impl -> g:api -> g:app'):
+        graph.buildOrder()
+
+def test_incremental_update(request):
+    folder = createProject(request)
+    cache = PomCache()
+    graph = ReactorGraph(cache.scan(folder))
+    graph.buildOrder()
+
+    assert not graph.update(cache.scan(folder))
+    assert graph.memoBuildOrder is not None
+
+    path = writePom(folder / 'tools', 'tools', dependencies=('app',))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    assert graph.update(cache.scan(folder))
+    assert graph.upstream('g:tools') == ['g:app', 'g:root']
+    assert graph.buildOrder()[-1] == 'g:tools'
+    assert graph.updates == 2
+
+def test_project_reactor():
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+    project._pomCache = PomCache()
+
+    graph = project.reactor
+    assert graph.buildOrder() == [
+        'de.pdark.python.pmr.it2:IT2-parent',
+        'de.pdark.python.pmr.it2:IT2-module1',
+        'de.pdark.python.pmr.it2:IT2-module2',
+    ]
+    assert project.reactor is graph
+
+def test_find_by_name(request):
+    folder = createProject(request)
+    graph = ReactorGraph(PomCache().scan(folder))
+
+    assert graph.findByName('api') == 'g:api'
+    assert graph.findByName('api 1') == 'g:api'
+    assert graph.findByName('unknown') is None
+
+    project = Project(rootFolder / 'it' / 'multi-module-project')
+    project._pomCache = PomCache()
+    assert project.reactor.findByName('IT2 First Module') == 'de.pdark.python.pmr.it2:IT2-module1'
+    assert project.reactor.findByName('IT2-module2 1.0') == 'de.pdark.python.pmr.it2:IT2-module2'
+
+def test_build_times(request):
+    folder = rootFolder / 'tmp' / 'test_reactor' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+
+    times = BuildTimes(folder / 'buildtimes.json')
+    assert times.estimate(['a', 'b']) == (0, ['a', 'b'])
+
+    times.record('a', 2.0)
+    times.record('b', 4.0)
+    times.save()
+
+    times = BuildTimes(folder / 'buildtimes.json')
+    times.load()
+    assert times.estimate(['a', 'b']) == (6.0, [])
+    # Unknown modules take the average time
+    assert times.estimate(['a', 'b', 'c']) == (9.0, ['c'])
@@ -0,0 +1,108 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.logging import DummyLogger, FileLogger, LogArchive
+from pmr.model import CustomPatternPreferences
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser, installEventLogging
+from pmr.ingest import PipelineEmitter
+from pmr.replay import *
+from pathlib import Path
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+expectedOutputFolder = rootFolder / 'tests' / 'expected_output'
+
+class NullPipeline:
+    def put(self, name, args=()):
+        pass
+
+def writeLog(request, lines):
+    '''Parses the lines like a build and writes the log file with its index.'''
+    folder = rootFolder / 'tmp' / 'test_replay' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    path = folder / 'pmr.log'
+
+    logger = FileLogger(path)
+    emitter = PipelineEmitter(NullPipeline(), SIGNAL_NAMES)
+    installEventLogging(emitter, logger)
+    parser = MavenOutputParser(emitter, CustomPatternPreferences(), logger)
+
+    for line in lines:
+        logger.log('MOUT', line)
+        parser.parse(line)
+    logger.close()
+
+    return path
+
+def readCannedOutput():
+    path = expectedOutputFolder / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+    with open(path, mode='r', encoding='utf-8') as fh:
+        # Like PipeDrainer
+        return [line.rstrip() for line in fh.read().rstrip('\n').split('\n')]
+
+def test_chunks_start_at_modules(request):
+    path = writeLog(request, readCannedOutput())
+
+    archive = LogArchive(path)
+    chunks = findChunks(archive, chunkLines=5)
+    starts = [archive.line(chunk.start) for chunk in chunks[1:]]
+    assert chunks[-1].end == archive.lineCount
+    archive.close()
+
+    assert starts == [
+        'MOUT [INFO] Building IT2 Parent Project 1.0                                    [1/3]',
+        'MOUT [INFO] Building IT2 First Module 1.0                                      [2/3]',
+        'MOUT [INFO] Building IT2-module2 1.0                                           [3/3]',
+        'MOUT [INFO] Reactor Summary for IT2 Parent Project 1.0:',
+    ]
+    assert [chunk.isReactorBuild for chunk in chunks] == [False, True, True, True, True]
+
+def test_sequential_replay_matches_index(request):
+    path = writeLog(request, readCannedOutput())
+
+    archive = LogArchive(path)
+    expected = archive.events
+    archive.close()
+
+    assert len(expected) > 0
+    assert replayEvents(path, CustomPatternPreferences(), workers=1, chunkLines=5) == expected
+
+def test_parallel_replay_matches_index(request):
+    path = writeLog(request, readCannedOutput())
+
+    archive = LogArchive(path)
+    expected = archive.events
+    archive.close()
+
+    assert replayEvents(path, CustomPatternPreferences(), workers=2, chunkLines=5) == expected
+
+def test_wrong_seed_is_parsed_again(request, capsys):
+    # The jar plugin logs "Building jar:" after a separator, which looks like the start of a module
+    lines = [
+        '[INFO] Scanning for projects...',
+        '[INFO] Reactor Build Order:',
+        '[INFO]',
+        '[INFO] A [jar]',
+        '[INFO] B [jar]',
+        '[INFO]',
+        '[INFO] --------------------------< g:a >--------------------------',
+        '[INFO] Building A 1.0 [1/2]',
+        '[INFO] --- maven-jar-plugin:2.4:jar (default-jar) @ a ---',
+        '[INFO] ------------------------------------------------------------',
+        '[INFO] Building jar: a.jar',
+        '[WARNING] W1',
+        '[INFO] --- maven-install-plugin:2.4:install (default-install) @ a ---',
+        '[INFO] --------------------------< g:b >--------------------------',
+        '[INFO] Building B 1.0 [2/2]',
+        '[ERROR] E1',
+    ]
+    path = writeLog(request, lines)
+
+    archive = LogArchive(path)
+    expected = archive.events
+    assert len(findChunks(archive, chunkLines=1)) == 4
+    archive.close()
+
+    assert replayEvents(path, CustomPatternPreferences(), workers=2, chunkLines=1) == expected
+    assert 'Replay: 1 of 4 chunks had to be parsed again' in capsys.readouterr().out
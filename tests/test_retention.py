@@ -0,0 +1,116 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.logging import FileLogger, LogArchive, compressedPath, indexPath
+from pmr.model import LogPreferences
+from pmr.retention import *
+from pathlib import Path
+import os
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+DAY = 24 * 60 * 60
+NOW = 1600000000
+
+def createFolder(request):
+    folder = rootFolder / 'tmp' / 'test_retention' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+    return folder
+
+def createLog(folder, name, age, lines=10):
+    path = folder / name
+    logger = FileLogger(path)
+    for i in range(lines):
+        logger.log('MOUT', f'line {i}')
+    logger.close()
+
+    timestamp = NOW - age
+    os.utime(path, (timestamp, timestamp))
+    os.utime(indexPath(path), (timestamp, timestamp))
+    return path
+
+def remainingLogs(folder):
+    return sorted(
+        it.name
+        for it in folder.iterdir()
+        if not it.name.endswith('.idx') and not it.name.endswith('.blocks')
+    )
+
+def test_compress_finished_logs(request):
+    folder = createFolder(request)
+    createLog(folder, 'pmr-2.log', 0)
+    path = createLog(folder, 'pmr-1.log', 60)
+
+    LogRetention(folder, LogPreferences()).apply(NOW)
+
+    # The newest log stays as it is
+    assert remainingLogs(folder) == ['pmr-1.log.gz', 'pmr-2.log']
+
+    archive = LogArchive(path)
+    assert archive.line(9) == 'MOUT line 9'
+    archive.close()
+
+def test_max_count(request):
+    folder = createFolder(request)
+    for i in range(5):
+        createLog(folder, f'pmr-{i}.log', i * 60)
+
+    prefs = LogPreferences()
+    prefs.maxCount = 2
+    LogRetention(folder, prefs).apply(NOW)
+
+    assert remainingLogs(folder) == ['pmr-0.log', 'pmr-1.log.gz']
+
+def test_max_age(request):
+    folder = createFolder(request)
+    createLog(folder, 'pmr-new.log', 0)
+    createLog(folder, 'pmr-old.log', 3 * DAY)
+
+    prefs = LogPreferences()
+    prefs.maxAgeDays = 2
+    LogRetention(folder, prefs).apply(NOW)
+
+    assert remainingLogs(folder) == ['pmr-new.log']
+
+def test_max_size_keeps_newest(request):
+    folder = createFolder(request)
+    createLog(folder, 'pmr-new.log', 0, lines=1000)
+    createLog(folder, 'pmr-old.log', 60, lines=1000)
+
+    prefs = LogPreferences()
+    prefs.maxSizeMB = 0
+    LogRetention(folder, prefs).apply(NOW)
+
+    assert remainingLogs(folder) == ['pmr-new.log']
+
+def test_skip_open_logs(request):
+    folder = createFolder(request)
+    createLog(folder, 'pmr-new.log', 60)
+    createLog(folder, 'pmr-old.log', 120)
+    active = FileLogger(folder / 'pmr-active.log')
+    active.log('MOUT', 'still running')
+
+    LogRetention(folder, LogPreferences()).apply(NOW)
+    active.close()
+
+    assert remainingLogs(folder) == ['pmr-active.log', 'pmr-new.log', 'pmr-old.log.gz']
+
+def test_skip_logs_open_in_archive(request):
+    folder = createFolder(request)
+    createLog(folder, 'pmr-new.log', 0)
+    path = createLog(folder, 'pmr-old.log', 60)
+    createLog(folder, 'pmr-older.log', 120)
+
+    archive = LogArchive(path)
+    prefs = LogPreferences()
+    prefs.maxCount = 1
+    LogRetention(folder, prefs).apply(NOW)
+    assert archive.line(0) == 'MOUT line 0'
+    archive.close()
+
+    assert remainingLogs(folder) == ['pmr-new.log', 'pmr-old.log']
+
+    LogRetention(folder, prefs).apply(NOW)
+    assert remainingLogs(folder) == ['pmr-new.log']
@@ -0,0 +1,31 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.segments import *
+
+def test_store_and_load():
+    store = SegmentStore()
+    first = store.store(['a', 'b'])
+    second = store.store(['äöü'])
+
+    assert store.load(second) == ['äöü']
+    assert store.load(first) == ['a', 'b']
+    assert first.lineCount == 2
+    assert second.offset == first.size
+
+    store.close()
+
+def test_empty_segment():
+    store = SegmentStore()
+    segment = store.store([])
+
+    assert store.load(segment) == []
+    store.close()
+
+def test_keys():
+    store = SegmentStore()
+    segment = store.store(['a\tb', 'c'], ['error', ''])
+
+    assert store.loadWithKeys(segment) == [('error', 'a\tb'), ('', 'c')]
+    assert store.load(segment) == ['a\tb', 'c']
+    store.close()
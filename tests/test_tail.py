@@ -0,0 +1,201 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.ingest import IngestPipeline, PipelineEmitter
+from pmr.logging import DummyLogger, FileLogger, LogArchive
+from pmr.model import CustomPatternPreferences
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser
+from pmr.tail import *
+from pathlib import Path
+import shutil
+
+rootFolder = Path(__file__).parent.parent.resolve()
+cannedOutput = rootFolder / 'tests' / 'expected_output' / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+
+def createFolder(request):
+    folder = rootFolder / 'tmp' / 'test_tail' / request.node.name
+    if folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True)
+    return folder
+
+def append(path, data):
+    with open(path, mode='ab') as fh:
+        fh.write(data)
+
+def createParser():
+    pipeline = IngestPipeline(capacity=1000000)
+    parser = MavenOutputParser(PipelineEmitter(pipeline, SIGNAL_NAMES), CustomPatternPreferences(), DummyLogger())
+    return pipeline, parser
+
+def cannedLines():
+    with open(cannedOutput, mode='r', encoding='utf-8') as fh:
+        return [it.rstrip() for it in fh.read().rstrip('\n').split('\n')]
+
+def test_reads_only_appended_lines(request):
+    path = createFolder(request) / 'build.log'
+
+    tail = LogTail(path)
+    assert tail.read() == []
+
+    append(path, b'[INFO] first\n[INFO] sec')
+    assert tail.read() == ['[INFO] first']
+    assert tail.lineOffset == len(b'[INFO] first\n')
+
+    assert tail.read() == []
+
+    append(path, 'ond ä\r\n\n'.encode('UTF-8'))
+    assert tail.read() == ['[INFO] second ä', '']
+    assert tail.lineNumber == 3
+    assert tail.reads == 2
+
+    tail.close()
+
+def test_small_reads(request):
+    path = createFolder(request) / 'build.log'
+    append(path, b'one\ntwo\nthree\n')
+
+    tail = LogTail(path, maxReadSize=5)
+    lines = []
+    for i in range(5):
+        lines.extend(tail.read())
+
+    assert lines == ['one', 'two', 'three']
+    tail.close()
+
+def test_truncated_file_is_read_again(request):
+    path = createFolder(request) / 'build.log'
+    append(path, b'old line\nanother old line\n')
+
+    tail = LogTail(path)
+    assert len(tail.read()) == 2
+
+    with open(path, mode='wb') as fh:
+        fh.write(b'new\n')
+
+    assert tail.read() == ['new']
+    assert tail.restarts == 1
+    tail.close()
+
+def test_follow_until_build_finished(request):
+    path = createFolder(request) / 'build.log'
+    shutil.copy(cannedOutput, path)
+
+    expectedPipeline, expectedParser = createParser()
+    for line in cannedLines():
+        expectedParser.parse(line)
+
+    pipeline, parser = createParser()
+    rc = followLog(LogTail(path), parser, DummyLogger(), parser.runner, idleTimeout=0)
+
+    assert rc == 1
+    assert pipeline.drain() == expectedPipeline.drain()
+
+def test_continue_after_checkpoint(request):
+    folder = createFolder(request)
+    path = folder / 'build.log'
+    lines = cannedLines()
+
+    expectedPipeline, expectedParser = createParser()
+    split = None
+    for i, line in enumerate(lines):
+        expectedParser.parse(line)
+        if split is None and i >= len(lines) // 2 and expectedParser.context()[0] == 'output':
+            split = i + 1
+    expected = expectedPipeline.drain()
+
+    append(path, ''.join(it + '\n' for it in lines[:split]).encode('UTF-8'))
+
+    # The first run is stopped after it has read everything, like when the UI is closed
+    checkpoint = TailCheckpoint(folder / 'follow.json')
+    pipeline, parser = createParser()
+    tail, previous = attach(path, parser, checkpoint)
+    assert previous is None
+    calls = []
+    rc = followLog(tail, parser, DummyLogger(), parser.runner, checkpoint, lambda: calls.append(1) or len(calls) > 1)
+    assert rc is None
+    records = pipeline.drain()
+
+    data = checkpoint.load()
+    assert data['offset'] == path.stat().st_size
+    assert data['lineNumber'] == split
+
+    append(path, ''.join(it + '\n' for it in lines[split:]).encode('UTF-8'))
+
+    pipeline, parser = createParser()
+    tail, previous = attach(path, parser, checkpoint)
+    assert previous['lineNumber'] == split
+    rc = followLog(tail, parser, DummyLogger(), parser.runner, checkpoint, idleTimeout=0)
+    assert rc == 1
+    records.extend(pipeline.drain())
+
+    assert records == expected
+    # Following the finished build again shows all of it
+    assert checkpoint.load() is None
+
+def test_checkpoint_of_replaced_file_is_ignored(request):
+    folder = createFolder(request)
+    path = folder / 'build.log'
+    append(path, b'[INFO] one\n[INFO] two\n')
+
+    checkpoint = TailCheckpoint(folder / 'follow.json')
+    tail = LogTail(path)
+    tail.read()
+    checkpoint.save(tail, ('output', False, False), None)
+    tail.close()
+
+    path.unlink()
+    append(path, b'[INFO] x\n')
+
+    pipeline, parser = createParser()
+    tail, previous = attach(path, parser, checkpoint)
+    assert previous is None
+    assert tail.offset == 0
+
+def test_replay_history_after_checkpoint(request):
+    folder = createFolder(request)
+    path = folder / 'build.log'
+    lines = cannedLines()
+
+    expectedPipeline, expectedParser = createParser()
+    split = None
+    for i, line in enumerate(lines):
+        expectedParser.parse(line)
+        if split is None and i >= len(lines) // 3 and expectedParser.context()[0] == 'output':
+            split = i + 1
+    expectedParser.flush()
+    expected = expectedPipeline.drain()
+
+    append(path, ''.join(it + '\n' for it in lines[:split]).encode('UTF-8'))
+
+    checkpoint = TailCheckpoint(folder / 'follow.json')
+    pipeline, parser = createParser()
+    tail, previous = attach(path, parser, checkpoint)
+    logger = FileLogger(folder / 'first.log')
+    calls = []
+    followLog(tail, parser, logger, parser.runner, checkpoint, lambda: calls.append(1) or len(calls) > 1)
+    logger.close()
+
+    append(path, ''.join(it + '\n' for it in lines[split:]).encode('UTF-8'))
+
+    # The second run shows the whole build: First the history, then the new lines
+    pipeline, parser = createParser()
+    tail, previous = attach(path, parser, checkpoint)
+    history = MavenOutputParser(parser.runner, CustomPatternPreferences(), DummyLogger())
+    logger = FileLogger(folder / 'second.log')
+    assert replayHistory(previous['log'], previous['lineNumber'], history, logger) == previous['lineNumber']
+    followLog(tail, parser, logger, parser.runner, checkpoint, idleTimeout=0)
+    logger.close()
+
+    assert pipeline.drain() == expected
+
+    archive = LogArchive(folder / 'second.log')
+    assert [archive.line(i) for i in range(archive.lineCount)] == ['MOUT ' + it for it in lines]
+    archive.close()
+
+def test_replay_history_without_log(request):
+    folder = createFolder(request)
+    pipeline, parser = createParser()
+
+    assert replayHistory(folder / 'missing.log', 10, parser, DummyLogger()) == 0
+    assert replayHistory(None, 10, parser, DummyLogger()) == 0
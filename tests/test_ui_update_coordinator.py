@@ -0,0 +1,85 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.ui import UiUpdateCoordinator
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class FakeTimer(QObject):
+    '''Only fires when the test calls fire().'''
+    timeout = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.interval = None
+        self.active = False
+        self.starts = 0
+
+    def setInterval(self, interval):
+        self.interval = interval
+
+    def start(self):
+        self.active = True
+        self.starts += 1
+
+    def stop(self):
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+    def fire(self):
+        if self.active:
+            self.timeout.emit()
+
+def test_updaters_run_in_order(qtbot):
+    coordinator = UiUpdateCoordinator()
+    calls = []
+    coordinator.register('a', lambda: (calls.append('a'), coordinator.markDirty('b')))
+    coordinator.register('b', lambda: calls.append('b'))
+    coordinator.register('c', lambda: calls.append('c'))
+
+    coordinator.markDirty('c')
+    coordinator.markDirty('a')
+    coordinator.tick()
+
+    assert calls == ['a', 'b', 'c']
+    assert coordinator.ticks == 1
+    assert coordinator.updates == 3
+
+    # Nothing is dirty: The timer stops
+    coordinator.tick()
+    assert coordinator.ticks == 1
+    assert not coordinator.timer.isActive()
+
+def test_updates_are_capped(qtbot):
+    timer = FakeTimer()
+    coordinator = UiUpdateCoordinator(maxUpdatesPerSecond=10, timer=timer)
+    calls = []
+    coordinator.register('a', lambda: calls.append('a'))
+    assert timer.interval == 100
+
+    for j in range(1000):
+        coordinator.markDirty('a')
+    assert calls == []
+    assert timer.starts == 1
+
+    # All events between two ticks cause a single update
+    timer.fire()
+    assert calls == ['a']
+    for j in range(1000):
+        coordinator.markDirty('a')
+    timer.fire()
+    assert calls == ['a', 'a']
+
+    # Nothing is dirty: The timer stops until the next event
+    timer.fire()
+    assert not timer.isActive()
+    timer.fire()
+    assert calls == ['a', 'a']
+    assert coordinator.ticks == 2
+
+    coordinator.markDirty('a')
+    assert timer.starts == 2
+    timer.fire()
+    assert calls == ['a', 'a', 'a']
+    assert coordinator.updates == 3
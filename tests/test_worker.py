@@ -0,0 +1,111 @@
+#!python3
+# -*- coding: utf-8 -*-
+
+from pmr.drainer import PipeDrainer
+from pmr.ingest import IngestPipeline, PipelineEmitter
+from pmr.logging import DummyLogger, FileLogger, LogArchive
+from pmr.model import CustomPatternPreferences
+from pmr.parser import SIGNAL_NAMES, MavenOutputParser
+from pmr.worker import *
+from pathlib import Path
+import io
+import multiprocessing
+import sys
+
+rootFolder = Path(__file__).parent.parent.resolve()
+cannedOutput = rootFolder / 'tests' / 'expected_output' / 'multi-module-project' / 'mvn-clean-install-existing-repo.log'
+
+def catCommand(path):
+    # Stands in for Maven: Prints the canned output
+    return [sys.executable, '-c', 'import sys; sys.stdout.buffer.write(open(sys.argv[1], "rb").read())', str(path)]
+
+def parseInThisProcess(path, customPatternPreferences):
+    pipeline = IngestPipeline(capacity=1000000)
+    parser = MavenOutputParser(PipelineEmitter(pipeline, SIGNAL_NAMES), customPatternPreferences, DummyLogger())
+
+    with open(path, mode='r', encoding='utf-8') as fh:
+        for line in PipeDrainer(io.StringIO(fh.read())).start().lines():
+            parser.parse(line)
+
+    return pipeline.drain()
+
+def runWorker(spoolThreshold=SPOOL_THRESHOLD, logPath=None):
+    worker = ParserWorker(catCommand(cannedOutput), rootFolder, CustomPatternPreferences(), logPath, spoolThreshold)
+    worker.start()
+    records = list(worker.records())
+    return worker, records
+
+def test_worker_emits_the_same_records():
+    expected = parseInThisProcess(cannedOutput, CustomPatternPreferences())
+
+    worker, records = runWorker()
+
+    assert records[-1] == ('mavenFinished', (0,))
+    assert records[:-1] == expected
+    assert worker.spooledBatches == 0
+    assert not worker.spoolPath.exists()
+
+def test_large_batches_go_through_the_spool():
+    expected = parseInThisProcess(cannedOutput, CustomPatternPreferences())
+
+    worker, records = runWorker(spoolThreshold=0)
+
+    assert records[:-1] == expected
+    assert worker.spooledBatches == worker.batches
+    assert worker.batches > 0
+
+def test_spool_starts_over_after_acknowledgement(request):
+    folder = rootFolder / 'tmp' / 'test_worker' / request.node.name
+    folder.mkdir(parents=True, exist_ok=True)
+    spoolPath = folder / 'spool'
+
+    receiver, connection = multiprocessing.Pipe(duplex=False)
+    acknowledgements, acknowledge = multiprocessing.Pipe(duplex=False)
+    sender = BatchSender(connection, spoolPath, spoolThreshold=0, acknowledgements=acknowledgements)
+
+    sender.put('a')
+    sender.flush()
+    _, offset, size = receiver.recv()
+    assert offset == 0
+
+    # Not acknowledged yet: The next batch is appended
+    sender.put('b')
+    sender.flush()
+    _, offset2, size2 = receiver.recv()
+    assert offset2 == size
+
+    acknowledge.send(offset2 + size2)
+    sender.put('c')
+    sender.flush()
+    _, offset3, size3 = receiver.recv()
+    assert offset3 == 0
+    assert spoolPath.stat().st_size == size3
+
+    sender.close()
+    receiver.close()
+    acknowledge.close()
+
+def test_worker_writes_the_log():
+    path = rootFolder / 'tmp' / 'test_worker' / 'pmr.log'
+
+    worker, records = runWorker(logPath=path)
+    assert path not in FileLogger.openLogs
+
+    archive = LogArchive(path)
+    modules = [args[0] for kind, line, args in archive.events if kind == 'module']
+    archive.close()
+
+    assert modules == [
+        'IT2 Parent Project 1.0',
+        'IT2 First Module 1.0',
+        'IT2-module2 1.0',
+    ]
+
+def test_missing_command_is_reported():
+    worker = ParserWorker([str(rootFolder / 'tmp' / 'no-such-command')], rootFolder, CustomPatternPreferences())
+    worker.start()
+    records = list(worker.records())
+
+    assert [name for name, args in records] == ['error', 'mavenFinished']
+    assert 'no-such-command' in records[0][1][0]
+    assert records[1] == ('mavenFinished', (-1,))